@@ -0,0 +1,237 @@
+# analitica.py
+# Analítica del flujo sobre el log de eventos (evento es append-only):
+#   - permanencia: tiempo en cada estado (entre dos eventos que cambian de estado)
+#   - ciclo: creación de la gestión -> primer estado terminal, por tipo
+#   - throughput: transiciones por día (y por estado destino)
+# Un solo recorrido en streaming (yield_per) acumula duraciones en arrays compactos;
+# los refrescos sólo leen eventos con id > último procesado. Los percentiles se
+# calculan vectorizados con NumPy (si no está instalado, ordenando en Python) y se
+# cachean hasta que llegan eventos nuevos. El recálculo completo lee también la historia
+# archivada (archivo_eventos.py) antes que la de evento.
+import asyncio
+import time
+from array import array
+from functools import lru_cache
+
+from sqlalchemy import select
+
+import archivo_eventos
+from catalogo_cache import get_catalogo_async
+from models import Evento, EventoArchivado, Gestion
+from settings import get_settings
+
+
+REFRESCO_SEGUNDOS = get_settings().analitica_refresco_segundos
+LOTE = 5000
+# Segmentos archivados leídos por tanda (en un hilo: es E/S de disco)
+LOTE_SEGMENTOS = 200
+PERCENTILES = (50, 90, 99)
+
+
+@lru_cache(maxsize=1)
+def _numpy():
+    """numpy se importa al primer cálculo (~100 ms), no en el arranque de cada worker."""
+    try:
+        import numpy
+    except ImportError:  # pragma: no cover - numpy está en requirements.txt
+        return None
+    return numpy
+
+
+def _percentiles(valores, qs):
+    """Interpolación lineal (el método por defecto de numpy.percentile)."""
+    numpy = _numpy()
+    if numpy is not None:
+        return [float(x) for x in numpy.percentile(numpy.frombuffer(valores, dtype=numpy.float64), qs)]
+    orden = sorted(valores)
+    out = []
+    for q in qs:
+        pos = (len(orden) - 1) * q / 100
+        i = int(pos)
+        j = min(i + 1, len(orden) - 1)
+        out.append(orden[i] + (orden[j] - orden[i]) * (pos - i))
+    return out
+
+
+def _estadisticas(valores):
+    """valores: array('d') de segundos."""
+    n = len(valores)
+    if not n:
+        return {"n": 0, "media_s": None, "max_s": None, **{f"p{q}_s": None for q in PERCENTILES}}
+    out = {"n": n, "media_s": round(sum(valores) / n, 3), "max_s": round(max(valores), 3)}
+    for q, v in zip(PERCENTILES, _percentiles(valores, PERCENTILES)):
+        out[f"p{q}_s"] = round(v, 3)
+    return out
+
+
+def _unir(arrays):
+    out = array("d")
+    for a in arrays:
+        out.extend(a)
+    return out
+
+
+class MotorAnalitica:
+    """Acumuladores incrementales; un proceso mantiene uno (ver get_motor)."""
+
+    def __init__(self, terminales=()):
+        self.terminales = frozenset(terminales)
+        self.ultimo_evento_id = 0
+        self.refrescado_en = None
+        self._gestiones = {}  # gestion_id -> [estado_id, desde, cerrada]
+        self._permanencia = {}  # (estado_id, tipo) -> array('d')
+        self._ciclo = {}  # tipo -> array('d')
+        self._por_dia = {}  # (date, estado_id) -> transiciones
+        self._cache = {}
+
+    def procesar(self, filas):
+        """
+        filas: (evento_id, gestion_id, fecha, estado_id, tipo, fecha_creacion) en orden de id,
+        sólo eventos con estado. Devuelve cuántas filas se procesaron.
+        """
+        n = 0
+        gestiones, permanencia, ciclo, por_dia = self._gestiones, self._permanencia, self._ciclo, self._por_dia
+        for ev_id, gid, fecha, estado_id, tipo, creada in filas:
+            n += 1
+            self.ultimo_evento_id = ev_id
+            g = gestiones.get(gid)
+            if g is None:
+                g = gestiones[gid] = [None, None, False]
+            elif g[0] == estado_id:
+                continue
+            # El primer tramo (creación -> primer evento) no se cuenta: su estado no está en el log
+            if g[0] is not None:
+                permanencia.setdefault((g[0], tipo), array("d")).append((fecha - g[1]).total_seconds())
+            g[0], g[1] = estado_id, fecha
+            clave = (fecha.date(), estado_id)
+            por_dia[clave] = por_dia.get(clave, 0) + 1
+            if not g[2] and estado_id in self.terminales and creada is not None:
+                ciclo.setdefault(tipo, array("d")).append((fecha - creada).total_seconds())
+                g[2] = True
+        if n:
+            self._cache.clear()
+        return n
+
+    def _cacheado(self, clave, calcular):
+        if clave not in self._cache:
+            self._cache[clave] = calcular()
+        return self._cache[clave]
+
+    def permanencia(self, tipo=None):
+        def calcular():
+            por_estado = {}
+            for (estado_id, t), valores in self._permanencia.items():
+                if tipo is None or t == tipo:
+                    por_estado.setdefault(estado_id, []).append(valores)
+            return [
+                dict(estado_id=e, **_estadisticas(_unir(arrays)))
+                for e, arrays in sorted(por_estado.items())
+            ]
+
+        return self._cacheado(("permanencia", tipo), calcular)
+
+    def ciclo(self, tipo=None):
+        def calcular():
+            return [
+                dict(tipo=t, **_estadisticas(valores))
+                for t, valores in sorted(self._ciclo.items(), key=lambda kv: (kv[0] is None, kv[0] or ""))
+                if tipo is None or t == tipo
+            ]
+
+        return self._cacheado(("ciclo", tipo), calcular)
+
+    def throughput(self, desde=None, hasta=None):
+        def calcular():
+            dias = {}
+            for (dia, estado_id), n in self._por_dia.items():
+                if (desde is None or dia >= desde) and (hasta is None or dia < hasta):
+                    d = dias.setdefault(dia, {"dia": dia.isoformat(), "transiciones": 0, "por_estado": {}})
+                    d["transiciones"] += n
+                    d["por_estado"][estado_id] = n
+            return [dias[d] for d in sorted(dias)]
+
+        return self._cacheado(("throughput", desde, hasta), calcular)
+
+
+def consulta_eventos(desde_id):
+    return (
+        select(Evento.id, Evento.gestion_id, Evento.fecha, Evento.estado_id, Gestion.tipo, Gestion.fecha_creacion)
+        .join(Gestion, Gestion.id == Evento.gestion_id)
+        .where(Evento.id > desde_id, Evento.estado_id.is_not(None))
+        .order_by(Evento.id)
+    )
+
+
+def _filas_archivadas(segmentos):
+    base = archivo_eventos.directorio()
+    out = []
+    for seg, tipo, creada in segmentos:
+        for e in archivo_eventos.leer_segmento(seg, base):
+            if e["estado_id"] is not None:
+                out.append((e["id"], seg.gestion_id, archivo_eventos.fecha_de(e), e["estado_id"], tipo, creada))
+    return out
+
+
+async def procesar_archivo(db, motor):
+    """
+    Historia archivada, gestión a gestión en orden cronológico; es anterior a lo que queda
+    en evento para esas gestiones. Deja ultimo_evento_id en 0 para leer después evento
+    entero y devuelve el mayor id archivado.
+    """
+    segmentos = (
+        await db.execute(
+            select(EventoArchivado, Gestion.tipo, Gestion.fecha_creacion)
+            .join(Gestion, Gestion.id == EventoArchivado.gestion_id)
+            .order_by(EventoArchivado.gestion_id, EventoArchivado.id)
+        )
+    ).all()
+    for i in range(0, len(segmentos), LOTE_SEGMENTOS):
+        motor.procesar(await asyncio.to_thread(_filas_archivadas, segmentos[i : i + LOTE_SEGMENTOS]))
+    motor.ultimo_evento_id = 0
+    return max((s.ultimo_evento_id or 0 for s, _, _ in segmentos), default=0)
+
+
+async def refrescar(db, motor):
+    """Procesa en streaming los eventos nuevos (id > motor.ultimo_evento_id)."""
+    archivado_hasta = await procesar_archivo(db, motor) if motor.refrescado_en is None else 0
+    result = await db.stream(consulta_eventos(motor.ultimo_evento_id).execution_options(yield_per=LOTE))
+    n = 0
+    async for filas in result.partitions():
+        n += motor.procesar(filas)
+    motor.ultimo_evento_id = max(motor.ultimo_evento_id, archivado_hasta)
+    motor.refrescado_en = time.monotonic()
+    return n
+
+
+_motor = None
+_async_lock = None
+
+
+async def get_motor(db, forzar=False):
+    """
+    Motor al día: refresco incremental si pasaron REFRESCO_SEGUNDOS; recálculo
+    completo si cambiaron los estados terminales del catálogo o si forzar=True.
+    """
+    global _motor, _async_lock
+    cat = await get_catalogo_async(db)
+    terminales = frozenset(e["id"] for e in cat.estados.values() if e["is_terminal"])
+    motor = _motor
+    if (
+        not forzar
+        and motor is not None
+        and motor.terminales == terminales
+        and time.monotonic() - motor.refrescado_en < REFRESCO_SEGUNDOS
+    ):
+        return motor
+    if _async_lock is None:
+        _async_lock = asyncio.Lock()
+    async with _async_lock:
+        motor = _motor
+        if forzar or motor is None or motor.terminales != terminales:
+            motor = MotorAnalitica(terminales)
+        elif time.monotonic() - motor.refrescado_en < REFRESCO_SEGUNDOS:
+            return motor
+        await refrescar(db, motor)
+        _motor = motor
+        return motor
+
@@ -0,0 +1,172 @@
+# archivo_eventos.py
+# Almacenamiento frío para la historia de gestiones cerradas: eventos de gestiones en estado
+# terminal (CatalogoEstado.is_terminal) sin actividad desde hace ARCHIVO_ANTIGUEDAD_DIAS.
+# - Archivos .jsonl.gz en ARCHIVO_EVENTOS_DIR con un miembro gzip por gestión: su posición
+#   y longitud quedan en evento_archivado, así leer una gestión es un seek y descomprimir
+#   sólo sus bytes (sin leer el resto del archivo ni depender de pyarrow).
+# - Por lote: se escribe y sincroniza el archivo y después, en una transacción, se registran
+#   los segmentos y se borran esas filas de evento. Si el commit falla queda un archivo
+#   huérfano, nunca eventos perdidos.
+# - Los eventos posteriores al archivado siguen en evento: get_gestion_by_code une ambas
+#   historias. gestion_resumen no cambia (sigue contando los eventos archivados).
+#   python archivo_eventos.py [--dias N] [--lote N] [--simular]
+import argparse
+import gzip
+import os
+import uuid
+from datetime import datetime, timedelta
+from itertools import groupby
+
+from sqlalchemy import exists, select
+
+from models import CatalogoEstado, Evento, EventoArchivado, Gestion, GestionResumen
+from queries import EVENTO_COLUMNS, serialize_evento_row
+from serializers import dumps, loads
+from settings import get_settings
+
+LOTE_GESTIONES = 500
+# Límite de parámetros por DELETE ... IN (SQLite admite 32766)
+_BORRADO = 5000
+
+
+def directorio():
+    ruta = get_settings().archivo_eventos_dir
+    if not os.path.isabs(ruta):
+        ruta = os.path.join(os.path.dirname(os.path.abspath(__file__)), ruta)
+    return ruta
+
+
+def candidatas(db, corte, despues_de=0, limite=LOTE_GESTIONES):
+    """Gestiones terminales cuyo último evento es anterior a `corte` y que aún tienen eventos."""
+    return (
+        db.execute(
+            select(GestionResumen.gestion_id)
+            .join(CatalogoEstado, CatalogoEstado.id == GestionResumen.estado_id)
+            .where(
+                CatalogoEstado.is_terminal.is_(True),
+                GestionResumen.ultimo_evento_fecha < corte,
+                GestionResumen.gestion_id > despues_de,
+                exists().where(Evento.gestion_id == GestionResumen.gestion_id),
+            )
+            .order_by(GestionResumen.gestion_id)
+            .limit(limite)
+        )
+        .scalars()
+        .all()
+    )
+
+
+def _escribir(filas):
+    """Escribe un archivo con un miembro gzip por gestión; devuelve (archivo, segmentos)."""
+    os.makedirs(directorio(), exist_ok=True)
+    nombre = f"eventos_{datetime.utcnow():%Y%m%d%H%M%S}_{uuid.uuid4().hex[:8]}.jsonl.gz"
+    ruta = os.path.join(directorio(), nombre)
+    segmentos = []
+    with open(ruta + ".tmp", "wb") as f:
+        for gid, grupo in groupby(filas, key=lambda r: r.gestion_id):
+            grupo = list(grupo)
+            datos = b"".join(dumps(serialize_evento_row(r)) + b"\n" for r in grupo)
+            posicion = f.tell()
+            f.write(gzip.compress(datos))
+            segmentos.append(
+                EventoArchivado(
+                    gestion_id=gid,
+                    archivo=nombre,
+                    posicion=posicion,
+                    longitud=f.tell() - posicion,
+                    num_eventos=len(grupo),
+                    primer_evento_id=min(r.id for r in grupo),
+                    ultimo_evento_id=max(r.id for r in grupo),
+                    desde=grupo[0].fecha,
+                    hasta=grupo[-1].fecha,
+                )
+            )
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(ruta + ".tmp", ruta)
+    return nombre, segmentos
+
+
+def archivar_lote(db, gestion_ids):
+    """Archiva los eventos de estas gestiones (Session); devuelve cuántos eventos movió."""
+    filas = db.execute(
+        select(*EVENTO_COLUMNS).where(Evento.gestion_id.in_(gestion_ids)).order_by(Evento.gestion_id, Evento.fecha, Evento.id)
+    ).all()
+    if not filas:
+        return 0
+    _, segmentos = _escribir(filas)
+    db.add_all(segmentos)
+    # Sólo los ids escritos: lo que llegue mientras tanto se queda en caliente
+    ids = [r.id for r in filas]
+    for i in range(0, len(ids), _BORRADO):
+        db.execute(Evento.__table__.delete().where(Evento.id.in_(ids[i : i + _BORRADO])))
+    db.commit()
+    return len(filas)
+
+
+def archivar(db, dias=None, lote=LOTE_GESTIONES, simular=False, log=print):
+    """Recorre las candidatas por lotes; devuelve (gestiones, eventos) archivados."""
+    dias = get_settings().archivo_antiguedad_dias if dias is None else dias
+    corte = datetime.utcnow() - timedelta(days=dias)
+    gestiones = eventos = 0
+    ultima = 0
+    while True:
+        ids = candidatas(db, corte, ultima, lote)
+        if not ids:
+            break
+        ultima = ids[-1]
+        if simular:
+            gestiones += len(ids)
+            continue
+        n = archivar_lote(db, ids)
+        gestiones += len(ids)
+        eventos += n
+        log(f"  {gestiones} gestiones, {eventos} eventos archivados")
+    return gestiones, eventos
+
+
+# ---------------------------------------------------------------------------
+# Lectura
+# ---------------------------------------------------------------------------
+def leer_segmento(segmento, base=None):
+    """Eventos de un segmento como dicts (mismas claves que serialize_evento_row)."""
+    with open(os.path.join(base or directorio(), segmento.archivo), "rb") as f:
+        f.seek(segmento.posicion)
+        datos = gzip.decompress(f.read(segmento.longitud))
+    return [loads(linea) for linea in datos.splitlines()]
+
+
+def fecha_de(evento):
+    """datetime UTC naive desde el ISO 'Z' del archivo (como las fechas de la BD)."""
+    return datetime.fromisoformat(evento["fecha"].rstrip("Z"))
+
+
+def leer(segmentos):
+    """Historia archivada de una gestión (varios segmentos si se archivó más de una vez)."""
+    base = directorio()
+    out = []
+    for s in segmentos:
+        out.extend(leer_segmento(s, base))
+    return out
+
+
+def segmentos_query(gestion_id):
+    return select(EventoArchivado).where(EventoArchivado.gestion_id == gestion_id).order_by(EventoArchivado.id)
+
+
+def archivada_expr():
+    """Columna EXISTS para traerla junto con la gestión (sin una consulta más)."""
+    return exists().where(EventoArchivado.gestion_id == Gestion.id).label("archivada")
+
+
+if __name__ == "__main__":
+    from db import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Archiva eventos de gestiones cerradas")
+    parser.add_argument("--dias", type=int, help="antigüedad mínima del último evento (ARCHIVO_ANTIGUEDAD_DIAS)")
+    parser.add_argument("--lote", type=int, default=LOTE_GESTIONES)
+    parser.add_argument("--simular", action="store_true", help="sólo contar candidatas")
+    args = parser.parse_args()
+    with SessionLocal() as db:
+        g, e = archivar(db, args.dias, args.lote, args.simular)
+    print(f"{'Candidatas' if args.simular else 'Archivadas'}: {g} gestiones, {e} eventos -> {directorio()}")
@@ -0,0 +1,289 @@
+# auth.py
+# Autenticación JWT (HS256 por defecto) para la API.
+# - POST /api/auth/login (routers/auth.py) paga bcrypt una vez y emite un token con id,
+#   correo, nombre y roles del usuario: verificar un request no consulta la BD.
+# - AuthMiddleware (ASGI, por fuera de la caché de respuestas) valida el token de cada
+#   request. Los ya verificados se guardan por firma en CacheTokens (LRU que descarta
+#   primero los expirados): un acierto es una búsqueda en un dict y una comparación, sin
+#   HMAC ni decodificar JSON. La firma sola no basta como clave: se compara también el
+#   contenido firmado para no aceptar una firma válida pegada a otro payload.
+# - Los roles ("gestor,admin", como roles_allowed) se parsean una vez por combinación.
+# - Token en "Authorization: Bearer <token>"; en WebSocket y SSE (el navegador no deja
+#   poner cabeceras) también en ?token=.
+# Contraseñas:  python auth.py <correo> [--roles gestor,admin]
+import heapq
+import hmac
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Optional
+from urllib.parse import parse_qs
+
+import bcrypt
+from fastapi import HTTPException, Request
+
+from serializers import dumps
+from settings import get_settings
+from workflow import parse_roles
+
+# Sin token aunque AUTH_REQUERIDA esté activa
+PUBLICAS = frozenset({"/api/auth/login", "/metrics", "/docs", "/docs/oauth2-redirect", "/redoc", "/openapi.json"})
+_QUERY_TOKEN = ("/api/stream/", "/api/ws/")
+
+
+class UsuarioAutenticado:
+    __slots__ = ("id", "correo", "nombre", "roles", "exp")
+
+    def __init__(self, id, correo, nombre, roles, exp):
+        self.id = id
+        self.correo = correo
+        self.nombre = nombre
+        self.roles = roles
+        self.exp = exp
+
+
+@lru_cache(maxsize=256)
+def roles(valor):
+    """frozenset de roles; una sola vez por combinación distinta."""
+    return parse_roles(valor)
+
+
+# ---------------------------------------------------------------------------
+# Contraseñas (bcrypt sólo usa los primeros 72 bytes; se truncan de forma explícita)
+# ---------------------------------------------------------------------------
+def hash_password(password):
+    return bcrypt.hashpw(password.encode()[:72], bcrypt.gensalt(get_settings().bcrypt_rondas)).decode()
+
+
+@lru_cache(maxsize=1)
+def _hash_señuelo():
+    return hash_password("señuelo").encode()
+
+
+def verificar_password(password, password_hash):
+    """Con usuario inexistente o sin contraseña se compara igual contra un señuelo: mismo coste."""
+    ok = bcrypt.checkpw(password.encode()[:72], password_hash.encode() if password_hash else _hash_señuelo())
+    return ok and bool(password_hash)
+
+
+# ---------------------------------------------------------------------------
+# Tokens
+# ---------------------------------------------------------------------------
+@lru_cache(maxsize=1)
+def _jose():
+    """(jwt, JWTError); python-jose y cryptography se importan con el primer token."""
+    from jose import JWTError, jwt
+
+    return jwt, JWTError
+
+
+def crear_token(usuario, recordar=False):
+    """(token, segundos de validez) para un models.Usuario."""
+    cfg = get_settings()
+    validez = cfg.jwt_recordar_dias * 86400 if recordar else cfg.jwt_expira_minutos * 60
+    ahora = int(time.time())
+    claims = {
+        "sub": str(usuario.id),
+        "correo": usuario.correo,
+        "nombre": usuario.nombre,
+        "roles": ",".join(sorted(roles(usuario.roles))),
+        "iat": ahora,
+        "exp": ahora + validez,
+    }
+    return _jose()[0].encode(claims, cfg.jwt_secret, algorithm=cfg.jwt_algoritmo), validez
+
+
+class CacheTokens:
+    """firma -> (contenido firmado, UsuarioAutenticado). LRU; al llenarse salen antes los expirados."""
+
+    def __init__(self, maximo):
+        self.maximo = maximo
+        self._tokens = OrderedDict()
+        self._expiraciones = []  # heap (exp, firma); puede tener entradas ya expulsadas
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.expulsados = 0
+
+    def obtener(self, firma, firmado, ahora):
+        with self._lock:
+            entrada = self._tokens.get(firma)
+            if entrada is None or not hmac.compare_digest(entrada[0], firmado):
+                self.fallos += 1
+                return None
+            if entrada[1].exp <= ahora:
+                del self._tokens[firma]
+                self.fallos += 1
+                return None
+            self._tokens.move_to_end(firma)
+            self.aciertos += 1
+            return entrada[1]
+
+    def guardar(self, firma, firmado, usuario, ahora):
+        if self.maximo <= 0:
+            return
+        with self._lock:
+            if firma not in self._tokens and len(self._tokens) >= self.maximo:
+                self._purgar(ahora)
+                while len(self._tokens) >= self.maximo:
+                    self._tokens.popitem(last=False)
+                    self.expulsados += 1
+            self._tokens[firma] = (firmado, usuario)
+            heapq.heappush(self._expiraciones, (usuario.exp, firma))
+            if len(self._expiraciones) > 2 * self.maximo:
+                self._expiraciones = [(e[1].exp, f) for f, e in self._tokens.items()]
+                heapq.heapify(self._expiraciones)
+
+    def _purgar(self, ahora):
+        while self._expiraciones and self._expiraciones[0][0] <= ahora:
+            _, firma = heapq.heappop(self._expiraciones)
+            entrada = self._tokens.get(firma)
+            if entrada is not None and entrada[1].exp <= ahora:
+                del self._tokens[firma]
+                self.expulsados += 1
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                "tokens": len(self._tokens),
+                "maximo": self.maximo,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "expulsados": self.expulsados,
+            }
+
+
+cache_tokens = CacheTokens(get_settings().auth_cache_tokens)
+
+
+def verificar(token):
+    """UsuarioAutenticado si el token es válido y no expiró; si no, None."""
+    firmado, _, firma = token.rpartition(".")
+    if not firmado or not firma:
+        return None
+    ahora = time.time()
+    usuario = cache_tokens.obtener(firma, firmado, ahora)
+    if usuario is not None:
+        return usuario
+    cfg = get_settings()
+    jwt, JWTError = _jose()
+    try:
+        claims = jwt.decode(token, cfg.jwt_secret, algorithms=[cfg.jwt_algoritmo])
+        usuario = UsuarioAutenticado(
+            int(claims["sub"]), claims.get("correo"), claims.get("nombre"), roles(claims.get("roles")), claims["exp"]
+        )
+    except (JWTError, KeyError, TypeError, ValueError):
+        return None
+    cache_tokens.guardar(firma, firmado, usuario, ahora)
+    return usuario
+
+
+# ---------------------------------------------------------------------------
+# Middleware y dependencias
+# ---------------------------------------------------------------------------
+def _token(scope):
+    for k, v in scope["headers"]:
+        if k == b"authorization":
+            esquema, _, valor = v.decode("latin-1").partition(" ")
+            return valor.strip() if esquema.lower() == "bearer" else None
+    if scope["path"].startswith(_QUERY_TOKEN):
+        valores = parse_qs(scope.get("query_string", b"").decode("latin-1")).get("token")
+        return valores[0] if valores else None
+    return None
+
+
+class AuthMiddleware:
+    """
+    Deja el usuario en scope["usuario"] (None si es anónimo) o responde 401. En las rutas
+    públicas un token inválido o expirado se ignora: el cliente debe poder volver a
+    iniciar sesión aunque siga enviando el token viejo.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+        token = _token(scope)
+        usuario = verificar(token) if token else None
+        publica = scope["path"] in PUBLICAS
+        if token and usuario is None and not publica:
+            await _rechazar(scope, send, "Token inválido o expirado")
+            return
+        if usuario is None and get_settings().auth_requerida and not publica and scope.get("method") != "OPTIONS":
+            await _rechazar(scope, send, "No autenticado")
+            return
+        scope["usuario"] = usuario
+        await self.app(scope, receive, send)
+
+
+async def _rechazar(scope, send, detalle):
+    if scope["type"] == "websocket":
+        # Cierre antes de aceptar: el servidor responde 403 al handshake
+        await send({"type": "websocket.close", "code": 1008, "reason": detalle})
+        return
+    body = dumps({"detail": detalle})
+    headers = [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode()),
+        (b"www-authenticate", b"Bearer"),
+    ]
+    await send({"type": "http.response.start", "status": 401, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+def usuario_actual(request: Request) -> Optional[UsuarioAutenticado]:
+    return request.scope.get("usuario")
+
+
+def requerir_usuario(request: Request) -> UsuarioAutenticado:
+    usuario = request.scope.get("usuario")
+    if usuario is None:
+        raise HTTPException(status_code=401, detail="No autenticado", headers={"WWW-Authenticate": "Bearer"})
+    return usuario
+
+
+def requerir_rol(rol):
+    """Dependencia: usuario autenticado (401) con este rol (403)."""
+
+    def dependencia(request: Request) -> UsuarioAutenticado:
+        usuario = requerir_usuario(request)
+        if rol not in usuario.roles:
+            raise HTTPException(status_code=403, detail=f"Requiere el rol {rol}")
+        return usuario
+
+    return dependencia
+
+
+def roles_de(usuario):
+    return usuario.roles if usuario is not None else frozenset()
+
+
+if __name__ == "__main__":
+    import argparse
+    import getpass
+
+    from sqlalchemy import select
+
+    from db import SessionLocal
+    from models import Usuario
+
+    parser = argparse.ArgumentParser(description="Asigna contraseña (y roles) a un usuario")
+    parser.add_argument("correo")
+    parser.add_argument("--roles", help="separados por comas, p. ej. gestor,admin")
+    args = parser.parse_args()
+    with SessionLocal() as db:
+        usuario = db.execute(select(Usuario).where(Usuario.correo == args.correo)).scalars().first()
+        if usuario is None:
+            raise SystemExit(f"No existe un usuario con correo {args.correo}")
+        password = getpass.getpass("Contraseña: ")
+        if password != getpass.getpass("Repetir: "):
+            raise SystemExit("Las contraseñas no coinciden")
+        usuario.password_hash = hash_password(password)
+        if args.roles is not None:
+            usuario.roles = ",".join(sorted(parse_roles(args.roles)))
+        db.commit()
+    print(f"Contraseña actualizada para {args.correo}")
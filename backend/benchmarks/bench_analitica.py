@@ -0,0 +1,70 @@
+# benchmarks/bench_analitica.py
+# Costo de la analítica del flujo: recorrido completo del log de eventos frente al
+# refresco incremental (sólo eventos nuevos) y a las consultas cacheadas.
+#   python -m benchmarks.bench_analitica [eventos]      (p.ej. 1000000)
+import random
+import sys
+from datetime import timedelta
+
+from sqlalchemy import func, select
+
+from analitica import LOTE, MotorAnalitica, consulta_eventos
+from benchmarks.common import ESTADOS, TRANSICIONES, new_session, seed_gestiones, sqlite_engine, timed
+from models import Evento, Gestion
+
+GESTIONES = 10000
+
+
+def seed_eventos(db, n, desde_id=1, seed=7):
+    """Recorridos aleatorios por el grafo de transiciones, con fechas crecientes por gestión."""
+    rnd = random.Random(seed + desde_id)
+    siguientes = {}
+    for a, b in TRANSICIONES:
+        siguientes.setdefault(a, []).append(b)
+    estados = dict(db.execute(select(Gestion.id, Gestion.estado_id)).all())
+    ultima = dict(db.execute(select(Gestion.id, Gestion.fecha_creacion)).all())
+    filas = []
+    for i in range(desde_id, desde_id + n):
+        gid = rnd.randint(1, GESTIONES)
+        opciones = siguientes.get(estados[gid]) or [e[0] for e in ESTADOS]
+        estado = rnd.choice(opciones)
+        estados[gid] = estado
+        ultima[gid] += timedelta(minutes=rnd.randint(1, 3000))
+        filas.append({"id": i, "gestion_id": gid, "fecha": ultima[gid], "estado_id": estado, "comentario": "x"})
+    db.execute(Evento.__table__.insert(), filas)
+    db.commit()
+
+
+def recorrer(db, motor):
+    result = db.execute(consulta_eventos(motor.ultimo_evento_id).execution_options(yield_per=LOTE))
+    return sum(motor.procesar(filas) for filas in result.partitions())
+
+
+def main(n):
+    engine = sqlite_engine()
+    with new_session(engine) as db:
+        seed_gestiones(db, GESTIONES)
+        seed_eventos(db, n)
+        terminales = [e[0] for e in ESTADOS if e[3]]
+
+        motor = MotorAnalitica(terminales)
+        with timed() as t:
+            procesados = recorrer(db, motor)
+        print(f"eventos={n} recorrido completo: {t['ms']:.0f} ms ({procesados} eventos)")
+
+        with timed() as t:
+            motor.permanencia(), motor.ciclo(), motor.throughput()
+        print(f"  primeras consultas (percentiles): {t['ms']:.1f} ms")
+        with timed() as t:
+            motor.permanencia(), motor.ciclo(), motor.throughput()
+        print(f"  consultas cacheadas: {t['ms']:.3f} ms")
+
+        nuevos = max(n // 100, 1)
+        seed_eventos(db, nuevos, desde_id=db.execute(select(func.max(Evento.id))).scalar() + 1)
+        with timed() as t:
+            procesados = recorrer(db, motor)
+        print(f"  refresco incremental: {t['ms']:.1f} ms ({procesados} eventos nuevos)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
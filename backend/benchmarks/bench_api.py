@@ -0,0 +1,203 @@
+# benchmarks/bench_api.py
+# Suite de carga de la API: siembra una BD con volumen configurable (cadenas de eventos
+# que respetan estado_transiciones), ejecuta escenarios con el generador concurrente de
+# bench_carga y guarda throughput, p50/p95/p99 y consultas por request en JSON.
+#   python -m benchmarks.bench_api --gestiones 100000 --eventos 5000000 --salida antes.json
+#   python -m benchmarks.bench_api --db postgresql://postgres@localhost/bench ...   (Postgres desechable)
+#   python -m benchmarks.bench_api --comparar antes.json despues.json
+# Por defecto la app corre en el proceso (httpx.ASGITransport, con su lifespan) y sin la
+# caché de respuestas, para medir el camino hasta la BD; --con-cache la activa.
+# La BD sembrada se reutiliza entre ejecuciones con el mismo --db.
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import ExitStack
+from datetime import datetime
+
+ESCENARIOS = ("list_gestiones", "get_gestion_by_code", "create_evento", "catalogos", "mixto")
+
+
+def peticiones(escenario, n_gestiones, seed=1):
+    """Función i -> (método, ruta, json) para bench_carga.cargar."""
+    rnd = random.Random(seed)
+
+    def list_gestiones(i):
+        filtro = rnd.choice(["", f"&estado_id={rnd.randint(1, 4)}", f"&responsable_id={rnd.randint(1, 20)}"])
+        return "GET", f"/api/gestiones/?limit=50{filtro}", None
+
+    def get_gestion_by_code(i):
+        gid = rnd.randint(1, n_gestiones)
+        # 1 de cada 10 por nombre (búsqueda indexada) en lugar de por id
+        return "GET", f"/api/gestiones/{gid if i % 10 else f'Gestion {gid}'}", None
+
+    def create_evento(i):
+        cuerpo = {"usuario_id": rnd.randint(1, 20), "comentario": f"bench {i}"}
+        return "POST", f"/api/gestiones/{rnd.randint(1, n_gestiones)}/eventos", cuerpo
+
+    def catalogos(i):
+        return "GET", rnd.choice(["/api/catalogos/estados", "/api/catalogos/comentario-plantillas"]), None
+
+    def mixto(i):
+        # Proporción típica de lectura/escritura del front
+        return rnd.choices([list_gestiones, get_gestion_by_code, create_evento, catalogos], [4, 4, 1, 1])[0](i)
+
+    return locals()[escenario]
+
+
+def sembrar(url, gestiones, eventos):
+    """Aplica las migraciones y siembra si la BD está vacía. Devuelve (gestiones, eventos)."""
+    import migraciones
+    import resumen
+    from benchmarks.common import ESTADOS, new_session, seed_eventos, seed_gestiones, timed
+    from db import make_engine
+    from models import ComentarioPlantilla, Evento, Gestion
+    from sqlalchemy import func, select
+
+    engine = make_engine(url)
+    migraciones.subir(engine)
+    with new_session(engine) as db:
+        existentes = db.execute(select(func.count()).select_from(Gestion)).scalar()
+        if existentes:
+            n_eventos = db.execute(select(func.count()).select_from(Evento)).scalar()
+            print(f"BD ya sembrada: {existentes} gestiones, {n_eventos} eventos (se reutiliza)")
+            return existentes, n_eventos
+        with timed() as t:
+            seed_gestiones(db, gestiones, estado_inicial=ESTADOS[0][0])
+            db.add_all(
+                ComentarioPlantilla(estado_id=e[0], titulo=f"Plantilla {e[1]}", template="...", required=e[3])
+                for e in ESTADOS
+            )
+            db.commit()
+            seed_eventos(db, eventos)
+            resumen.reconstruir(db)
+        print(f"Sembradas {gestiones} gestiones y {eventos} eventos en {t['ms'] / 1000:.1f} s")
+    engine.dispose()
+    return gestiones, eventos
+
+
+async def ejecutar(args, n_gestiones):
+    import httpx
+
+    from benchmarks.bench_carga import cargar
+    from benchmarks.common import QueryCounter
+
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=30)
+        motores, lifespan = [], None
+    else:
+        import db
+        import main
+
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bench", timeout=30)
+        motores = {db.engine, db.async_engine.sync_engine, db.async_read_engine.sync_engine}
+        lifespan = main.app.router.lifespan_context(main.app)
+
+    resultados = []
+    async with client:
+        if lifespan is not None:
+            await lifespan.__aenter__()
+        try:
+            for escenario in args.escenario:
+                peticion = peticiones(escenario, n_gestiones)
+                await cargar(client, peticion, args.concurrencia, min(args.total, 100))  # calentamiento
+                with ExitStack() as pila:
+                    contadores = [pila.enter_context(QueryCounter(m)) for m in motores]
+                    res = await cargar(client, peticion, args.concurrencia, args.total)
+                res["escenario"] = escenario
+                res["consultas_por_request"] = (
+                    round(sum(c.count for c in contadores) / res["requests"], 2) if contadores else None
+                )
+                resultados.append(res)
+                print(
+                    f"{escenario:<20} {res['rps']:>8} req/s  p50={res['p50_ms']} p95={res['p95_ms']} "
+                    f"p99={res['p99_ms']} ms  consultas/req={res['consultas_por_request']} errores={res['errores']}"
+                )
+        finally:
+            if lifespan is not None:
+                await lifespan.__aexit__(None, None, None)
+    return resultados
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+def comparar(base, nuevo):
+    a = {r["escenario"]: r for r in json.load(open(base))["resultados"]}
+    b = {r["escenario"]: r for r in json.load(open(nuevo))["resultados"]}
+    print(f"{'escenario':<20} {'req/s':>26} {'p95 ms':>26} {'consultas/req':>22}")
+    for nombre in (n for n in a if n in b):
+        x, y = a[nombre], b[nombre]
+
+        def delta(clave):
+            if x[clave] is None or y[clave] is None:
+                return f"{x[clave]} -> {y[clave]}"
+            cambio = (y[clave] - x[clave]) / x[clave] * 100 if x[clave] else 0.0
+            return f"{x[clave]} -> {y[clave]} ({cambio:+.0f}%)"
+
+        print(f"{nombre:<20} {delta('rps'):>26} {delta('p95_ms'):>26} {delta('consultas_por_request'):>22}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Suite de carga de la API")
+    parser.add_argument("--db", help="ruta SQLite o URL de BD desechable (por defecto SQLite en /tmp)")
+    parser.add_argument("--gestiones", type=int, default=10000)
+    parser.add_argument("--eventos", type=int, default=200000)
+    parser.add_argument("--escenario", action="append", choices=ESCENARIOS)
+    parser.add_argument("--concurrencia", type=int, default=32)
+    parser.add_argument("--total", type=int, default=2000)
+    parser.add_argument("--con-cache", action="store_true", help="no desactivar la caché de respuestas")
+    parser.add_argument("--url", help="medir un servidor ya levantado en lugar de la app en proceso")
+    parser.add_argument("--salida", help="guardar resultados en este JSON")
+    parser.add_argument("--comparar", nargs=2, metavar=("BASE", "NUEVO"))
+    args = parser.parse_args()
+
+    if args.comparar:
+        comparar(*args.comparar)
+        return
+    args.escenario = args.escenario or list(ESCENARIOS)
+    url = args.db or os.path.join(tempfile.gettempdir(), f"bench_api_{args.gestiones}_{args.eventos}.db")
+    if "://" not in url:
+        url = f"sqlite:///{url}"
+    # db.py crea los motores al importarse desde estas variables: fijarlas antes de importar
+    os.environ["DATABASE_URL"] = url
+    if not args.con_cache:
+        os.environ["CACHE_MAX_BYTES"] = "0"
+
+    # Contra un servidor externo su BD ya está sembrada: --gestiones da el rango de ids
+    n_gestiones, n_eventos = (args.gestiones, args.eventos) if args.url else sembrar(url, args.gestiones, args.eventos)
+    t0 = time.perf_counter()
+    resultados = asyncio.run(ejecutar(args, n_gestiones))
+    salida = {
+        "fecha": datetime.utcnow().isoformat() + "Z",
+        "commit": _commit(),
+        "config": {
+            "db": args.url or url.split("://")[0],
+            "gestiones": n_gestiones,
+            "eventos": n_eventos,
+            "concurrencia": args.concurrencia,
+            "total": args.total,
+            "cache": args.con_cache,
+            "en_proceso": not args.url,
+            "python": sys.version.split()[0],
+        },
+        "duracion_s": round(time.perf_counter() - t0, 1),
+        "resultados": resultados,
+    }
+    if args.salida:
+        with open(args.salida, "w") as f:
+            json.dump(salida, f, indent=2)
+        print(f"Resultados en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
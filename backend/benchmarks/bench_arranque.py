@@ -0,0 +1,129 @@
+# benchmarks/bench_arranque.py
+# Tiempo de arranque de un worker: importar main y ejecutar el lifespan, y cuántas
+# sentencias (y de ellas, de esquema: CREATE/PRAGMA/pg_catalog...) envía a la BD.
+# Cada medición es un proceso nuevo, como un worker de uvicorn/gunicorn.
+#   python -m benchmarks.bench_arranque [--url postgresql://...] [--repeticiones 5]
+#   python -m benchmarks.bench_arranque --presupuesto benchmarks/presupuesto_arranque.json [--salida arranque.json]
+# Sin --url usa un SQLite temporal (migrado antes con `python -m migraciones`).
+# Con --presupuesto (para CI) sale con código 1 si alguna mediana supera su máximo o si
+# main importa algún módulo de "no_importar" (los que se cargan con la primera petición);
+# --importtime N lista los N paquetes que más tardan en importarse (python -X importtime).
+import argparse
+import importlib.util
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+HIJO = r"""
+import json, re, sys, time
+t0 = time.perf_counter()
+from sqlalchemy import event
+import db
+sentencias = []
+for eng in {db.engine, db.async_engine.sync_engine, db.async_read_engine.sync_engine}:
+    event.listen(eng, "before_cursor_execute", lambda c, cur, sql, *a: sentencias.append(sql))
+t1 = time.perf_counter()
+import main
+t2 = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(main.app):
+    t3 = time.perf_counter()
+esquema = re.compile(r"\s*(CREATE|ALTER|DROP|PRAGMA)|.*(pg_catalog|information_schema|sqlite_master)", re.I | re.S)
+print(json.dumps({
+    "import_main_ms": (t2 - t1) * 1000,
+    "lifespan_ms": (t3 - t2) * 1000,
+    "total_ms": (t3 - t0) * 1000,
+    "sentencias": len(sentencias),
+    "sentencias_esquema": sum(1 for s in sentencias if esquema.match(s)),
+    "importados": sorted(m for m in sys.argv[1:] if m in sys.modules),
+}))
+"""
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLAVES = ("import_main_ms", "lifespan_ms", "total_ms", "sentencias", "sentencias_esquema")
+
+
+def medir(env, vigilar=()):
+    out = subprocess.run(
+        [sys.executable, "-c", HIJO, *vigilar], cwd=BACKEND, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def importtime(env, n):
+    """(ms acumulados, paquete) de los n paquetes de primer nivel más lentos al importar main."""
+    err = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"], cwd=BACKEND, env=env, capture_output=True, text=True
+    ).stderr
+    paquetes = {}
+    for linea in err.splitlines():
+        partes = linea.split("|")
+        if len(partes) != 3 or not partes[1].strip().isdigit():
+            continue
+        nombre = partes[2].strip()
+        if "." not in nombre and nombre != "main":
+            paquetes[nombre] = max(paquetes.get(nombre, 0), int(partes[1]) / 1000)
+    return sorted(((ms, p) for p, ms in paquetes.items()), reverse=True)[:n]
+
+
+def comprobar(resultado, presupuesto):
+    """Lista de incumplimientos del presupuesto (vacía si se cumple)."""
+    fallos = [
+        f"{clave}: {resultado[clave]:.1f} > {maximo}"
+        for clave, maximo in presupuesto.get("maximos", {}).items()
+        if resultado[clave] > maximo
+    ]
+    fallos += [f"main importa {m} al arrancar" for m in resultado["importados"]]
+    return fallos
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", help="DATABASE_URL (por defecto SQLite temporal)")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--presupuesto", help="JSON con maximos y no_importar (benchmarks/presupuesto_arranque.json)")
+    parser.add_argument("--salida", help="escribe las medianas en este JSON")
+    parser.add_argument("--importtime", type=int, default=0, metavar="N")
+    args = parser.parse_args()
+    presupuesto = {}
+    if args.presupuesto:
+        with open(args.presupuesto, encoding="utf-8") as f:
+            presupuesto = json.load(f)
+    vigilar = presupuesto.get("no_importar", [])
+
+    env = dict(os.environ)
+    if args.url:
+        env["DATABASE_URL"] = args.url
+    else:
+        env["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/arranque.db"
+        if importlib.util.find_spec("migraciones") is not None:
+            subprocess.run([sys.executable, "-m", "migraciones", "subir"], env=env, check=True, capture_output=True)
+
+    medir(env)  # calentamiento (.pyc, BD recién creada)
+    muestras = [medir(env, vigilar) for _ in range(args.repeticiones)]
+    resultado = {clave: statistics.median(m[clave] for m in muestras) for clave in CLAVES}
+    resultado["importados"] = sorted({i for m in muestras for i in m["importados"]})
+    print(f"url={env['DATABASE_URL']} repeticiones={args.repeticiones} (mediana)")
+    for clave in CLAVES:
+        maximo = presupuesto.get("maximos", {}).get(clave)
+        print(f"  {clave:<20} {resultado[clave]:.1f}" + (f"  (máx. {maximo})" if maximo is not None else ""))
+    if args.importtime:
+        print("importación más lenta (ms acumulados, -X importtime):")
+        for ms, paquete in importtime(env, args.importtime):
+            print(f"  {paquete:<20} {ms:.1f}")
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, indent=2)
+    if presupuesto:
+        fallos = comprobar(resultado, presupuesto)
+        for fallo in fallos:
+            print(f"PRESUPUESTO SUPERADO  {fallo}")
+        if fallos:
+            sys.exit(1)
+        print("presupuesto de arranque: OK")
+
+
+if __name__ == "__main__":
+    main()
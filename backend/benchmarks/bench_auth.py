@@ -0,0 +1,78 @@
+# benchmarks/bench_auth.py
+# Coste de la autenticación (auth.py): login con bcrypt, verificación completa del JWT
+# (HMAC + JSON + claims) y verificación desde la caché de tokens, más el overhead por
+# request en la API (GET de catálogo anónimo frente a con token).
+#   python -m benchmarks.bench_auth [--rondas 12] [--n 20000]
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from benchmarks.bench_carga import percentil
+
+
+class _U:
+    id = 1
+    correo = "u1@example.com"
+    nombre = "Usuario 1"
+    roles = "gestor,admin"
+
+
+def _us(fn, n):
+    muestras = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        fn()
+        muestras.append((time.perf_counter() - t0) * 1e6)
+    return f"p50={percentil(muestras, 50):.1f} p95={percentil(muestras, 95):.1f} µs"
+
+
+async def _api(token, n):
+    import httpx
+
+    import main
+    from benchmarks.bench_carga import cargar
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.app.router.lifespan_context(main.app):
+        for nombre, headers in (("anónimo", {}), ("con token", {"Authorization": f"Bearer {token}"})):
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as client:
+                await cargar(client, "/api/catalogos/estados", 8, 200)
+                r = await cargar(client, "/api/catalogos/estados", 16, n)
+            print(f"  GET catálogo {nombre:<10} {r['rps']:>8} req/s  p50={r['p50_ms']} p95={r['p95_ms']} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rondas", type=int, default=12, help="BCRYPT_RONDAS")
+    parser.add_argument("--n", type=int, default=20000)
+    args = parser.parse_args()
+    os.environ["BCRYPT_RONDAS"] = str(args.rondas)
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/auth.db")
+    os.environ["CACHE_MAX_BYTES"] = "0"
+
+    import auth
+    import migraciones
+    from benchmarks.common import new_session, seed_gestiones
+    from db import engine
+    from jose import jwt
+    from settings import get_settings
+
+    cfg = get_settings()
+    h = auth.hash_password("secreto")
+    print(f"bcrypt ({args.rondas} rondas), una vez por login: {_us(lambda: auth.verificar_password('secreto', h), 10)}")
+    token, _ = auth.crear_token(_U)
+    print(f"jwt.decode (sin caché):                  {_us(lambda: jwt.decode(token, cfg.jwt_secret, algorithms=[cfg.jwt_algoritmo]), args.n)}")
+    auth.verificar(token)
+    print(f"auth.verificar (caché por firma):       {_us(lambda: auth.verificar(token), args.n)}")
+    print(f"  {auth.cache_tokens.estadisticas()}")
+
+    migraciones.subir(engine)
+    with new_session(engine) as db:
+        seed_gestiones(db, 10)
+    asyncio.run(_api(token, min(args.n, 5000)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# benchmarks/bench_bulk.py
+# Eventos/seg: un POST por evento (commit + refresh cada uno) frente a la ingesta masiva.
+#   python -m benchmarks.bench_bulk [eventos]
+import asyncio
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from benchmarks.common import new_session, seed_gestiones, sqlite_engine, timed
+from catalogo_cache import get_catalogo_async
+from ingesta import ingestar_json
+from models import Evento, Gestion
+
+GESTIONES = 1000
+
+
+def _items(n):
+    # Eventos de comentario sin transición: el costo es el de escribir, no el de validar
+    return [{"gestion_id": (i % GESTIONES) + 1, "comentario": f"evento {i}"} for i in range(n)]
+
+
+async def por_evento(Session, cat, items):
+    for it in items:
+        async with Session() as db:
+            g = (await db.execute(select(Gestion).where(Gestion.id == it["gestion_id"]))).scalars().first()
+            cat.workflow.validar(g.estado_id, it.get("estado_id"), g.tipo, it["comentario"])
+            ev = Evento(gestion_id=g.id, comentario=it["comentario"], fecha=datetime.utcnow())
+            db.add(ev)
+            await db.commit()
+            await db.refresh(ev)
+
+
+async def masivo(Session, cat, items):
+    async with Session() as db:
+        resultados = await ingestar_json(db, cat, items)
+    assert all(r["ok"] for r in resultados)
+
+
+async def main(n):
+    path = tempfile.mktemp(suffix=".db")
+    engine = sqlite_engine(path)
+    with new_session(engine) as db:
+        seed_gestiones(db, GESTIONES)
+    aengine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    Session = async_sessionmaker(aengine, expire_on_commit=False)
+    async with Session() as db:
+        cat = await get_catalogo_async(db)
+    items = _items(n)
+    print(f"{'camino':>10} {'eventos':>8} {'ms':>10} {'eventos/s':>10}")
+    for nombre, fn in (("por_evento", por_evento), ("bulk", masivo)):
+        with timed() as t:
+            await fn(Session, cat, items)
+        print(f"{nombre:>10} {n:>8} {t['ms']:>10.1f} {n / (t['ms'] / 1000):>10.0f}")
+    await aengine.dispose()
+    engine.dispose()
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000))
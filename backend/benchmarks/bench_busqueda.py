@@ -0,0 +1,45 @@
+# benchmarks/bench_busqueda.py
+# Latencia de búsqueda: ILIKE '%term%' (camino anterior) frente al índice invertido
+# en memoria que usa busqueda.py cuando el motor no es Postgres.
+#   python -m benchmarks.bench_busqueda [filas]      (p.ej. 1000000)
+import statistics
+import sys
+
+from sqlalchemy import select
+
+from benchmarks.common import new_session, seed_gestiones, sqlite_engine, timed
+from busqueda import IndiceInvertido
+from models import Gestion
+
+TERMINOS = ["gestion 12345", "descripcion 777", "gestion 9", "reclamo"]
+
+
+def main(n):
+    engine = sqlite_engine()
+    with new_session(engine) as db:
+        seed_gestiones(db, n)
+        with timed() as t:
+            indice = IndiceInvertido(db.execute(select(Gestion.id, Gestion.nombre, Gestion.descripcion)).all())
+        print(f"filas={n} construcción del índice: {t['ms']:.0f} ms")
+        print(f"{'termino':>18} {'ilike ms':>10} {'indice ms':>10} {'prefijo ms':>10}")
+        for term in TERMINOS:
+            ilike, texto, prefijo = [], [], []
+            for _ in range(5):
+                with timed() as t:
+                    db.execute(select(Gestion.id).where(Gestion.nombre.ilike(f"%{term}%")).limit(20)).all()
+                ilike.append(t["ms"])
+                with timed() as t:
+                    indice.buscar(term, "texto", 20)
+                texto.append(t["ms"])
+                with timed() as t:
+                    indice.buscar(term, "prefijo", 20)
+                prefijo.append(t["ms"])
+            print(
+                f"{term:>18} {statistics.median(ilike):>10.2f} "
+                f"{statistics.median(texto):>10.2f} {statistics.median(prefijo):>10.2f}"
+            )
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,85 @@
+# benchmarks/bench_carga.py
+# Generador de carga HTTP concurrente: requests/seg y latencias p50/p95/p99.
+# Sirve para comparar dos despliegues (p.ej. la API síncrona anterior en :8001
+# y la async en :8000, ambas contra el mismo Postgres):
+#   uvicorn main:app --port 8000 --workers 1
+#   python -m benchmarks.bench_carga --url http://localhost:8000 --url http://localhost:8001 \
+#       --path /api/gestiones/1 --concurrencia 64 --total 5000
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+
+def percentil(valores, p):
+    if not valores:
+        return None
+    orden = sorted(valores)
+    k = min(len(orden) - 1, max(0, round(p / 100 * (len(orden) - 1))))
+    return orden[k]
+
+
+async def cargar(client, path, concurrencia, total):
+    """path: ruta para GET, o función i -> (método, ruta, json) para mezclar peticiones."""
+    peticion = path if callable(path) else (lambda i: ("GET", path, None))
+    latencias = []
+    errores = 0
+    hits = 0
+    pendientes = iter(range(total))
+
+    async def cliente():
+        nonlocal errores, hits
+        for i in pendientes:
+            metodo, ruta, cuerpo = peticion(i)
+            t0 = time.perf_counter()
+            try:
+                r = await client.request(metodo, ruta, json=cuerpo)
+                if r.status_code >= 400:
+                    errores += 1
+                elif r.headers.get("x-cache") == "HIT":
+                    hits += 1
+            except httpx.HTTPError:
+                errores += 1
+            latencias.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(cliente() for _ in range(concurrencia)))
+    duracion = time.perf_counter() - t0
+    return {
+        "path": path if isinstance(path, str) else None,
+        "concurrencia": concurrencia,
+        "requests": len(latencias),
+        "errores": errores,
+        "cache_hits": hits,
+        "rps": round(len(latencias) / duracion, 1),
+        "p50_ms": round(percentil(latencias, 50), 2),
+        "p95_ms": round(percentil(latencias, 95), 2),
+        "p99_ms": round(percentil(latencias, 99), 2),
+    }
+
+
+async def main(args):
+    resultados = []
+    limits = httpx.Limits(max_connections=args.concurrencia, max_keepalive_connections=args.concurrencia)
+    for url in args.url:
+        async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+            for path in args.path:
+                await cargar(client, path, args.concurrencia, min(args.total, 100))  # calentamiento
+                res = await cargar(client, path, args.concurrencia, args.total)
+                res["url"] = url
+                resultados.append(res)
+                print(json.dumps(res))
+    return resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generador de carga HTTP concurrente")
+    parser.add_argument("--url", action="append", required=True)
+    parser.add_argument("--path", action="append", default=None)
+    parser.add_argument("--concurrencia", type=int, default=64)
+    parser.add_argument("--total", type=int, default=2000)
+    args = parser.parse_args()
+    args.path = args.path or ["/api/gestiones/", "/api/gestiones/1", "/api/catalogos/estados"]
+    asyncio.run(main(args))
@@ -0,0 +1,156 @@
+# benchmarks/bench_contencion.py
+# Transiciones concurrentes sobre pocas gestiones "calientes" (control optimista con
+# gestion.version): cada escritor lee el estado y pide la transición al otro estado del
+# ciclo 1 <-> 2, o hace PUT con If-Match de la versión leída. Mide escrituras/s, latencias,
+# rechazos (400 tras revalidar, 412, 409) y conflictos, y al final comprueba que:
+#   - cada historia de eventos sólo contiene transiciones permitidas desde el estado previo
+#   - version = 1 + cambios de estado confirmados + PUT confirmados (sin escrituras perdidas)
+#   python -m benchmarks.bench_contencion [--calientes 4] [--concurrencia 1,8,32] [--total 1000]
+#   python -m benchmarks.bench_contencion --db postgresql://postgres@localhost/bench   (desechable)
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+
+from benchmarks.bench_carga import percentil
+
+MODOS = ("directo", "agrupado")
+
+
+def preparar(url, calientes):
+    import migraciones
+    from benchmarks.common import new_session, seed_gestiones
+    from db import make_engine
+    from models import EstadoTransicion
+
+    engine = make_engine(url)
+    migraciones.subir(engine)
+    with new_session(engine) as db:
+        seed_gestiones(db, calientes, estado_inicial=1)
+        # Ciclo 1 -> 2 -> 1 para que las transiciones no se agoten
+        db.add(EstadoTransicion(from_estado_id=2, to_estado_id=1))
+        db.commit()
+    engine.dispose()
+
+
+async def escritor(client, rnd, calientes, pendientes, out):
+    for i in pendientes:
+        gid = rnd.randint(1, calientes)
+        t0 = time.perf_counter()
+        g = (await client.get(f"/api/gestiones/{gid}")).json()
+        if i % 5:
+            destino = 2 if g["estado_id"] == 1 else 1
+            r = await client.post(
+                f"/api/gestiones/{gid}/eventos",
+                json={"estado_id": destino, "apply_transition": True, "comentario": f"c{i}"},
+            )
+            clave = "transicion"
+        else:
+            cuerpo = {k: g[k] for k in ("nombre", "descripcion", "estado_id", "responsable_id", "tipo")}
+            cuerpo["nombre"] = f"Gestion {gid} ({i})"
+            r = await client.put(f"/api/gestiones/{gid}", json=cuerpo, headers={"If-Match": f'"{g["version"]}"'})
+            clave = "put"
+        out["latencias"].append((time.perf_counter() - t0) * 1000)
+        out["estados"][(clave, r.status_code)] += 1
+
+
+def comprobar(url, confirmadas):
+    """(transiciones no permitidas en las historias, gestiones cuyo estado no es el de su
+    historia, suma de versiones == 1 por gestión + escrituras confirmadas)."""
+    from sqlalchemy import func, select
+
+    from benchmarks.common import new_session
+    from db import make_engine
+    from models import EstadoTransicion, Evento, Gestion
+
+    engine = make_engine(url)
+    with new_session(engine) as db:
+        permitidas = set(db.execute(select(EstadoTransicion.from_estado_id, EstadoTransicion.to_estado_id)).all())
+        invalidas = descuadradas = 0
+        gestiones = db.execute(select(Gestion.id, Gestion.estado_id)).all()
+        for gid, estado_actual in gestiones:
+            estado = 1
+            for (destino,) in db.execute(
+                select(Evento.estado_id).where(Evento.gestion_id == gid, Evento.estado_id.is_not(None)).order_by(Evento.id)
+            ):
+                invalidas += (estado, destino) not in permitidas
+                estado = destino
+            descuadradas += estado_actual != estado
+        versiones = db.execute(select(func.sum(Gestion.version))).scalar()
+    engine.dispose()
+    return invalidas, descuadradas, versiones == len(gestiones) + confirmadas
+
+
+async def medir(modo, concurrencias, total, calientes):
+    import httpx
+
+    import main
+    from instrumentacion import metricas
+    from settings import get_settings
+
+    os.environ["ESCRITURA_AGRUPADA"] = "true" if modo == "agrupado" else "false"
+    get_settings.cache_clear()
+    transport = httpx.ASGITransport(app=main.app, raise_app_exceptions=False)
+    resultados = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        async with main.app.router.lifespan_context(main.app):
+            for concurrencia in concurrencias:
+                out = {"latencias": [], "estados": Counter()}
+                conflictos = metricas.conflictos
+                pendientes = iter(range(total))
+                t0 = time.perf_counter()
+                await asyncio.gather(
+                    *(escritor(client, random.Random(k), calientes, pendientes, out) for k in range(concurrencia))
+                )
+                duracion = time.perf_counter() - t0
+                ok = sum(n for (_, s), n in out["estados"].items() if s == 200)
+                res = {
+                    "modo": modo,
+                    "concurrencia": concurrencia,
+                    "escrituras_ok_s": round(ok / duracion, 1),
+                    "p50_ms": round(percentil(out["latencias"], 50), 2),
+                    "p95_ms": round(percentil(out["latencias"], 95), 2),
+                    "conflictos": metricas.conflictos - conflictos,
+                    "respuestas": {f"{c}:{s}": n for (c, s), n in sorted(out["estados"].items())},
+                }
+                resultados.append(res)
+                print(
+                    f"{modo:<9} c={concurrencia:<3} {res['escrituras_ok_s']:>7} ok/s  p50={res['p50_ms']} "
+                    f"p95={res['p95_ms']} ms  conflictos={res['conflictos']}  {res['respuestas']}"
+                )
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transiciones concurrentes sobre gestiones calientes")
+    parser.add_argument("--db", help="URL de una BD vacía y desechable (por defecto SQLite temporal)")
+    parser.add_argument("--calientes", type=int, default=4)
+    parser.add_argument("--concurrencia", default="1,8,32")
+    parser.add_argument("--total", type=int, default=1000)
+    args = parser.parse_args()
+
+    url = args.db or f"sqlite:///{tempfile.mkdtemp()}/contencion.db"
+    # db.py crea los motores al importarse: fijar la BD antes de importar
+    os.environ["DATABASE_URL"] = url
+    os.environ["CACHE_MAX_BYTES"] = "0"
+    preparar(url, args.calientes)
+    concurrencias = [int(c) for c in args.concurrencia.split(",")]
+
+    async def todo():
+        return [r for modo in MODOS for r in await medir(modo, concurrencias, args.total, args.calientes)]
+
+    resultados = asyncio.run(todo())
+    cambios = sum(
+        n for r in resultados for clave, n in r["respuestas"].items() if clave in ("transicion:200", "put:200")
+    )
+    invalidas, descuadradas, version_ok = comprobar(url, cambios)
+    print(f"\ntransiciones no permitidas en las historias: {invalidas}")
+    print(f"gestiones con estado distinto al de su historia: {descuadradas}")
+    print(f"suma de versiones = 1 por gestión + escrituras confirmadas: {version_ok}")
+
+
+if __name__ == "__main__":
+    main()
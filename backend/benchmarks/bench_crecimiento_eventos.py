@@ -0,0 +1,111 @@
+# benchmarks/bench_crecimiento_eventos.py
+# Latencia de insertar un evento y de leer la historia de una gestión a medida que crece
+# evento, y la lectura de una gestión con historia archivada (archivo_eventos.py).
+#   python -m benchmarks.bench_crecimiento_eventos [--tamanos 100000,1000000,5000000]
+#   python -m benchmarks.bench_crecimiento_eventos --db postgresql://...   (BD desechable;
+#       con las migraciones al día evento está particionada por mes)
+import argparse
+import os
+import random
+import tempfile
+from datetime import datetime
+
+from sqlalchemy import func, select
+
+import archivo_eventos
+import migraciones
+import particiones
+import resumen
+from benchmarks.bench_carga import percentil
+from benchmarks.common import ESTADOS, new_session, seed_eventos, seed_gestiones, timed
+from db import make_engine
+from models import Evento, EventoArchivado
+from queries import EVENTO_COLUMNS
+from settings import get_settings
+
+GESTIONES = 10000
+MUESTRAS = 300
+# Pocas transiciones por evento: al final una parte de las gestiones sigue abierta
+PROB_TRANSICION = 0.02
+
+
+def _p(valores):
+    return f"p50={percentil(valores, 50):.2f} p95={percentil(valores, 95):.2f} ms"
+
+
+def medir_insercion(db, rnd):
+    """Un evento por transacción, como create_evento."""
+    latencias = []
+    for _ in range(MUESTRAS):
+        with timed() as t:
+            db.execute(
+                Evento.__table__.insert().values(
+                    gestion_id=rnd.randint(1, GESTIONES), fecha=datetime.utcnow(), comentario="bench"
+                )
+            )
+            db.commit()
+        latencias.append(t["ms"])
+    return latencias
+
+
+def medir_lectura(db, rnd, gestion_ids):
+    """Historia de una gestión (la consulta del detalle), más archivo si lo tiene."""
+    latencias = []
+    for _ in range(MUESTRAS):
+        gid = rnd.choice(gestion_ids)
+        with timed() as t:
+            db.execute(
+                select(*EVENTO_COLUMNS).where(Evento.gestion_id == gid).order_by(Evento.fecha, Evento.id)
+            ).all()
+            segmentos = db.execute(archivo_eventos.segmentos_query(gid)).scalars().all()
+            if segmentos:
+                archivo_eventos.leer(segmentos)
+        latencias.append(t["ms"])
+    return latencias
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", help="URL de una BD desechable (por defecto SQLite temporal)")
+    parser.add_argument("--tamanos", default="100000,500000,1000000")
+    args = parser.parse_args()
+    url = args.db or f"sqlite:///{tempfile.mkdtemp()}/crecimiento.db"
+    # Archivo en un directorio temporal (settings ya se leyó al importar db)
+    os.environ.setdefault("ARCHIVO_EVENTOS_DIR", tempfile.mkdtemp())
+    get_settings.cache_clear()
+
+    engine = make_engine(url)
+    migraciones.subir(engine)
+    rnd = random.Random(3)
+    with new_session(engine) as db:
+        with engine.connect() as conn:
+            print(f"db={engine.dialect.name} evento particionada={particiones.particionada(conn)}")
+        seed_gestiones(db, GESTIONES, estado_inicial=ESTADOS[0][0])
+        ids = list(range(1, GESTIONES + 1))
+        total = 0
+        for tamano in (int(x) for x in args.tamanos.split(",")):
+            siguiente = (db.execute(select(func.max(Evento.id))).scalar() or 0) + 1
+            seed_eventos(db, tamano - total, prob_transicion=PROB_TRANSICION, desde_id=siguiente)
+            total = tamano
+            print(f"evento={tamano}")
+            print(f"  insertar (1 por commit):  {_p(medir_insercion(db, rnd))}")
+            print(f"  historia de una gestión:  {_p(medir_lectura(db, rnd, ids))}")
+
+        # Archivo: gestiones cerradas fuera de evento, su historia desde el .jsonl.gz
+        resumen.reconstruir(db)
+        with timed() as t:
+            g, e = archivo_eventos.archivar(db, dias=0, log=lambda *a: None)
+        print(f"archivadas {g} gestiones / {e} eventos en {t['ms'] / 1000:.1f} s")
+        quedan = db.execute(select(func.count()).select_from(Evento)).scalar()
+        archivadas = db.execute(select(EventoArchivado.gestion_id).distinct()).scalars().all()
+        abiertas = sorted(set(ids) - set(archivadas))
+        print(f"evento={quedan} tras archivar")
+        print(f"  insertar (1 por commit):  {_p(medir_insercion(db, rnd))}")
+        if abiertas:
+            print(f"  historia (en evento):     {_p(medir_lectura(db, rnd, abiertas))}")
+        if archivadas:
+            print(f"  historia (archivada):     {_p(medir_lectura(db, rnd, archivadas))}")
+
+
+if __name__ == "__main__":
+    main()
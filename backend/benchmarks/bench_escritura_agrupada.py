@@ -0,0 +1,110 @@
+# benchmarks/bench_escritura_agrupada.py
+# POST /api/gestiones/{id}/eventos con commit por evento frente a la escritura agrupada
+# (escritor_eventos.py, ESCRITURA_AGRUPADA): eventos/s, p50/p95/p99 y commits por evento
+# para cada concurrencia. La app corre en el proceso, con su lifespan, sobre la BD de bench_api.
+#   python -m benchmarks.bench_escritura_agrupada [--concurrencia 1,16,64,256] [--total 2000]
+#   python -m benchmarks.bench_escritura_agrupada --db postgresql://postgres@localhost/bench
+import argparse
+import asyncio
+import os
+import tempfile
+
+from sqlalchemy import event
+
+from benchmarks.bench_api import peticiones, sembrar
+
+MODOS = ("directo", "agrupado")
+
+
+class _Commits:
+    """Cuenta COMMIT enviados al driver mientras está activo."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_commit(self, conn):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, "commit", self._on_commit)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "commit", self._on_commit)
+
+
+async def medir(modo, concurrencias, total, n_gestiones, args):
+    import httpx
+
+    import db
+    import escritor_eventos
+    import main
+    from benchmarks.bench_carga import cargar
+    from benchmarks.common import QueryCounter
+    from settings import get_settings
+
+    os.environ["ESCRITURA_AGRUPADA"] = "true" if modo == "agrupado" else "false"
+    os.environ["ESCRITURA_LOTE_MAX"] = str(args.lote_max)
+    os.environ["ESCRITURA_ESPERA_MS"] = str(args.espera_ms)
+    get_settings.cache_clear()
+
+    motor = db.async_engine.sync_engine
+    peticion = peticiones("create_evento", n_gestiones)
+    transport = httpx.ASGITransport(app=main.app, raise_app_exceptions=False)
+    resultados = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        async with main.app.router.lifespan_context(main.app):
+            await cargar(client, peticion, 8, 100)  # calentamiento
+            for concurrencia in concurrencias:
+                with QueryCounter(motor) as consultas, _Commits(motor) as commits:
+                    res = await cargar(client, peticion, concurrencia, total)
+                res.update(
+                    modo=modo,
+                    consultas_por_evento=round(consultas.count / res["requests"], 2),
+                    commits_por_evento=round(commits.count / res["requests"], 3),
+                )
+                resultados.append(res)
+                print(
+                    f"{modo:<9} c={concurrencia:<4} {res['rps']:>8} ev/s  p50={res['p50_ms']} "
+                    f"p95={res['p95_ms']} p99={res['p99_ms']} ms  consultas/ev={res['consultas_por_evento']} "
+                    f"commits/ev={res['commits_por_evento']} errores={res['errores']}"
+                )
+            if escritor_eventos.escritor is not None:
+                print(f"          {escritor_eventos.escritor.estadisticas()}")
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Commit por evento frente a escritura agrupada")
+    parser.add_argument("--db", help="ruta SQLite o URL de BD desechable (por defecto la de bench_api)")
+    parser.add_argument("--gestiones", type=int, default=10000)
+    parser.add_argument("--eventos", type=int, default=200000)
+    parser.add_argument("--concurrencia", default="1,16,64,256")
+    parser.add_argument("--total", type=int, default=2000)
+    parser.add_argument("--lote-max", type=int, default=200)
+    parser.add_argument("--espera-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    url = args.db or os.path.join(tempfile.gettempdir(), f"bench_api_{args.gestiones}_{args.eventos}.db")
+    if "://" not in url:
+        url = f"sqlite:///{url}"
+    # db.py crea los motores al importarse: fijar la BD antes de importar
+    os.environ["DATABASE_URL"] = url
+    os.environ["CACHE_MAX_BYTES"] = "0"
+    n_gestiones, _ = sembrar(url, args.gestiones, args.eventos)
+    concurrencias = [int(c) for c in args.concurrencia.split(",")]
+
+    async def todo():
+        return [r for modo in MODOS for r in await medir(modo, concurrencias, args.total, n_gestiones, args)]
+
+    resultados = asyncio.run(todo())
+    print(f"\n{'concurrencia':<13} {'ev/s directo -> agrupado':>28} {'p95 ms directo -> agrupado':>30}")
+    for c in concurrencias:
+        a, b = (next(r for r in resultados if r["modo"] == m and r["concurrencia"] == c) for m in MODOS)
+        rps, p95 = f"{a['rps']} -> {b['rps']}", f"{a['p95_ms']} -> {b['p95_ms']}"
+        print(f"{c:<13} {rps:>28} {p95:>30}")
+
+
+if __name__ == "__main__":
+    main()
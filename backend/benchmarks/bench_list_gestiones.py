@@ -0,0 +1,52 @@
+# benchmarks/bench_list_gestiones.py
+# Compara el listado anterior (ORM + SELECT tipo por fila) con la consulta proyectada.
+# El número de consultas del camino nuevo debe ser constante al crecer las filas.
+#   python -m benchmarks.bench_list_gestiones [n1 n2 ...]
+import sys
+
+from sqlalchemy import text
+
+from benchmarks.common import QueryCounter, new_session, seed_gestiones, sqlite_engine, timed
+from models import Gestion
+from queries import gestiones_query, serialize_gestion_row
+from serializers import to_iso_z
+
+
+def legacy_list(db):
+    out = []
+    for g in db.query(Gestion).all():
+        row = db.execute(text("SELECT tipo FROM gestion WHERE id = :id"), {"id": g.id}).fetchone()
+        out.append(
+            {
+                "id": g.id,
+                "nombre": g.nombre,
+                "descripcion": g.descripcion,
+                "estado_id": g.estado_id,
+                "tipo": row[0] if row is not None else None,
+                "responsable_id": g.responsable_id,
+                "fecha_creacion": to_iso_z(g.fecha_creacion),
+            }
+        )
+    return out
+
+
+def projected_list(db):
+    return [serialize_gestion_row(r) for r in db.execute(gestiones_query())]
+
+
+def main(sizes):
+    print(f"{'filas':>8} {'camino':>10} {'consultas':>10} {'ms':>10}")
+    for n in sizes:
+        engine = sqlite_engine()
+        with new_session(engine) as db:
+            seed_gestiones(db, n)
+        for name, fn in (("legacy", legacy_list), ("proyectado", projected_list)):
+            with new_session(engine) as db, QueryCounter(engine) as qc, timed() as t:
+                rows = fn(db)
+            assert len(rows) == n
+            print(f"{n:>8} {name:>10} {qc.count:>10} {t['ms']:>10.1f}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [100, 1000, 10000])
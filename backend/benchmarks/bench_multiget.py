@@ -0,0 +1,85 @@
+# benchmarks/bench_multiget.py
+# Resolver responsable/estado de una página de gestiones como lo hacía el frontend (un
+# GET /api/gestiones/{id} por fila, o la tabla de usuarios completa + catálogo) frente a
+# ?nombres=true y al multi-get ?ids=...&nombres=true (cargadores.py): consultas y ms por
+# página. La app corre en el proceso, con su lifespan y sin caché de respuestas.
+#   python -m benchmarks.bench_multiget [--filas 20,100,500] [--usuarios 5000]
+import argparse
+import asyncio
+import os
+import tempfile
+
+
+async def por_fila(client, n):
+    pagina = (await client.get(f"/api/gestiones/?limit={n}")).json()
+    return [(await client.get(f"/api/gestiones/{g['id']}")).json() for g in pagina]
+
+
+async def tabla_completa(client, n):
+    pagina = (await client.get(f"/api/gestiones/?limit={n}")).json()
+    usuarios = {u["id"]: u["nombre"] for u in (await client.get("/api/usuarios/")).json()}
+    estados = {e["id"]: e["nombre"] for e in (await client.get("/api/catalogos/estados")).json()}
+    for g in pagina:
+        g["responsable_nombre"] = usuarios.get(g["responsable_id"])
+        g["estado_nombre"] = estados.get(g["estado_id"])
+    return pagina
+
+
+async def nombres(client, n):
+    return (await client.get(f"/api/gestiones/?limit={n}&nombres=true")).json()
+
+
+async def multiget(client, n, ids):
+    return (await client.get(f"/api/gestiones/?ids={','.join(map(str, ids[:n]))}&nombres=true")).json()
+
+
+async def medir(filas, ids):
+    import httpx
+
+    import db
+    import main
+    from benchmarks.common import QueryCounter, timed
+
+    caminos = (
+        ("por fila", por_fila),
+        ("tabla completa", tabla_completa),
+        ("nombres=true", nombres),
+        ("multi-get ids", lambda c, n: multiget(c, n, ids)),
+    )
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        async with main.app.router.lifespan_context(main.app):
+            print(f"{'filas':>6} {'camino':>15} {'consultas':>10} {'ms':>9}")
+            for n in filas:
+                for nombre, fn in caminos:
+                    await fn(client, n)  # calentamiento
+                    with QueryCounter(db.async_engine.sync_engine) as qc, timed() as t:
+                        out = await fn(client, n)
+                    assert len(out) == n and all(g.get("responsable_nombre") for g in out), nombre
+                    print(f"{n:>6} {nombre:>15} {qc.count:>10} {t['ms']:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filas", default="20,100,500")
+    parser.add_argument("--usuarios", type=int, default=5000)
+    args = parser.parse_args()
+    filas = [int(f) for f in args.filas.split(",")]
+
+    # db.py crea los motores al importarse: fijar la BD antes de importar
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/multiget.db"
+    os.environ["CACHE_MAX_BYTES"] = "0"
+    import migraciones
+    from benchmarks.common import new_session, seed_gestiones
+    from db import engine
+
+    migraciones.subir(engine)
+    with new_session(engine) as db:
+        seed_gestiones(db, max(filas), usuarios=args.usuarios)
+    # Orden distinto al del listado: el multi-get devuelve el de ids
+    ids = list(range(max(filas), 0, -1))
+    asyncio.run(medir(filas, ids))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+# benchmarks/bench_paginacion.py
+# Costo de la página N: OFFSET frente a keyset sobre (fecha_creacion, id).
+#   python -m benchmarks.bench_paginacion [filas]
+import sys
+
+from sqlalchemy import select
+
+from benchmarks.common import new_session, seed_gestiones, sqlite_engine, timed
+from models import Gestion
+from pagination import split_page
+from queries import GESTION_COLUMNS, gestiones_query
+
+LIMIT = 100
+
+
+def main(n):
+    engine = sqlite_engine()
+    with new_session(engine) as db:
+        seed_gestiones(db, n)
+        offset_stmt = select(*GESTION_COLUMNS).order_by(Gestion.fecha_creacion, Gestion.id)
+        print(f"{'pagina':>8} {'offset ms':>10} {'keyset ms':>10}")
+        cursor, page = None, 0
+        checkpoints = {1, 10, 100, n // LIMIT // 2, n // LIMIT}
+        while True:
+            page += 1
+            with timed() as tk:
+                rows = db.execute(gestiones_query(cursor=cursor).limit(LIMIT + 1)).all()
+            rows, cursor = split_page(rows, LIMIT, lambda r: (r.fecha_creacion, r.id))
+            if page in checkpoints:
+                with timed() as to:
+                    db.execute(offset_stmt.offset((page - 1) * LIMIT).limit(LIMIT)).all()
+                print(f"{page:>8} {to['ms']:>10.2f} {tk['ms']:>10.2f}")
+            if cursor is None:
+                break
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,68 @@
+# benchmarks/bench_serializacion.py
+# Coste de serializar un listado: dicts a mano + _to_iso_z original + jsonable_encoder
+# + json.dumps (camino anterior) frente a row_serializer precompilado + orjson.
+#   python -m benchmarks.bench_serializacion [filas]      (p.ej. 100000)
+import json
+import statistics
+import sys
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from fastapi.encoders import jsonable_encoder
+
+from benchmarks.common import timed
+from queries import GESTION_COLUMNS, serialize_gestion_row
+from serializers import _to_iso_z_lento, dumps
+
+Fila = namedtuple("Fila", [c.key for c in GESTION_COLUMNS])
+
+
+def filas(n):
+    base = datetime(2024, 1, 1)
+    return [
+        Fila(i, f"Gestión {i}", f"Descripción {i}", i % 6 + 1, "reclamo", i % 20 + 1, base + timedelta(seconds=i))
+        for i in range(1, n + 1)
+    ]
+
+
+def anterior(rows):
+    data = [
+        {
+            "id": r.id,
+            "nombre": r.nombre,
+            "descripcion": r.descripcion,
+            "estado_id": r.estado_id,
+            "tipo": r.tipo,
+            "responsable_id": r.responsable_id,
+            "fecha_creacion": _to_iso_z_lento(r.fecha_creacion),
+        }
+        for r in rows
+    ]
+    return json.dumps(jsonable_encoder(data), ensure_ascii=False).encode()
+
+
+def nuevo(rows):
+    return dumps([serialize_gestion_row(r) for r in rows])
+
+
+def medir(fn, rows, repeticiones=5):
+    tiempos = []
+    for _ in range(repeticiones):
+        with timed() as t:
+            fn(rows)
+        tiempos.append(t["ms"])
+    return statistics.median(tiempos)
+
+
+def main(n):
+    rows = filas(n)
+    assert json.loads(anterior(rows[:50])) == json.loads(nuevo(rows[:50]))
+    t_ant = medir(anterior, rows)
+    t_new = medir(nuevo, rows)
+    print(f"filas={n}")
+    print(f"{'anterior (dict + jsonable_encoder + json)':>45}: {t_ant:8.1f} ms")
+    print(f"{'nuevo (row_serializer + orjson)':>45}: {t_new:8.1f} ms  (x{t_ant / t_new:.1f})")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
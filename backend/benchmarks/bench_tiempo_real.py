@@ -0,0 +1,57 @@
+# benchmarks/bench_tiempo_real.py
+# Fan-out del hub de tiempo_real.py: N clientes suscritos (a todo, a una gestión o a un
+# estado), costo de publicar y comportamiento con clientes que no leen (backpressure).
+#   python -m benchmarks.bench_tiempo_real [clientes]      (p.ej. 10000)
+import asyncio
+import sys
+
+from benchmarks.common import timed
+from tiempo_real import Hub
+
+MENSAJES = 200
+
+
+async def main(n):
+    hub = Hub(cola_maxima=100)
+    hub.vincular(asyncio.get_running_loop())
+    subs = []
+    for i in range(n):
+        if i % 3 == 0:
+            subs.append(hub.suscribir())
+        elif i % 3 == 1:
+            subs.append(hub.suscribir(gestiones=[i % 500]))
+        else:
+            subs.append(hub.suscribir(estados=[i % 4 + 1]))
+
+    # Lectores activos: la mitad de los clientes consume; la otra mitad nunca lee
+    recibidos = 0
+
+    async def lector(sub):
+        nonlocal recibidos
+        while True:
+            mensajes = await sub.siguientes(1.0)
+            recibidos += len(mensajes)
+
+    lectores = [asyncio.create_task(lector(s)) for s in subs[::2]]
+    await asyncio.sleep(0)
+
+    publicar_ms = 0.0
+    for i in range(MENSAJES):
+        with timed() as t:
+            hub.publicar({"tipo": "evento", "gestion_id": i % 500, "estado_id": i % 4 + 1, "estado_anterior": 1})
+        publicar_ms += t["ms"]
+        if i % 20 == 0:
+            # Deja correr a los lectores (no cuenta en el tiempo de publicar)
+            await asyncio.sleep(0)
+    await asyncio.sleep(0.5)
+    for tarea in lectores:
+        tarea.cancel()
+
+    print(f"clientes={n} mensajes={MENSAJES}")
+    print(f"  publicar (fan-out en cola): {publicar_ms:.1f} ms total, {publicar_ms / MENSAJES * 1000:.0f} us/mensaje")
+    print(f"  entregas={hub.entregas} recibidos por lectores={recibidos} desbordes (resync)={hub.desbordes}")
+    print(f"  mensajes máx. en cola de un cliente que no lee: {max(s.cola.qsize() for s in subs[1::2])}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000))
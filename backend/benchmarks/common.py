@@ -0,0 +1,131 @@
+# benchmarks/common.py
+# Utilidades compartidas por los benchmarks: BD SQLite desechable y contador de consultas.
+# Ejecutar desde backend/:  python -m benchmarks.<modulo>
+import random
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from sqlalchemy import bindparam, create_engine, event, select, update
+from sqlalchemy.orm import sessionmaker
+
+from db import Base
+from models import CatalogoEstado, EstadoTransicion, Evento, Usuario, Gestion
+
+ESTADOS = [(1, "Recibida", 1, False), (2, "En proceso", 2, False), (3, "Finalizada", 3, True), (4, "Cancelada", 4, True)]
+TRANSICIONES = [(1, 2), (1, 4), (2, 3), (2, 4)]
+TIPOS = ["Reclamo", "Solicitud", "Consulta", None]
+
+
+def sqlite_engine(path=":memory:"):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+def seed_gestiones(session, n, usuarios=20, seed=42, estado_inicial=None):
+    """
+    Catálogo fijo + n gestiones con tipo/estado/responsable aleatorios (insert masivo).
+    Con estado_inicial todas empiezan en ese estado (p.ej. para seed_eventos).
+    """
+    rnd = random.Random(seed)
+    session.add_all(CatalogoEstado(id=i, nombre=nm, orden=o, is_terminal=t) for i, nm, o, t in ESTADOS)
+    session.add_all(EstadoTransicion(from_estado_id=a, to_estado_id=b) for a, b in TRANSICIONES)
+    session.add_all(Usuario(id=i, nombre=f"Usuario {i}", correo=f"u{i}@example.com") for i in range(1, usuarios + 1))
+    session.flush()
+    base = datetime(2024, 1, 1)
+    session.execute(
+        Gestion.__table__.insert(),
+        [
+            {
+                "id": i,
+                "nombre": f"Gestion {i}",
+                "descripcion": f"Descripcion de la gestion {i}",
+                "estado_id": estado_inicial or rnd.randint(1, 4),
+                "responsable_id": rnd.randint(1, usuarios),
+                "fecha_creacion": base + timedelta(minutes=i),
+                "tipo": rnd.choice(TIPOS),
+            }
+            for i in range(1, n + 1)
+        ],
+    )
+    session.commit()
+
+
+def seed_eventos(session, n, usuarios=20, prob_transicion=0.3, desde_id=1, seed=7, lote=50000):
+    """
+    n eventos sobre las gestiones existentes, con cadenas que respetan estado_transiciones:
+    cada evento es, con prob_transicion, un paso a un estado permitido (si lo hay) y si no
+    un comentario (estado_id NULL). Fechas crecientes por gestión; inserta por lotes y deja
+    gestion.estado_id en el último estado de su cadena.
+    """
+    rnd = random.Random(seed + desde_id)
+    siguientes = {}
+    for a, b in session.execute(select(EstadoTransicion.from_estado_id, EstadoTransicion.to_estado_id)):
+        siguientes.setdefault(a, []).append(b)
+    estados, ultima = {}, {}
+    for gid, estado, fecha in session.execute(select(Gestion.id, Gestion.estado_id, Gestion.fecha_creacion)):
+        estados[gid], ultima[gid] = estado, fecha
+    ids = list(estados)
+    cambiadas = set()
+    filas = []
+    for i in range(desde_id, desde_id + n):
+        gid = rnd.choice(ids)
+        ultima[gid] += timedelta(minutes=rnd.randint(1, 3000))
+        opciones = siguientes.get(estados[gid])
+        estado = None
+        if opciones and rnd.random() < prob_transicion:
+            estado = estados[gid] = rnd.choice(opciones)
+            cambiadas.add(gid)
+        filas.append(
+            {
+                "id": i,
+                "gestion_id": gid,
+                "usuario_id": rnd.randint(1, usuarios),
+                "fecha": ultima[gid],
+                "comentario": f"Evento {i}",
+                "estado_id": estado,
+            }
+        )
+        if len(filas) >= lote:
+            session.execute(Evento.__table__.insert(), filas)
+            filas = []
+    if filas:
+        session.execute(Evento.__table__.insert(), filas)
+    if cambiadas:
+        t = Gestion.__table__
+        session.execute(
+            update(t).where(t.c.id == bindparam("gid")).values(estado_id=bindparam("estado")),
+            [{"gid": g, "estado": estados[g]} for g in cambiadas],
+        )
+    session.commit()
+
+
+class QueryCounter:
+    """Cuenta sentencias enviadas al driver mientras está activo."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, *args, **kwargs):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+
+
+@contextmanager
+def timed():
+    out = {}
+    t0 = time.perf_counter()
+    yield out
+    out["ms"] = (time.perf_counter() - t0) * 1000
+
+
+def new_session(engine):
+    return sessionmaker(bind=engine, autocommit=False, autoflush=False)()
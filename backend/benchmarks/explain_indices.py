@@ -0,0 +1,114 @@
+# benchmarks/explain_indices.py
+# Comprueba con EXPLAIN que las consultas calientes usan el índice previsto
+# (no un recorrido completo de la tabla). Sale con código 1 si alguna no lo hace.
+#   python -m benchmarks.explain_indices                 (SQLite en memoria con datos sintéticos)
+#   python -m benchmarks.explain_indices postgresql://...  (BD existente; con enable_seqscan=off
+#                                                          para que tablas pequeñas no oculten el plan)
+import json
+import sys
+from datetime import datetime
+
+from sqlalchemy import create_engine, func, select
+
+from analitica import consulta_eventos
+from benchmarks.common import new_session, seed_gestiones, sqlite_engine
+from models import ComentarioPlantilla, Evento, GestionResumen
+from pagination import encode_cursor
+from queries import eventos_query, gestiones_query
+
+CURSOR = encode_cursor(datetime(2024, 1, 2), 1000)
+
+
+def consultas():
+    """(descripción, sentencia, índice esperado)"""
+    return [
+        ("listado gestiones", gestiones_query().limit(101), "ix_gestion_fecha_creacion_id"),
+        ("listado gestiones (cursor)", gestiones_query(cursor=CURSOR).limit(101), "ix_gestion_fecha_creacion_id"),
+        (
+            "listado gestiones por estado",
+            gestiones_query(cursor=CURSOR, estado_id=2).limit(101),
+            "ix_gestion_estado_fecha_creacion_id",
+        ),
+        (
+            "listado gestiones por responsable",
+            gestiones_query(responsable_id=3).limit(101),
+            "ix_gestion_responsable_fecha_creacion_id",
+        ),
+        ("historial de una gestión", eventos_query(gestion_id=5).limit(101), "ix_evento_gestion_fecha_id"),
+        ("historial completo (cursor)", eventos_query(cursor=CURSOR).limit(101), "ix_evento_fecha_id"),
+        (
+            "detalle: eventos (selectinload, IN)",
+            select(Evento).where(Evento.gestion_id.in_([1, 2, 3])).order_by(Evento.fecha, Evento.id),
+            "ix_evento_gestion_fecha_id",
+        ),
+        (
+            "plantilla por estado y tipo",
+            select(ComentarioPlantilla).where(
+                ComentarioPlantilla.estado_id == 2, ComentarioPlantilla.tipo_gestion == "Reclamo"
+            ),
+            "ix_comentario_plantilla_estado_tipo",
+        ),
+        (
+            "resumen por estado",
+            select(GestionResumen.estado_id, func.count()).group_by(GestionResumen.estado_id),
+            "ix_gestion_resumen_estado",
+        ),
+    ]
+
+
+def plan_sqlite(conn, stmt):
+    c = stmt.compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})
+    params = tuple(c.params[k] for k in c.positiontup)
+    rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + str(c), params).all()
+    return "\n".join(r[-1] for r in rows)
+
+
+def plan_postgres(conn, stmt):
+    c = stmt.compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})
+    conn.exec_driver_sql("SET enable_seqscan = off")
+    raw = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + str(c), c.params).scalar()
+    return json.dumps(raw)
+
+
+def usa_indice(plan, indice, dialecto):
+    if indice not in plan:
+        return False
+    if dialecto == "sqlite":
+        # "SCAN tabla" sin índice = recorrido completo
+        return not any(l.strip().startswith("SCAN") and "INDEX" not in l for l in plan.splitlines())
+    return "Seq Scan" not in plan
+
+
+def preparar_sqlite():
+    engine = sqlite_engine()
+    with new_session(engine) as db:
+        seed_gestiones(db, 5000)
+        db.execute(
+            Evento.__table__.insert(),
+            [{"gestion_id": i % 5000 + 1, "fecha": datetime(2024, 1, 1 + i % 28), "estado_id": i % 4 + 1} for i in range(20000)],
+        )
+        db.commit()
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+    return engine
+
+
+def main(url=None):
+    engine = create_engine(url) if url else preparar_sqlite()
+    dialecto = engine.dialect.name
+    plan_de = plan_postgres if dialecto == "postgresql" else plan_sqlite
+    fallos = 0
+    extra = [("analítica: eventos nuevos", consulta_eventos(1000), "evento_pkey" if dialecto == "postgresql" else "PRIMARY KEY")]
+    with engine.connect() as conn:
+        for nombre, stmt, indice in consultas() + extra:
+            plan = plan_de(conn, stmt)
+            ok = usa_indice(plan, indice, dialecto)
+            fallos += not ok
+            print(f"{'OK ' if ok else 'FALLA'} {nombre:<36} {indice}")
+            if not ok:
+                print("      " + plan.replace("\n", "\n      "))
+    return fallos
+
+
+if __name__ == "__main__":
+    sys.exit(1 if main(sys.argv[1] if len(sys.argv) > 1 else None) else 0)
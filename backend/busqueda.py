@@ -0,0 +1,124 @@
+# busqueda.py
+# Búsqueda de gestiones por nombre y descripción.
+# - Postgres: full-text (tsvector 'spanish') con índice GIN ix_gestion_busqueda y
+#   ranking ts_rank_cd. Modo "prefijo" (typeahead): la última palabra como prefijo (:*).
+# - Otros motores (SQLite en tests/benchmarks): índice invertido en memoria con la
+#   misma semántica (AND de palabras, prefijo en la última, nombre pesa más).
+import bisect
+import re
+import unicodedata
+
+from sqlalchemy import func, literal_column, select
+
+from models import Gestion
+from queries import GESTION_COLUMNS
+
+MODOS = ("texto", "prefijo")
+LIMITE_MAX = 100
+
+# Debe coincidir exactamente con la expresión del índice (models.Gestion / migraciones/m0002_indices_consultas.py)
+DOCUMENTO = literal_column(
+    "to_tsvector('spanish'::regconfig, coalesce(nombre, '') || ' ' || coalesce(descripcion, ''))"
+)
+_CONFIG = literal_column("'spanish'::regconfig")
+_NO_ALNUM = re.compile(r"[^0-9a-z]+")
+_PALABRA = re.compile(r"\w+")
+
+
+def tokens(texto):
+    """Minúsculas, sin acentos, sólo alfanuméricos."""
+    if not texto:
+        return []
+    plano = unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode().lower()
+    return [t for t in _NO_ALNUM.split(plano) if t]
+
+
+class IndiceInvertido:
+    """token -> {gestion_id: peso}; peso 2 si aparece en el nombre, 1 si sólo en la descripción."""
+
+    def __init__(self, filas):
+        postings = {}
+        for gid, nombre, descripcion in filas:
+            for t in tokens(descripcion):
+                postings.setdefault(t, {}).setdefault(gid, 1)
+            for t in tokens(nombre):
+                postings.setdefault(t, {})[gid] = 2
+        self.postings = postings
+        self.vocabulario = sorted(postings)
+
+    def _prefijo(self, pref):
+        i = bisect.bisect_left(self.vocabulario, pref)
+        out = {}
+        while i < len(self.vocabulario) and self.vocabulario[i].startswith(pref):
+            # Una palabra completa pesa más que una que sólo empieza por el prefijo
+            factor = 1.0 if self.vocabulario[i] == pref else 0.5
+            for gid, peso in self.postings[self.vocabulario[i]].items():
+                if peso * factor > out.get(gid, 0):
+                    out[gid] = peso * factor
+            i += 1
+        return out
+
+    def buscar(self, q, modo="texto", limit=20):
+        terms = tokens(q)
+        if not terms:
+            return []
+        listas = [self.postings.get(t, {}) for t in terms[:-1]]
+        listas.append(self._prefijo(terms[-1]) if modo == "prefijo" else self.postings.get(terms[-1], {}))
+        listas.sort(key=len)
+        scores = dict(listas[0])
+        for lista in listas[1:]:
+            scores = {gid: s + lista[gid] for gid, s in scores.items() if gid in lista}
+            if not scores:
+                return []
+        return sorted(scores.items(), key=lambda kv: (-kv[1], kv[0]))[:limit]
+
+
+_indice = None
+_firma = None
+
+
+async def _indice_memoria(db):
+    """
+    Reconstruye el índice si cambió el número de gestiones, el último id o alguna gestión:
+    cada UPDATE incrementa gestion.version (control optimista), así que su suma sólo
+    crece al editar nombre, descripción o cualquier otro campo.
+    """
+    global _indice, _firma
+    firma = tuple(
+        (await db.execute(select(func.count(Gestion.id), func.max(Gestion.id), func.sum(Gestion.version)))).one()
+    )
+    if _indice is None or firma != _firma:
+        filas = (await db.execute(select(Gestion.id, Gestion.nombre, Gestion.descripcion))).all()
+        _indice, _firma = IndiceInvertido(filas), firma
+    return _indice
+
+
+def _tsquery_prefijo(terms):
+    return " & ".join(terms[:-1] + [terms[-1] + ":*"])
+
+
+async def buscar_gestiones(db, q, modo="texto", limit=20):
+    """Lista de (fila GESTION_COLUMNS, rank) ordenada por relevancia."""
+    if not tokens(q):
+        return []
+    if db.bind.dialect.name == "postgresql":
+        if modo == "prefijo":
+            # Palabras tal cual (con acentos): el tsvector no aplica unaccent
+            consulta = func.to_tsquery(_CONFIG, _tsquery_prefijo(_PALABRA.findall(q.lower())))
+        else:
+            consulta = func.websearch_to_tsquery(_CONFIG, q)
+        rank = func.ts_rank_cd(DOCUMENTO, consulta).label("rank")
+        stmt = (
+            select(*GESTION_COLUMNS, rank)
+            .where(DOCUMENTO.op("@@")(consulta))
+            .order_by(rank.desc(), Gestion.id)
+            .limit(limit)
+        )
+        return [(r, float(r.rank)) for r in await db.execute(stmt)]
+
+    indice = await _indice_memoria(db)
+    hits = indice.buscar(q, modo, limit)
+    if not hits:
+        return []
+    filas = {r.id: r for r in await db.execute(select(*GESTION_COLUMNS).where(Gestion.id.in_([g for g, _ in hits])))}
+    return [(filas[gid], float(score)) for gid, score in hits if gid in filas]
@@ -0,0 +1,135 @@
+# cargadores.py
+# Cargadores por request (estilo DataLoader): las búsquedas por id de usuarios, gestiones
+# y estados que se hacen durante un mismo request se juntan en una sola consulta
+# `IN (...)` por entidad en vez de una por fila. Cada id se busca como mucho una vez por
+# request. Los estados salen del catálogo en memoria (catalogo_cache.py), sin consulta.
+#   cargadores: Cargadores = Depends(get_cargadores)
+#   filas = await cargadores.gestiones.cargar_muchos(ids)   # en el orden de ids; None si no existe
+#   await cargadores.embeber_nombres(items)                 # responsable_nombre / estado_nombre
+# Las claves pedidas sin await de por medio (o desde tareas de un mismo gather) van en
+# la misma consulta; `await cargar(a)` seguido de `await cargar(b)` son dos consultas.
+import asyncio
+
+from fastapi import Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from catalogo_cache import get_catalogo_async
+from db import get_read_db
+from models import Gestion, Usuario
+from pagination import MAX_LIMIT
+from queries import GESTION_COLUMNS, USUARIO_COLUMNS
+
+# Ids por consulta: acota el tamaño de la lista IN (y de los parámetros de la sentencia)
+LOTE_MAX = 1000
+
+
+def parse_ids(valor, maximo=MAX_LIMIT):
+    """"1,2,3" -> [1, 2, 3] sin repetidos y en el mismo orden; 400 si no son enteros."""
+    try:
+        ids = list(dict.fromkeys(int(v) for v in valor.split(",") if v.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids debe ser una lista de enteros separados por comas")
+    if len(ids) > maximo:
+        raise HTTPException(status_code=400, detail=f"Máximo {maximo} ids por petición")
+    return ids
+
+
+class Cargador:
+    """
+    cargar(clave) devuelve un futuro. Las claves nuevas se acumulan hasta la siguiente
+    vuelta del event loop y se resuelven juntas con `lote(claves) -> {clave: valor}`
+    (las que falten quedan en None).
+    """
+
+    def __init__(self, lote, maximo=LOTE_MAX):
+        self._lote = lote
+        self.maximo = maximo
+        self._futuros = {}
+        self._pendientes = []
+        self._tareas = set()
+        self.consultas = 0
+
+    def cargar(self, clave):
+        loop = asyncio.get_running_loop()
+        futuro = self._futuros.get(clave)
+        if futuro is None:
+            futuro = self._futuros[clave] = loop.create_future()
+            if clave is None:
+                futuro.set_result(None)
+                return futuro
+            if not self._pendientes:
+                loop.call_soon(self._despachar)
+            self._pendientes.append(clave)
+        return futuro
+
+    async def cargar_muchos(self, claves):
+        return await asyncio.gather(*[self.cargar(c) for c in claves])
+
+    def _despachar(self):
+        claves, self._pendientes = self._pendientes, []
+        for i in range(0, len(claves), self.maximo):
+            tarea = asyncio.ensure_future(self._resolver(claves[i : i + self.maximo]))
+            # Referencia fuerte hasta que termine (el loop sólo guarda una débil)
+            self._tareas.add(tarea)
+            tarea.add_done_callback(self._tareas.discard)
+
+    async def _resolver(self, claves):
+        self.consultas += 1
+        try:
+            valores = await self._lote(claves)
+        except Exception as exc:
+            # Sin cachear el fallo: otro cargar() de la misma clave vuelve a consultar
+            for clave in claves:
+                futuro = self._futuros.pop(clave)
+                if not futuro.done():
+                    futuro.set_exception(exc)
+            return
+        for clave in claves:
+            futuro = self._futuros[clave]
+            if not futuro.done():
+                futuro.set_result(valores.get(clave))
+
+
+class Cargadores:
+    """Los cargadores de un request, sobre su sesión de lectura."""
+
+    def __init__(self, db):
+        self.db = db
+        # Una AsyncSession no admite dos consultas a la vez: los lotes de distintas
+        # entidades despachados en la misma vuelta se ejecutan uno tras otro
+        self._lock = asyncio.Lock()
+        self.usuarios = Cargador(self._usuarios)
+        self.gestiones = Cargador(self._gestiones)
+        self.estados = Cargador(self._estados)
+
+    async def _filas(self, stmt):
+        async with self._lock:
+            return {r.id: r for r in (await self.db.execute(stmt)).all()}
+
+    async def _usuarios(self, ids):
+        return await self._filas(select(*USUARIO_COLUMNS).where(Usuario.id.in_(ids)))
+
+    async def _gestiones(self, ids):
+        return await self._filas(select(*GESTION_COLUMNS).where(Gestion.id.in_(ids)))
+
+    async def _estados(self, ids):
+        async with self._lock:
+            # Recarga el snapshot (una vez) sólo si alguno de los ids no está
+            cat = await get_catalogo_async(self.db, ids)
+        return {i: cat.estado(i) for i in ids}
+
+    async def embeber_nombres(self, items):
+        """Añade responsable_nombre y estado_nombre a gestiones serializadas: como mucho una consulta."""
+        responsables = [self.usuarios.cargar(item["responsable_id"]) for item in items]
+        estados = [self.estados.cargar(item["estado_id"]) for item in items]
+        for item, responsable, estado in zip(items, responsables, estados):
+            usuario, e = await responsable, await estado
+            item["responsable_nombre"] = usuario.nombre if usuario is not None else None
+            item["estado_nombre"] = e["nombre"] if e is not None else None
+        return items
+
+
+async def get_cargadores(db: AsyncSession = Depends(get_read_db)):
+    """Dependencia: unos Cargadores nuevos por request (misma sesión que get_read_db)."""
+    return Cargadores(db)
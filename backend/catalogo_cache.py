@@ -0,0 +1,314 @@
+# catalogo_cache.py
+# Snapshot en memoria (versionado) de los catálogos: estados, transiciones, plantillas
+# de comentario y el motor de flujo compilado a partir de ellos (workflow.py).
+# Casi nunca cambian: se leen una vez por proceso y se sirven con búsquedas O(1).
+# Se invalida por:
+#   - TTL (CATALOGO_TTL_SEGUNDOS, por defecto 300)
+#   - invalidar() (endpoint de administración)
+#   - NOTIFY de Postgres en el canal "catalogo_cambio" (triggers de
+#     migraciones/m0003_catalogo_notify.py)
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import select as _select
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import select, text
+from sqlalchemy.exc import DBAPIError
+
+import respuesta_cache
+from models import CatalogoEstado, ComentarioPlantilla, EstadoTransicion
+from settings import get_settings
+from workflow import WorkflowEngine
+
+logger = logging.getLogger(__name__)
+
+TTL_SEGUNDOS = get_settings().catalogo_ttl_segundos
+CANAL_NOTIFY = "catalogo_cambio"
+
+
+def _etag(data):
+    raw = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str).encode()
+    return '"' + hashlib.sha1(raw).hexdigest() + '"'
+
+
+class CatalogoSnapshot:
+    """Vista inmutable de los catálogos en un momento dado."""
+
+    def __init__(self, version, estados, transiciones, plantillas, por_ausentes=False, bd_version=None):
+        self.version = version
+        # catalogo_version de la BD al cargar (Postgres, m0010); None si no se conoce
+        self.bd_version = bd_version
+        self.cargado_en = time.monotonic()
+        # Cargado para buscar estados que faltaban: lo que siga faltando no existe (hasta
+        # que expire o se invalide) y no provoca otra recarga
+        self.por_ausentes = por_ausentes
+
+        allowed = {}
+        for from_id, to_id in transiciones:
+            allowed.setdefault(from_id, set()).add(to_id)
+        self.allowed_next = {k: frozenset(v) for k, v in allowed.items()}
+
+        self.estados = {
+            e.id: {
+                "id": e.id,
+                "nombre": e.nombre,
+                "orden": e.orden or 0,
+                "is_terminal": bool(e.is_terminal),
+                "allowed_next": sorted(self.allowed_next.get(e.id, ())),
+            }
+            for e in estados
+        }
+        # Mismo orden que antes: por "orden" (estable respecto al id)
+        self.estados_out = [self.estados[e.id] for e in estados]
+
+        self.plantillas_out = [
+            {
+                "id": p.id,
+                "tipo_gestion": p.tipo_gestion,
+                "estado_id": p.estado_id,
+                "titulo": p.titulo,
+                "template": p.template,
+                "required": bool(p.required),
+                "roles_allowed": p.roles_allowed,
+            }
+            for p in plantillas
+        ]
+        # (estado_id, tipo) -> plantilla; tipo None = genérica del estado.
+        # Ante duplicados gana la de menor id (plantillas viene ordenado por id).
+        self._plantillas = {}
+        for p in self.plantillas_out:
+            self._plantillas.setdefault((p["estado_id"], p["tipo_gestion"]), p)
+
+        self.workflow = WorkflowEngine(self.estados.keys(), transiciones, self.plantillas_out)
+
+        self.etag_estados = _etag(self.estados_out)
+        self.etag_plantillas = _etag(self.plantillas_out)
+
+    def estado(self, estado_id):
+        return self.estados.get(estado_id)
+
+    def estado_nombre(self, estado_id):
+        e = self.estados.get(estado_id)
+        return e["nombre"] if e else None
+
+    def plantilla_para(self, estado_id, tipo):
+        """Plantilla del tipo exacto si existe; si no, la genérica (tipo_gestion NULL)."""
+        if tipo is not None:
+            p = self._plantillas.get((estado_id, tipo))
+            if p is not None:
+                return p
+        return self._plantillas.get((estado_id, None))
+
+
+_lock = threading.Lock()
+_snapshot = None
+_version = 0
+_invalidado = False
+
+
+_VERSION_SQL = "SELECT version FROM catalogo_version"
+
+
+def _version_bd(db):
+    if db.get_bind().dialect.name != "postgresql":
+        return None
+    try:
+        # Savepoint: sin m0010 aplicada la consulta falla sin abortar la transacción
+        with db.begin_nested():
+            return db.execute(text(_VERSION_SQL)).scalar()
+    except DBAPIError:
+        return None
+
+
+def _cargar(db, por_ausentes=False):
+    global _snapshot, _version, _invalidado
+    # Antes de leer: un aviso que llegue durante la carga vuelve a invalidar
+    _invalidado = False
+    try:
+        # Antes que los catálogos: si cambian entre medias, el snapshot sólo parece viejo
+        bd_version = _version_bd(db)
+        estados = db.execute(select(CatalogoEstado).order_by(CatalogoEstado.orden, CatalogoEstado.id)).scalars().all()
+        transiciones = db.execute(select(EstadoTransicion.from_estado_id, EstadoTransicion.to_estado_id)).all()
+        plantillas = db.execute(select(ComentarioPlantilla).order_by(ComentarioPlantilla.id)).scalars().all()
+    except Exception:
+        _invalidado = True
+        raise
+    _version += 1
+    _snapshot = CatalogoSnapshot(_version, estados, transiciones, plantillas, por_ausentes, bd_version)
+    return _snapshot
+
+
+def _vigente(snap):
+    return snap is not None and not _invalidado and time.monotonic() - snap.cargado_en < TTL_SEGUNDOS
+
+
+def _ausentes(snap, estado_ids):
+    return snap is not None and not snap.por_ausentes and any(
+        i is not None and i not in snap.estados for i in estado_ids
+    )
+
+
+def get_catalogo(db, estado_ids=()):
+    """
+    Snapshot vigente (lo carga si no hay, expiró o fue invalidado).
+    Si alguno de `estado_ids` no está se recarga, como mucho una vez por snapshot: los
+    que tampoco estén en el recargado se dan por inexistentes hasta el TTL o un aviso.
+    """
+    snap = _snapshot
+    if _vigente(snap) and not _ausentes(snap, estado_ids):
+        return snap
+    with _lock:
+        snap = _snapshot
+        vigente = _vigente(snap)
+        if vigente and not _ausentes(snap, estado_ids):
+            return snap
+        return _cargar(db, vigente)
+
+
+_async_lock = None
+
+
+async def get_catalogo_async(db, estado_ids=()):
+    """
+    Igual que get_catalogo pero con AsyncSession. Usa un asyncio.Lock: un
+    threading.Lock retenido a través de un await bloquearía el event loop.
+    """
+    global _async_lock
+    snap = _snapshot
+    if _vigente(snap) and not _ausentes(snap, estado_ids):
+        return snap
+    if _async_lock is None:
+        _async_lock = asyncio.Lock()
+    async with _async_lock:
+        snap = _snapshot
+        vigente = _vigente(snap)
+        if vigente and not _ausentes(snap, estado_ids):
+            return snap
+        return await db.run_sync(_cargar, vigente)
+
+
+def invalidar():
+    """
+    Marca el snapshot como obsoleto; la siguiente lectura recarga. Caduca también las
+    respuestas cacheadas con nombres de estado: listados (?nombres=true) y detalles. Sólo
+    en este proceso: cada worker recibe su propio aviso del cambio.
+    """
+    global _invalidado
+    _invalidado = True
+    respuesta_cache.invalidar_local([respuesta_cache.TAG_LISTA, respuesta_cache.TAG_CATALOGO])
+
+
+def _revalidar(conn):
+    """
+    Al (re)conectar el listener, ya escuchando: invalida sólo si catalogo_version cambió
+    desde la carga del snapshot (el precargado antes del fork sigue sirviendo si no).
+    conn: conexión psycopg2 del listener, en autocommit.
+    """
+    snap = _snapshot
+    try:
+        with conn.cursor() as cur:
+            cur.execute(_VERSION_SQL)
+            actual = cur.fetchone()[0]
+    except Exception:
+        actual = None
+    if snap is None or actual is None or snap.bd_version != actual:
+        invalidar()
+
+
+class NotifyListener(threading.Thread):
+    """
+    Escucha NOTIFY de Postgres en una conexión dedicada e invalida el snapshot.
+    Así varios workers se enteran de un cambio sin consultar la BD por request.
+    Con al_notificar(payloads) / al_conectar(conn) sirve para otros canales (tiempo_real.py).
+    enviar(payload) publica en el canal desde la misma conexión sin bloquear a quien llama.
+    """
+
+    def __init__(self, engine, canal=CANAL_NOTIFY, intervalo=5.0, al_notificar=None, al_conectar=None):
+        super().__init__(name=f"{canal}-notify", daemon=True)
+        self.engine = engine
+        self.canal = canal
+        self.intervalo = intervalo
+        self.al_notificar = al_notificar or (lambda payloads: invalidar())
+        self.al_conectar = al_conectar or _revalidar
+        self._parar = threading.Event()
+        # Escuchando (y ya invalidado lo que se pudo perder): ver main.lifespan
+        self.conectado = threading.Event()
+        # Acotada: sin conexión durante mucho tiempo se pierden los más antiguos
+        self._salientes = deque(maxlen=10000)
+        # Despierta el select() cuando hay algo que enviar o hay que parar
+        self._despertar_r, self._despertar_w = os.pipe()
+        os.set_blocking(self._despertar_r, False)
+        os.set_blocking(self._despertar_w, False)
+
+    def _despertar(self):
+        try:
+            os.write(self._despertar_w, b"x")
+        except BlockingIOError:
+            pass  # ya hay bytes pendientes: el select() se despertará igual
+
+    def detener(self):
+        self._parar.set()
+        self._despertar()
+
+    def enviar(self, payload):
+        """NOTIFY <canal>, payload desde el hilo del listener (sin conexión: se envía al reconectar)."""
+        self._salientes.append(payload)
+        self._despertar()
+
+    def _vaciar_salientes(self, conn):
+        try:
+            while os.read(self._despertar_r, 4096):
+                pass
+        except BlockingIOError:
+            pass
+        with conn.cursor() as cur:
+            while self._salientes:
+                cur.execute("SELECT pg_notify(%s, %s)", (self.canal, self._salientes[0]))
+                self._salientes.popleft()
+
+    def run(self):
+        while not self._parar.is_set():
+            raw = None
+            try:
+                raw = self.engine.raw_connection()
+                conn = raw.driver_connection
+                conn.autocommit = True
+                with conn.cursor() as cur:
+                    cur.execute(f"LISTEN {self.canal}")
+                # Pudimos perder avisos mientras no escuchábamos
+                self.al_conectar(conn)
+                self.conectado.set()
+                while not self._parar.is_set():
+                    if self._salientes:
+                        self._vaciar_salientes(conn)
+                    listos, _, _ = _select.select([conn, self._despertar_r], [], [], self.intervalo)
+                    if conn not in listos:
+                        continue
+                    conn.poll()
+                    if conn.notifies:
+                        payloads = [n.payload for n in conn.notifies]
+                        conn.notifies.clear()
+                        self.al_notificar(payloads)
+            except Exception:
+                logger.exception("Listener %s desconectado; reintentando", self.canal)
+                self._parar.wait(self.intervalo)
+            finally:
+                if raw is not None:
+                    try:
+                        raw.invalidate()
+                    except Exception:
+                        pass
+
+
+def iniciar_listener(engine):
+    """Arranca el listener si el motor es Postgres; None en otro caso (ej. SQLite)."""
+    if engine.dialect.name != "postgresql":
+        return None
+    listener = NotifyListener(engine)
+    listener.start()
+    return listener
@@ -0,0 +1,170 @@
+# escritor_eventos.py
+# Escritura agrupada ("group commit") de POST /api/gestiones/{id}/eventos (ESCRITURA_AGRUPADA).
+# - Cada request encola su evento ya validado por pydantic y espera su resultado.
+# - Una tarea escritora toma lo encolado hasta ESCRITURA_LOTE_MAX eventos o ESCRITURA_ESPERA_MS
+#   desde el primero y lo confirma en UNA transacción con el lote de la ingesta masiva
+#   (ingesta._Lote): validación en memoria, INSERT multi-fila con RETURNING (id, fecha),
+#   gestion_resumen, estado de la gestión y avisos en tiempo real. Un fsync por grupo.
+#   Sin concurrencia (el grupo anterior fue de un evento) no se espera: se confirma ya.
+# - El resultado de cada evento se entrega después del commit (confirmación durable).
+# - Las transiciones de un mismo grupo se encadenan en orden de llegada sobre el estado
+#   simulado; un evento inválido no afecta al resto. Si otro worker cambió una de sus
+#   gestiones (ConflictoVersion) el grupo se revalida y reintenta; si falla en la BD antes
+#   del commit se reintenta evento a evento para aislar el que lo provoca. Lo posterior al
+#   commit (invalidar la caché) nunca provoca reintentos: duplicaría los eventos.
+import asyncio
+import logging
+
+from catalogo_cache import get_catalogo_async
+from db import AsyncSessionLocal
+from ingesta import CONFLICTO_VERSION, REINTENTOS_CONFLICTO, ConflictoVersion, EventoBulkItem, _Lote
+from instrumentacion import metricas
+from respuesta_cache import TAG_LISTA, invalidar as invalidar_respuestas, tag_gestion
+from settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Encolados como máximo por cada evento del grupo: por encima, escribir() espera (contrapresión)
+_COLA_POR_LOTE = 20
+_FIN = object()
+
+
+class EscritorEventos:
+    def __init__(self, maximo=200, espera_ms=5.0, session_factory=AsyncSessionLocal):
+        self.maximo = maximo
+        self.espera = espera_ms / 1000
+        self.session_factory = session_factory
+        self._cola = asyncio.Queue(maxsize=maximo * _COLA_POR_LOTE)
+        self._tarea = None
+        self.grupos = 0
+        self.eventos = 0
+        self._ultimo = 0
+
+    def iniciar(self):
+        self._tarea = asyncio.get_running_loop().create_task(self._bucle(), name="escritor_eventos")
+        return self
+
+    async def detener(self):
+        """Confirma lo que quede encolado y termina la tarea."""
+        await self._cola.put(_FIN)
+        await self._tarea
+
+    async def escribir(self, item: EventoBulkItem, roles=frozenset()):
+        """
+        Resultado como los de la ingesta: {ok, id, gestion_id, fecha} o {ok: False, error}.
+        roles: los del usuario autenticado (roles_allowed de la plantilla).
+        """
+        futuro = asyncio.get_running_loop().create_future()
+        await self._cola.put((item, futuro, roles))
+        return await futuro
+
+    async def _bucle(self):
+        loop = asyncio.get_running_loop()
+        fin = False
+        while not fin:
+            siguiente = await self._cola.get()
+            if siguiente is _FIN:
+                break
+            grupo = [siguiente]
+            # Con tráfico esporádico la espera sólo añadiría latencia
+            limite = loop.time() + (self.espera if self._ultimo > 1 else 0)
+            while len(grupo) < self.maximo:
+                try:
+                    siguiente = self._cola.get_nowait()
+                except asyncio.QueueEmpty:
+                    restante = limite - loop.time()
+                    if restante <= 0:
+                        break
+                    try:
+                        siguiente = await asyncio.wait_for(self._cola.get(), restante)
+                    except asyncio.TimeoutError:
+                        break
+                if siguiente is _FIN:
+                    fin = True
+                    break
+                grupo.append(siguiente)
+            await self._confirmar(grupo)
+
+    async def _confirmar(self, grupo, intentos=REINTENTOS_CONFLICTO):
+        try:
+            await self._escribir_grupo(grupo)
+        except ConflictoVersion:
+            metricas.conflictos += 1
+            if intentos > 1:
+                await self._confirmar(grupo, intentos - 1)
+            elif len(grupo) > 1:
+                for pendiente in grupo:
+                    await self._confirmar([pendiente])
+            elif not grupo[0][1].done():
+                grupo[0][1].set_result({"index": 0, "ok": False, "error": CONFLICTO_VERSION})
+        except Exception:
+            if len(grupo) == 1:
+                logger.exception("Escritura agrupada: falló el evento de la gestión %s", grupo[0][0].gestion_id)
+                if not grupo[0][1].done():
+                    grupo[0][1].set_exception(RuntimeError("No se pudo registrar el evento"))
+                return
+            logger.warning("Escritura agrupada: falló un grupo de %d eventos, se reintentan uno a uno", len(grupo))
+            for pendiente in grupo:
+                await self._confirmar([pendiente])
+
+    async def _escribir_grupo(self, grupo):
+        """Hasta el commit: lo que falle antes se reintenta (_confirmar); lo de después, no."""
+        resultados = None
+        try:
+            async with self.session_factory() as db:
+                lote = _Lote(db, await get_catalogo_async(db))
+                for indice, (item, _, roles) in enumerate(grupo):
+                    await lote.agregar(indice, item, roles)
+                resultados = await lote.confirmar()
+        except Exception:
+            if resultados is None:
+                raise
+            logger.exception("Escritura agrupada: error al cerrar la sesión tras el commit")
+        self._entregar(grupo, lote, resultados)
+
+    def _entregar(self, grupo, lote, resultados):
+        """Ya confirmado: primero las respuestas; un fallo aquí sólo se registra."""
+        self.grupos += 1
+        self.eventos += len(grupo)
+        self._ultimo = len(grupo)
+        for resultado in resultados:
+            futuro = grupo[resultado["index"]][1]
+            if not futuro.done():
+                futuro.set_result(resultado)
+        # El listado sólo cambia si alguna gestión cambió de estado
+        gestiones = {r["gestion_id"] for r in resultados if r["ok"]}
+        if not gestiones:
+            return
+        try:
+            cambio = any(lote.estados_iniciales[gid] != eid for gid, eid in lote.estados_finales.items())
+            invalidar_respuestas(*map(tag_gestion, gestiones), *([TAG_LISTA] if cambio else []))
+        except Exception:
+            logger.exception("Escritura agrupada: no se pudo invalidar la caché de respuestas")
+
+    def estadisticas(self):
+        return {
+            "encolados": self._cola.qsize(),
+            "grupos": self.grupos,
+            "eventos": self.eventos,
+            "eventos_por_grupo": round(self.eventos / self.grupos, 2) if self.grupos else 0,
+        }
+
+
+escritor = None
+
+
+def iniciar():
+    """En el lifespan: arranca la tarea escritora si ESCRITURA_AGRUPADA está activa."""
+    global escritor
+    cfg = get_settings()
+    if not cfg.escritura_agrupada:
+        return None
+    escritor = EscritorEventos(cfg.escritura_lote_max, cfg.escritura_espera_ms).iniciar()
+    return escritor
+
+
+async def detener():
+    global escritor
+    if escritor is not None:
+        await escritor.detener()
+        escritor = None
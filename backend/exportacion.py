@@ -0,0 +1,69 @@
+# exportacion.py
+# Exportación en streaming (NDJSON / CSV, gzip opcional) desde un cursor del lado
+# del servidor: se leen bloques de FILAS_POR_BLOQUE filas (yield_per) y se
+# escriben a la respuesta sin construir la lista completa; memoria constante.
+import csv
+import io
+import zlib
+
+from fastapi.responses import StreamingResponse
+
+from db import AsyncReadSessionLocal
+from serializers import dumps
+
+FILAS_POR_BLOQUE = 1000
+
+FORMATOS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+async def _bloques(stmt):
+    # La sesión vive dentro del generador: una dependencia con yield podría
+    # cerrarse antes de que termine de enviarse la respuesta.
+    async with AsyncReadSessionLocal() as db:
+        result = await db.stream(stmt.execution_options(yield_per=FILAS_POR_BLOQUE))
+        async for filas in result.partitions():
+            yield filas
+
+
+async def _ndjson(stmt, serialize):
+    async for filas in _bloques(stmt):
+        yield b"".join(dumps(serialize(f)) + b"\n" for f in filas)
+
+
+async def _csv(stmt, serialize, columnas):
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=columnas, extrasaction="ignore")
+    writer.writeheader()
+    async for filas in _bloques(stmt):
+        writer.writerows(serialize(f) for f in filas)
+        yield buf.getvalue().encode()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode()
+
+
+async def _gzip(chunks):
+    comp = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 -> formato gzip
+    async for chunk in chunks:
+        data = comp.compress(chunk)
+        if data:
+            yield data
+    yield comp.flush()
+
+
+def exportar(stmt, serialize, columnas, formato, nombre, gzip=False):
+    """StreamingResponse con las filas de `stmt` en el formato pedido."""
+    if formato == "csv":
+        chunks = _csv(stmt, serialize, columnas)
+    else:
+        chunks = _ndjson(stmt, serialize)
+    ext = "csv" if formato == "csv" else "ndjson"
+    headers = {"Content-Disposition": f'attachment; filename="{nombre}.{ext}"'}
+    if gzip:
+        chunks = _gzip(chunks)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(chunks, media_type=FORMATOS[ext], headers=headers)
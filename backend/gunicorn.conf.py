@@ -0,0 +1,49 @@
+# gunicorn.conf.py
+# Varios workers uvicorn con la aplicación precargada en el maestro:
+#   gunicorn main:app -c gunicorn.conf.py
+# El maestro importa main (rutas, modelos, numpy, jose), comprueba el esquema y carga
+# los catálogos una vez (main.precargar); los workers lo heredan por fork sin copiarlo
+# mientras sólo se lea. Cada worker abre sus propias conexiones y hace su lifespan
+# (listeners LISTEN/NOTIFY, escritor agrupado).
+import multiprocessing
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+# Un worker que tarda más que esto en responder al maestro se reinicia
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = 30
+keepalive = 5
+
+
+def on_starting(server):
+    # La caché de respuestas en memoria es por proceso: entre workers sólo se entera de las
+    # escrituras de los demás por el puente LISTEN/NOTIFY (Postgres) o compartiéndola en Redis
+    from settings import get_settings
+
+    cfg = get_settings()
+    puente = cfg.database_url.startswith("postgresql") and cfg.tiempo_real_notify
+    if server.cfg.workers > 1 and cfg.cache_max_bytes > 0 and not cfg.redis_url and not puente:
+        raise RuntimeError(
+            f"{server.cfg.workers} workers con la caché de respuestas en memoria y sin puente "
+            "LISTEN/NOTIFY: servirían respuestas obsoletas. Define REDIS_URL, usa Postgres con "
+            "TIEMPO_REAL_NOTIFY=true, CACHE_MAX_BYTES=0 o WEB_CONCURRENCY=1"
+        )
+
+
+def when_ready(server):
+    # Con preload_app main ya está importado: sólo queda el trabajo con BD
+    import main
+
+    main.precargar()
+
+
+def post_fork(server, worker):
+    # Los pools heredados del maestro no se usan ni se cierran desde el hijo (el socket
+    # es del maestro): se descartan y cada worker abre conexiones nuevas
+    import db
+
+    for engine in {db.engine, db.async_engine.sync_engine, db.async_read_engine.sync_engine}:
+        engine.dispose(close=False)
@@ -0,0 +1,288 @@
+# ingesta.py
+# Ingesta masiva de eventos (POST /api/eventos/bulk).
+# Por bloque de CHUNK items: 1 SELECT de gestiones (IN), 1 SELECT de usuarios (IN),
+# validación en memoria con el motor de flujo y 1 INSERT multi-fila con RETURNING.
+# Todo en una sola transacción (gestion_resumen incluida); el resultado se informa por item.
+# Los cambios de estado se aplican con compare-and-swap sobre gestion.version: si otra
+# transacción cambió una de esas gestiones desde la lectura, ConflictoVersion (sin aplicar nada).
+import json
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import bindparam, insert, select, update
+
+from models import Evento, Gestion, Usuario
+import resumen
+import tiempo_real
+from serializers import to_iso_z
+
+CHUNK = 1000
+MAX_ITEMS = 50000
+# NDJSON: bytes por línea; una más larga se descarta sin acumularla (error en su item)
+MAX_LINEA = 1024 * 1024
+GESTION_NO_ENCONTRADA = "Gestión no encontrada"
+USUARIO_NO_ENCONTRADO = "Usuario no encontrado"
+ESTADO_NO_ENCONTRADO = "Estado no encontrado"
+CONFLICTO_VERSION = "La gestión cambió de estado al mismo tiempo; vuelve a intentarlo"
+USUARIO_AJENO = "usuario_id no coincide con el usuario autenticado"
+LINEA_LARGA = f"Línea de más de {MAX_LINEA} bytes"
+# Reintentos (revalidando contra el estado nuevo) ante ConflictoVersion
+REINTENTOS_CONFLICTO = 3
+
+
+class ConflictoVersion(Exception):
+    """Otra transacción cambió el estado de una gestión del lote; hay que revalidar."""
+
+
+class EventoBulkItem(BaseModel):
+    gestion_id: int
+    usuario_id: Optional[int] = None
+    comentario: Optional[str] = None
+    estado_id: Optional[int] = None
+    apply_transition: bool = False
+
+
+class _Lote:
+    """Estado de una ingesta: gestiones conocidas (estado simulado) y resultados."""
+
+    def __init__(self, db, catalogo, roles=frozenset(), usuario_id=None):
+        self.db = db
+        self.roles = roles  # del usuario que envía el lote (roles_allowed)
+        # Con token, los eventos son de ese usuario: usuario_id del cuerpo sólo si coincide
+        self.usuario_id = usuario_id
+        self.workflow = catalogo.workflow
+        self.catalogo = catalogo
+        self.gestiones = {}  # id -> [estado_id, tipo, responsable_id]
+        self.usuarios = set()
+        self.pendientes = []  # (indice, item, roles)
+        self.resultados = []
+        self.estados_finales = {}  # gestion_id -> estado_id tras el lote
+        self.resumen = {}  # gestion_id -> [num_eventos, ultimo_id, ultima_fecha, cambio_estado]
+        self.estados_iniciales = {}  # gestion_id -> estado_id antes del lote
+        self.versiones = {}  # gestion_id -> version leída
+
+    async def _precargar(self, items):
+        gids = {it.gestion_id for _, it, _ in items} - self.gestiones.keys()
+        if gids:
+            rows = await self.db.execute(
+                select(Gestion.id, Gestion.estado_id, Gestion.tipo, Gestion.responsable_id, Gestion.version).where(
+                    Gestion.id.in_(gids)
+                )
+            )
+            for r in rows:
+                self.gestiones[r.id] = [r.estado_id, r.tipo, r.responsable_id]
+                self.estados_iniciales[r.id] = r.estado_id
+                self.versiones[r.id] = r.version
+        uids = {it.usuario_id for _, it, _ in items if it.usuario_id is not None} - self.usuarios
+        if uids:
+            rows = await self.db.execute(select(Usuario.id).where(Usuario.id.in_(uids)))
+            self.usuarios.update(r.id for r in rows)
+
+    def _validar(self, it, roles):
+        g = self.gestiones.get(it.gestion_id)
+        if g is None:
+            return GESTION_NO_ENCONTRADA
+        if it.usuario_id is not None and it.usuario_id not in self.usuarios:
+            return USUARIO_NO_ENCONTRADO
+        if it.estado_id is not None and self.catalogo.estado(it.estado_id) is None:
+            return ESTADO_NO_ENCONTRADO
+        if it.apply_transition and it.estado_id is not None:
+            return self.workflow.validar(g[0], it.estado_id, g[1], it.comentario, roles)
+        return None
+
+    async def agregar(self, indice, data, roles=None):
+        """roles: los de quien envía este item si no son los del lote (escritura agrupada)."""
+        try:
+            item = data if isinstance(data, EventoBulkItem) else EventoBulkItem(**data)
+        except (ValidationError, TypeError) as e:
+            self.error(indice, _mensaje(e))
+            return
+        if self.usuario_id is not None:
+            if item.usuario_id not in (None, self.usuario_id):
+                self.error(indice, USUARIO_AJENO)
+                return
+            item.usuario_id = self.usuario_id
+        self.pendientes.append((indice, item, self.roles if roles is None else roles))
+        if len(self.pendientes) >= CHUNK:
+            await self.vaciar()
+
+    def error(self, indice, mensaje):
+        self.resultados.append({"index": indice, "ok": False, "error": mensaje})
+
+    async def vaciar(self):
+        items, self.pendientes = self.pendientes, []
+        if not items:
+            return
+        await self._precargar(items)
+
+        validos = []
+        for indice, it, roles in items:
+            error = self._validar(it, roles)
+            if error:
+                self.error(indice, error)
+                continue
+            # Las transiciones del mismo lote se encadenan sobre el estado simulado
+            cambio = False
+            if it.apply_transition and it.estado_id is not None:
+                g = self.gestiones[it.gestion_id]
+                cambio = g[0] != it.estado_id
+                g[0] = it.estado_id
+                self.estados_finales[it.gestion_id] = it.estado_id
+            validos.append((indice, it, cambio))
+        if not validos:
+            return
+
+        fecha = datetime.utcnow()
+        stmt = insert(Evento.__table__).returning(
+            Evento.__table__.c.id, Evento.__table__.c.fecha, sort_by_parameter_order=True
+        )
+        rows = await self.db.execute(
+            stmt,
+            [
+                {
+                    "gestion_id": it.gestion_id,
+                    "usuario_id": it.usuario_id,
+                    "comentario": it.comentario,
+                    "estado_id": it.estado_id,
+                    "fecha": fecha,
+                }
+                for _, it, _ in validos
+            ],
+        )
+        for (indice, it, cambio), row in zip(validos, rows):
+            self.resultados.append(
+                {"index": indice, "ok": True, "id": row.id, "gestion_id": it.gestion_id, "fecha": to_iso_z(row.fecha)}
+            )
+            acum = self.resumen.setdefault(it.gestion_id, [0, None, None, False])
+            acum[0] += 1
+            acum[1], acum[2] = row.id, row.fecha
+            acum[3] = acum[3] or cambio
+
+    async def confirmar(self):
+        await self.vaciar()
+        if self.estados_finales:
+            await self._actualizar_estados()
+        await resumen.registrar(
+            self.db,
+            [
+                resumen.fila(gid, *self.gestiones[gid], n, ultimo_id, ultima_fecha, cambio)
+                for gid, (n, ultimo_id, ultima_fecha, cambio) in self.resumen.items()
+            ],
+        )
+        # Un aviso por gestión (no por evento)
+        for gid, (n, ultimo_id, ultima_fecha, _) in self.resumen.items():
+            tiempo_real.notificar(
+                self.db,
+                tipo="eventos",
+                gestion_id=gid,
+                eventos=n,
+                evento_id=ultimo_id,
+                estado_id=self.gestiones[gid][0],
+                estado_anterior=self.estados_iniciales[gid],
+                fecha=to_iso_z(ultima_fecha),
+            )
+        await self.db.commit()
+        self.resultados.sort(key=lambda r: r["index"])
+        return self.resultados
+
+    async def _actualizar_estados(self):
+        t = Gestion.__table__
+        stmt = (
+            update(t)
+            .where(t.c.id == bindparam("gid"), t.c.version == bindparam("v"))
+            .values(estado_id=bindparam("eid"), version=t.c.version + 1)
+        )
+        params = [{"gid": gid, "eid": eid, "v": self.versiones[gid]} for gid, eid in self.estados_finales.items()]
+        # rowcount de un executemany sólo es fiable si el driver lo soporta; si no, una a una
+        if self.db.bind.dialect.supports_sane_multi_rowcount:
+            actualizadas = (await self.db.execute(stmt, params)).rowcount
+        else:
+            actualizadas = 0
+            for p in params:
+                actualizadas += (await self.db.execute(stmt, p)).rowcount
+        if actualizadas != len(params):
+            await self.db.rollback()
+            raise ConflictoVersion()
+
+
+def _mensaje(e):
+    if isinstance(e, ValidationError):
+        return "; ".join(f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors())
+    return str(e)
+
+
+async def ingestar_json(db, catalogo, items, roles=frozenset(), usuario_id=None):
+    """items: lista ya decodificada (cuerpo JSON array)."""
+    lote = _Lote(db, catalogo, roles, usuario_id)
+    for indice, data in enumerate(items):
+        if not isinstance(data, dict):
+            lote.error(indice, "Se esperaba un objeto JSON")
+            continue
+        await lote.agregar(indice, data)
+    return await lote.confirmar()
+
+
+async def ingestar_ndjson(db, catalogo, chunks, max_items=MAX_ITEMS, roles=frozenset(), usuario_id=None):
+    """
+    chunks: iterador asíncrono de bytes (request.stream()); una línea JSON por evento.
+    Sólo se parte cada chunk nuevo; se arrastra el trozo de línea sin terminar (acotado
+    por MAX_LINEA).
+    """
+    lote = _Lote(db, catalogo, roles, usuario_id)
+    pendiente = bytearray()
+    larga = False
+    indice = 0
+
+    async def linea(raw):
+        """raw None: línea que superó MAX_LINEA."""
+        nonlocal indice
+        if raw is not None:
+            raw = raw.strip()
+            if not raw:
+                return
+        if indice >= max_items:
+            raise OverflowError(max_items)
+        if raw is None:
+            lote.error(indice, LINEA_LARGA)
+            indice += 1
+            return
+        try:
+            data = json.loads(raw)
+        except ValueError:
+            lote.error(indice, "JSON inválido")
+        else:
+            if isinstance(data, dict):
+                await lote.agregar(indice, data)
+            else:
+                lote.error(indice, "Se esperaba un objeto JSON")
+        indice += 1
+
+    def acumular(parte):
+        nonlocal larga
+        if larga:
+            return
+        if len(pendiente) + len(parte) > MAX_LINEA:
+            larga = True
+            pendiente.clear()
+        else:
+            pendiente.extend(parte)
+
+    async def terminar(parte):
+        nonlocal larga
+        if larga or pendiente:
+            acumular(parte)
+            raw = None if larga else bytes(pendiente)
+            pendiente.clear()
+            larga = False
+        else:
+            raw = parte if len(parte) <= MAX_LINEA else None
+        await linea(raw)
+
+    async for chunk in chunks:
+        *completas, resto = chunk.split(b"\n")
+        for parte in completas:
+            await terminar(parte)
+        acumular(resto)
+    await terminar(b"")
+    return await lote.confirmar()
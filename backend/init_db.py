@@ -1,10 +1,8 @@
-from db import Base, engine
-from models.gestion import Gestion
-from models.evento import Evento
-from models.usuario import Usuario
-from models.catalogo import CatalogoEstado
+import migraciones
+from db import engine
 
-# Este comando crea todas las tablas en la base de datos
+# Este comando crea o actualiza las tablas aplicando las migraciones pendientes
+# (equivale a `python -m migraciones subir`)
 if __name__ == '__main__':
-    Base.metadata.create_all(bind=engine)
-    print("¡Base de datos inicializada correctamente!")
\ No newline at end of file
+    migraciones.subir(engine, log=print)
+    print("¡Base de datos inicializada correctamente!")
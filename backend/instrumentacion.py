@@ -0,0 +1,273 @@
+# instrumentacion.py
+# Consultas por request, tiempo de BD y consultas lentas (sustituye a debug_endpoints.py).
+# - Eventos before/after_cursor_execute de todos los Engine (también los async): cada
+#   sentencia suma al request en curso (ContextVar; llega a los greenlets de asyncpg/
+#   aiosqlite y al threadpool de los endpoints síncronos).
+# - InstrumentacionMiddleware (ASGI): añade Server-Timing (db, db-lenta, app) y acumula
+#   por ruta requests, latencias y consultas; metricas_prometheus() lo expone en /metrics.
+# - Sentencias por encima de SLOW_QUERY_MS van al log con su ruta.
+# - Perfilador: muestreo opt-in (PERFILADOR=true) de las pilas de todos los hilos, en
+#   formato "collapsed" (flamegraph.pl / speedscope).
+import logging
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+BUCKETS_CONSULTAS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+_INICIOS = "instrumentacion_inicios"
+
+
+class EstadisticasRequest:
+    __slots__ = ("scope", "consultas", "db_s", "lenta_s", "lenta_sql")
+
+    def __init__(self, scope=None):
+        self.scope = scope
+        self.consultas = 0
+        self.db_s = 0.0
+        self.lenta_s = 0.0
+        self.lenta_sql = None
+
+    @property
+    def ruta(self):
+        return _ruta(self.scope) if self.scope is not None else None
+
+
+_actual = ContextVar("instrumentacion_request", default=None)
+
+
+def actual():
+    """Estadísticas del request en curso (None fuera de un request)."""
+    return _actual.get()
+
+
+# id(ruta) -> plantilla completa. Según la versión de FastAPI, scope["route"] de una
+# ruta de un APIRouter incluido con prefix puede ser la original (path sin el prefijo):
+# "/" de /api/eventos/ chocaría con la raíz. main.create_app las registra al incluirlas.
+_plantillas = {}
+
+
+def registrar_rutas(router, prefijo=""):
+    """Llamar junto a app.include_router(router, prefix=prefijo)."""
+    for route in router.routes:
+        path = getattr(route, "path", None)
+        if path is not None:
+            _plantillas[id(route)] = prefijo + path
+
+
+def _ruta(scope):
+    # Plantilla de la ruta (/api/gestiones/{code}), no la URL: cardinalidad acotada
+    route = scope.get("route")
+    return _plantillas.get(id(route)) or getattr(route, "path", None) or "sin_ruta"
+
+
+# ---------------------------------------------------------------------------
+# Eventos de SQLAlchemy
+# ---------------------------------------------------------------------------
+@event.listens_for(Engine, "before_cursor_execute")
+def _antes(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault(_INICIOS, []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _despues(conn, cursor, statement, parameters, context, executemany):
+    duracion = time.perf_counter() - conn.info[_INICIOS].pop()
+    stats = _actual.get()
+    if stats is not None:
+        stats.consultas += 1
+        stats.db_s += duracion
+        if duracion > stats.lenta_s:
+            stats.lenta_s, stats.lenta_sql = duracion, statement
+    umbral = get_settings().slow_query_ms
+    if umbral and duracion * 1000 >= umbral:
+        metricas.lentas += 1
+        logger.warning(
+            "Consulta lenta %.1f ms [%s]: %s",
+            duracion * 1000,
+            stats.ruta if stats is not None else "-",
+            " ".join(statement.split())[:1000],
+        )
+
+
+@event.listens_for(Engine, "handle_error")
+def _error(context):
+    # La sentencia falló: after_cursor_execute no llega, se descarta su inicio
+    conn = context.connection
+    if conn is not None and conn.info.get(_INICIOS):
+        conn.info[_INICIOS].pop()
+
+
+# ---------------------------------------------------------------------------
+# Acumulado por ruta (Prometheus)
+# ---------------------------------------------------------------------------
+class _Histograma:
+    __slots__ = ("limites", "cuentas", "suma", "total")
+
+    def __init__(self, limites):
+        self.limites = limites
+        self.cuentas = [0] * len(limites)
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        for i, limite in enumerate(self.limites):
+            if valor <= limite:
+                self.cuentas[i] += 1
+                break
+        self.suma += valor
+        self.total += 1
+
+    def lineas(self, nombre, etiquetas):
+        acumulado = 0
+        for limite, n in zip(self.limites, self.cuentas):
+            acumulado += n
+            yield f'{nombre}_bucket{{{etiquetas},le="{limite}"}} {acumulado}'
+        yield f'{nombre}_bucket{{{etiquetas},le="+Inf"}} {self.total}'
+        yield f"{nombre}_sum{{{etiquetas}}} {self.suma:.6f}"
+        yield f"{nombre}_count{{{etiquetas}}} {self.total}"
+
+
+class Metricas:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = Counter()  # (método, ruta, status) -> n
+        self.duracion = {}  # ruta -> _Histograma (segundos)
+        self.consultas = {}  # ruta -> _Histograma (consultas por request)
+        self.db_s = Counter()  # ruta -> segundos de BD
+        self.lentas = 0
+        self.conflictos = 0  # compare-and-swap de gestion.version fallidos
+
+    def registrar(self, metodo, ruta, status, duracion_s, stats):
+        with self._lock:
+            self.requests[(metodo, ruta, status)] += 1
+            if ruta not in self.duracion:
+                self.duracion[ruta] = _Histograma(BUCKETS_SEGUNDOS)
+                self.consultas[ruta] = _Histograma(BUCKETS_CONSULTAS)
+            self.duracion[ruta].observar(duracion_s)
+            self.consultas[ruta].observar(stats.consultas)
+            self.db_s[ruta] += stats.db_s
+
+    def lineas(self):
+        with self._lock:
+            yield "# HELP gestor_http_requests_total Requests HTTP atendidos."
+            yield "# TYPE gestor_http_requests_total counter"
+            for (metodo, ruta, status), n in sorted(self.requests.items()):
+                yield f'gestor_http_requests_total{{method="{metodo}",route="{ruta}",status="{status}"}} {n}'
+            yield "# HELP gestor_http_request_duration_seconds Latencia de los requests HTTP."
+            yield "# TYPE gestor_http_request_duration_seconds histogram"
+            for ruta, h in sorted(self.duracion.items()):
+                yield from h.lineas("gestor_http_request_duration_seconds", f'route="{ruta}"')
+            yield "# HELP gestor_db_queries_per_request Sentencias SQL por request."
+            yield "# TYPE gestor_db_queries_per_request histogram"
+            for ruta, h in sorted(self.consultas.items()):
+                yield from h.lineas("gestor_db_queries_per_request", f'route="{ruta}"')
+            yield "# HELP gestor_db_time_seconds_total Tiempo en la BD acumulado por ruta."
+            yield "# TYPE gestor_db_time_seconds_total counter"
+            for ruta, s in sorted(self.db_s.items()):
+                yield f'gestor_db_time_seconds_total{{route="{ruta}"}} {s:.6f}'
+            yield "# HELP gestor_db_slow_queries_total Sentencias por encima de SLOW_QUERY_MS."
+            yield "# TYPE gestor_db_slow_queries_total counter"
+            yield f"gestor_db_slow_queries_total {self.lentas}"
+            yield "# HELP gestor_conflictos_version_total Escrituras de gestion repetidas por cambio concurrente de versión."
+            yield "# TYPE gestor_conflictos_version_total counter"
+            yield f"gestor_conflictos_version_total {self.conflictos}"
+
+
+metricas = Metricas()
+
+
+def metricas_prometheus(extra=()):
+    """
+    Texto de exposición de Prometheus: lo acumulado por el middleware más `extra`,
+    iterable de (nombre, tipo, ayuda, [(etiquetas_dict, valor), ...]).
+    """
+    lineas = list(metricas.lineas())
+    for nombre, tipo, ayuda, muestras in extra:
+        lineas.append(f"# HELP {nombre} {ayuda}")
+        lineas.append(f"# TYPE {nombre} {tipo}")
+        for etiquetas, valor in muestras:
+            if valor is None:
+                continue
+            et = ",".join(f'{k}="{v}"' for k, v in etiquetas.items())
+            lineas.append(f"{nombre}{{{et}}} {valor}" if et else f"{nombre} {valor}")
+    return "\n".join(lineas) + "\n"
+
+
+class InstrumentacionMiddleware:
+    """Middleware ASGI (el más externo): mide también los HIT de la caché de respuestas."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = EstadisticasRequest(scope)
+        token = _actual.set(stats)
+        inicio = time.perf_counter()
+        status = 500
+
+        async def enviar(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                app_ms = (time.perf_counter() - inicio) * 1000
+                timing = (
+                    f'db;dur={stats.db_s * 1000:.2f};desc="{stats.consultas} consultas", '
+                    f"db-lenta;dur={stats.lenta_s * 1000:.2f}, app;dur={app_ms:.2f}"
+                )
+                message["headers"] = [*message.get("headers", []), (b"server-timing", timing.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _actual.reset(token)
+            # Incluye el envío del cuerpo (streaming/exportaciones)
+            metricas.registrar(scope["method"], _ruta(scope), status, time.perf_counter() - inicio, stats)
+
+
+# ---------------------------------------------------------------------------
+# Perfilador por muestreo
+# ---------------------------------------------------------------------------
+class Perfilador(threading.Thread):
+    """Cada `intervalo` segundos toma la pila de todos los hilos (salvo el suyo)."""
+
+    def __init__(self, intervalo=0.005, profundidad=64):
+        super().__init__(daemon=True, name="perfilador")
+        self.intervalo = intervalo
+        self.profundidad = profundidad
+        self.pilas = Counter()
+        self.muestras = 0
+        self._parar = threading.Event()
+
+    def run(self):
+        propio = threading.get_ident()
+        while not self._parar.wait(self.intervalo):
+            for hilo, frame in sys._current_frames().items():
+                if hilo == propio:
+                    continue
+                pila = []
+                while frame is not None and len(pila) < self.profundidad:
+                    codigo = frame.f_code
+                    pila.append(f"{codigo.co_filename.rsplit('/', 1)[-1]}:{codigo.co_name}")
+                    frame = frame.f_back
+                self.pilas[";".join(reversed(pila))] += 1
+            self.muestras += 1
+
+    def detener(self):
+        self._parar.set()
+        self.join()
+
+    def collapsed(self):
+        return "".join(f"{pila} {n}\n" for pila, n in self.pilas.most_common())
@@ -1,49 +1,131 @@
-from fastapi import FastAPI, Depends, HTTPException
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import APIRouter, FastAPI, Depends, HTTPException, Query, Request, Response, WebSocket
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import text, or_
-from datetime import datetime, timezone
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.orm.exc import StaleDataError
+from datetime import date, datetime
 
 # Ajusta según tu proyecto
-from db import SessionLocal, engine, Base
+from db import AsyncReadSessionLocal, SessionLocal, engine, get_async_db, get_read_db, pool_metrics
 from models import (
-    CatalogoEstado,
-    EstadoTransicion,
-    Usuario,
     Gestion,
     Evento,
-    ComentarioPlantilla,
+    Usuario,
 )
-
-# Crear tablas si no existen (solo en dev)
-Base.metadata.create_all(bind=engine)
-
-app = FastAPI(title="Gestor - API (tipo fix)")
-
-# CORS (ajusta según tu entorno)
-allowed_origins = [
-    "http://localhost:3000",
-    "http://127.0.0.1:3000",
-    "http://localhost:5173",
-    "http://127.0.0.1:5173",
-]
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=allowed_origins,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+from ingesta import (
+    CONFLICTO_VERSION,
+    ESTADO_NO_ENCONTRADO,
+    GESTION_NO_ENCONTRADA,
+    MAX_ITEMS,
+    REINTENTOS_CONFLICTO,
+    USUARIO_AJENO,
+    USUARIO_NO_ENCONTRADO,
+    ConflictoVersion,
+    EventoBulkItem,
+    ingestar_json,
+    ingestar_ndjson,
+)
+from catalogo_cache import get_catalogo, get_catalogo_async, iniciar_listener
+from pagination import DEFAULT_LIMIT, MAX_LIMIT, set_next_cursor, split_page
+from busqueda import LIMITE_MAX, buscar_gestiones
+from cargadores import Cargadores, get_cargadores, parse_ids
+from exportacion import exportar
+import resumen
+import analitica
+import tiempo_real
+import migraciones
+import archivo_eventos
+import auth
+import escritor_eventos
+from routers import (
+    admin as admin_router,
+    auth as auth_router,
+    eventos as eventos_router,
+    gestiones as gestiones_router,
+    usuarios as usuarios_router,
 )
+from instrumentacion import InstrumentacionMiddleware, metricas, metricas_prometheus, registrar_rutas
+from respuesta_cache import (
+    TAG_CATALOGO,
+    TAG_LISTA,
+    CacheMiddleware,
+    etiquetar,
+    get_cache,
+    invalidar as invalidar_respuestas,
+    tag_gestion,
+)
+from queries import (
+    EVENTO_COLUMNS,
+    GESTION_COLUMNS,
+    eventos_query,
+    gestiones_query,
+    USUARIO_COLUMNS,
+    ETAPA_KEYS,
+    serialize_etapa,
+    serialize_evento,
+    serialize_evento_row,
+    serialize_gestion_row,
+    serialize_usuario_row,
+)
+from serializers import FastJSONResponse, to_iso_z
+from settings import Settings, get_settings
+from workflow import ROL_NO_PERMITIDO
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+
+_precargado = False
+
+
+def precargar():
+    """
+    gunicorn --preload (gunicorn.conf.py): una sola vez en el maestro, antes del fork.
+    Los workers heredan sin copiarlos (copy-on-write, sólo lectura) los módulos, las
+    rutas compiladas y el snapshot de catálogos, y no repiten la comprobación del esquema.
+    """
+    global _precargado
+    migraciones.comprobar(engine)
+    with SessionLocal() as db:
+        get_catalogo(db)
+    # Lo que analitica y auth importan con la primera petición: aquí se paga una vez
+    import numpy  # noqa: F401
+    from jose import jwt  # noqa: F401
+    # Ninguna conexión abierta debe cruzar el fork
+    engine.dispose()
+    _precargado = True
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Sin DDL al arrancar: el esquema lo crean las migraciones (python -m migraciones subir)
+    if not _precargado:
+        migraciones.comprobar(engine)
+    # Al conectar, el listener compara catalogo_version con la del snapshot (pudo perder
+    # avisos) y sólo lo invalida si cambió: el precargado en el maestro sigue sirviendo.
+    # Después se calienta, así ningún worker carga los catálogos en su primer request
+    listener = iniciar_listener(engine)
+    if listener is not None:
+        await asyncio.to_thread(listener.conectado.wait, 5)
+    async with AsyncReadSessionLocal() as db:
+        await get_catalogo_async(db)
+    tiempo_real.iniciar(engine)
+    escritor_eventos.iniciar()
+    yield
+    # Antes que el puente: los últimos grupos todavía publican avisos
+    await escritor_eventos.detener()
+    tiempo_real.detener()
+    if listener is not None:
+        listener.detener()
+
+
+# Endpoints de este módulo; create_app (al final) los monta junto con routers/
+router = APIRouter()
 
 
 class EventoCreate(BaseModel):
@@ -63,187 +145,378 @@ def _is_int(s: str) -> bool:
         return False
 
 
-def _to_iso_z(dt):
-    """
-    Normaliza datetimes para enviar al cliente en formato ISO con Z (UTC).
-    - Si dt es None -> None
-    - Si dt.tzinfo is None -> asumimos UTC y añadimos 'Z'
-    - Si dt tiene tzinfo -> convertimos a UTC y devolvemos ISO con Z
-    """
-    if dt is None:
-        return None
-    try:
-        # si ya es string, devolver tal cual (precaución)
-        if isinstance(dt, str):
-            s = dt.strip()
-            # si parece no tener T, normalizar a T and add Z
-            if "T" not in s:
-                s = s.replace(" ", "T")
-            if not (s.endswith("Z") or "+" in s or "-" in s[-6:]):
-                s = s + "Z"
-            return s
-        # datetime object
-        if getattr(dt, "tzinfo", None) is None:
-            return dt.isoformat() + "Z"
-        return dt.astimezone(timezone.utc).isoformat().replace("+00:00", "Z")
-    except Exception:
-        # fallback: str()
-        return str(dt)
-
-
-# Catalogos
-@app.get("/api/catalogos/estados")
-def get_estados(db: Session = Depends(get_db)):
-    estados = db.query(CatalogoEstado).order_by(CatalogoEstado.orden).all()
-    out = []
-    for e in estados:
-        rows = db.query(EstadoTransicion).filter(EstadoTransicion.from_estado_id == e.id).all()
-        allowed = [r.to_estado_id for r in rows]
-        out.append(
-            {
-                "id": e.id,
-                "nombre": e.nombre,
-                "orden": e.orden or 0,
-                "is_terminal": bool(e.is_terminal),
-                "allowed_next": allowed,
-            }
-        )
+def _conditional_json(request: Request, data, etag: str):
+    """JSON con ETag; 304 sin cuerpo si el cliente ya tiene esa versión."""
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    return FastJSONResponse(data, headers=headers)
+
+
+# Catalogos (servidos desde el snapshot en memoria, ver catalogo_cache.py)
+@router.get("/api/catalogos/estados")
+async def get_estados(request: Request, db: AsyncSession = Depends(get_read_db)):
+    cat = await get_catalogo_async(db)
+    return _conditional_json(request, cat.estados_out, cat.etag_estados)
+
+
+@router.get("/api/catalogos/comentario-plantillas")
+async def get_plantillas(request: Request, db: AsyncSession = Depends(get_read_db)):
+    cat = await get_catalogo_async(db)
+    return _conditional_json(request, cat.plantillas_out, cat.etag_plantillas)
+
+
+def _alcance(workflow, estado_id, destino):
+    out = {
+        "estado_id": estado_id,
+        "siguientes": sorted(workflow.siguientes.get(estado_id, ())),
+        "alcanzables": workflow.alcanzables(estado_id),
+    }
+    if destino is not None:
+        out["destino"] = destino
+        out["camino"] = workflow.camino_mas_corto(estado_id, destino)
     return out
 
 
-@app.get("/api/catalogos/comentario-plantillas")
-def get_plantillas(db: Session = Depends(get_db)):
-    rows = db.query(ComentarioPlantilla).order_by(ComentarioPlantilla.id).all()
-    return [
-        {
-            "id": r.id,
-            "tipo_gestion": r.tipo_gestion,
-            "estado_id": r.estado_id,
-            "titulo": r.titulo,
-            "template": r.template,
-            "required": bool(r.required),
-            "roles_allowed": r.roles_allowed,
-        }
-        for r in rows
+# Alcanzabilidad en el grafo de estados (sin consultas: motor compilado en memoria)
+@router.get("/api/catalogos/estados/{estado_id}/alcanzables")
+async def get_estados_alcanzables(
+    estado_id: int, destino: Optional[int] = None, db: AsyncSession = Depends(get_read_db)
+):
+    # El id viene de la URL: uno inexistente es un 404, no motivo para recargar el catálogo
+    cat = await get_catalogo_async(db)
+    if cat.estado(estado_id) is None:
+        raise HTTPException(status_code=404, detail="Estado no encontrado")
+    return _alcance(cat.workflow, estado_id, destino)
+
+
+# Métricas en formato Prometheus: por ruta (requests, latencia, consultas, tiempo de BD)
+# más pools, caché de respuestas y tiempo real
+@router.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    pools = pool_metrics()
+    cache = get_cache().estadisticas()
+    rt = tiempo_real.hub.estadisticas()
+    esc = escritor_eventos.escritor.estadisticas() if escritor_eventos.escritor is not None else {}
+    tokens = auth.cache_tokens.estadisticas()
+
+    def por_pool(clave):
+        return [({"pool": p["pool"]}, p[clave]) for p in pools]
+
+    extra = [
+        ("gestor_db_pool_in_use", "gauge", "Conexiones en uso.", por_pool("en_uso")),
+        ("gestor_db_pool_capacity", "gauge", "pool_size + max_overflow.", por_pool("capacidad")),
+        ("gestor_db_pool_checkouts_total", "counter", "Conexiones entregadas.", por_pool("checkouts")),
+        ("gestor_db_pool_timeouts_total", "counter", "Esperas agotadas.", por_pool("timeouts")),
+        ("gestor_db_pool_wait_max_ms", "gauge", "Espera máxima de checkout.", por_pool("espera_max_ms")),
+        ("gestor_cache_hits_total", "counter", "Aciertos de la caché de respuestas.", [({}, cache.get("aciertos"))]),
+        ("gestor_cache_misses_total", "counter", "Fallos de la caché de respuestas.", [({}, cache.get("fallos"))]),
+        ("gestor_cache_bytes", "gauge", "Bytes en la caché de respuestas.", [({}, cache.get("bytes"))]),
+        ("gestor_tiempo_real_conexiones", "gauge", "Clientes SSE/WebSocket.", [({}, rt["conexiones"])]),
+        ("gestor_tiempo_real_publicados_total", "counter", "Mensajes publicados.", [({}, rt["publicados"])]),
+        ("gestor_tiempo_real_desbordes_total", "counter", "Colas desbordadas (resync).", [({}, rt["desbordes"])]),
+        ("gestor_escritura_grupos_total", "counter", "Commits de la escritura agrupada.", [({}, esc.get("grupos"))]),
+        ("gestor_escritura_eventos_total", "counter", "Eventos de la escritura agrupada.", [({}, esc.get("eventos"))]),
+        ("gestor_escritura_encolados", "gauge", "Eventos esperando su grupo.", [({}, esc.get("encolados"))]),
+        ("gestor_auth_tokens_cache", "gauge", "Tokens verificados en memoria.", [({}, tokens["tokens"])]),
+        ("gestor_auth_tokens_hits_total", "counter", "Tokens servidos desde la caché.", [({}, tokens["aciertos"])]),
+        ("gestor_auth_tokens_misses_total", "counter", "Tokens verificados con HMAC.", [({}, tokens["fallos"])]),
     ]
+    return PlainTextResponse(metricas_prometheus(extra), media_type="text/plain; version=0.0.4")
+
+
+# Usuarios; ?ids=1,2,3 devuelve sólo esos (en ese orden, los inexistentes se omiten)
+# con una consulta IN en lugar de la tabla completa
+@router.get("/api/usuarios/")
+async def list_usuarios(
+    ids: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db),
+    cargadores: Cargadores = Depends(get_cargadores),
+):
+    if ids is not None:
+        rows = [r for r in await cargadores.usuarios.cargar_muchos(parse_ids(ids)) if r is not None]
+    else:
+        rows = (await db.execute(select(*USUARIO_COLUMNS))).all()
+    return FastJSONResponse([serialize_usuario_row(r) for r in rows])
+
+
+# Gestiones: LIST (una sola consulta proyectada, tipo incluido; sin objetos ORM)
+# Paginación keyset: la respuesta sigue siendo una lista; la siguiente página
+# se pide con ?cursor=<X-Next-Cursor>.
+# ?ids=1,2,3: multi-get de esas gestiones (en ese orden, sin paginar ni filtrar) en
+# lugar de un GET /api/gestiones/{id} por fila.
+# ?nombres=true añade responsable_nombre y estado_nombre (cargadores.py): una consulta
+# más por página, no una por fila.
+@router.get("/api/gestiones/")
+async def list_gestiones(
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    estado_id: Optional[int] = None,
+    responsable_id: Optional[int] = None,
+    tipo: Optional[str] = None,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    ids: Optional[str] = None,
+    nombres: bool = False,
+    db: AsyncSession = Depends(get_read_db),
+    cargadores: Cargadores = Depends(get_cargadores),
+):
+    if ids is not None:
+        rows = [r for r in await cargadores.gestiones.cargar_muchos(parse_ids(ids)) if r is not None]
+        items = [serialize_gestion_row(r) for r in rows]
+        if nombres:
+            await cargadores.embeber_nombres(items)
+        return etiquetar(FastJSONResponse(items), TAG_LISTA)
+    stmt = gestiones_query(
+        cursor=cursor,
+        estado_id=estado_id,
+        responsable_id=responsable_id,
+        tipo=tipo,
+        desde=desde,
+        hasta=hasta,
+    )
+    rows = (await db.execute(stmt.limit(limit + 1))).all()
+    rows, next_cursor = split_page(rows, limit, lambda r: (r.fecha_creacion, r.id))
+    items = [serialize_gestion_row(r) for r in rows]
+    if nombres:
+        await cargadores.embeber_nombres(items)
+    response = FastJSONResponse(items)
+    set_next_cursor(response, request, next_cursor)
+    return etiquetar(response, TAG_LISTA)
+
+
+# Búsqueda por nombre/descripción con ranking (full-text + GIN; ver busqueda.py)
+# modo=prefijo para typeahead (la última palabra se completa).
+@router.get("/api/busqueda/gestiones")
+async def search_gestiones(
+    q: str = Query(..., min_length=1),
+    modo: str = Query("texto", pattern="^(texto|prefijo)$"),
+    limit: int = Query(20, ge=1, le=LIMITE_MAX),
+    db: AsyncSession = Depends(get_read_db),
+):
+    hits = await buscar_gestiones(db, q, modo, limit)
+    return FastJSONResponse([dict(serialize_gestion_row(r), rank=rank) for r, rank in hits])
+
+
+# Resumen para tableros (tabla gestion_resumen, ver resumen.py): totales y conteos
+# por estado, tipo y responsable sin recorrer eventos.
+@router.get("/api/gestiones/summary")
+async def get_gestiones_summary(
+    estado_id: Optional[int] = None,
+    tipo: Optional[str] = None,
+    responsable_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_read_db),
+):
+    cat = await get_catalogo_async(db)
+    return FastJSONResponse(
+        await resumen.agrupado(db, cat, estado_id=estado_id, tipo=tipo, responsable_id=responsable_id)
+    )
 
 
-# Usuarios
-@app.get("/api/usuarios/")
-def list_usuarios(db: Session = Depends(get_db)):
-    users = db.query(Usuario).all()
-    return [{"id": u.id, "nombre": u.nombre, "correo": u.correo} for u in users]
-
-
-# Gestiones: LIST (LEE tipo con SELECT directo para asegurarnos)
-@app.get("/api/gestiones/")
-def list_gestiones(db: Session = Depends(get_db)):
-    gests = db.query(Gestion).all()
-    out = []
-    for g in gests:
-        # Leer 'tipo' directamente con SQL para evitar problemas de mapeo ORM
-        row = db.execute(text("SELECT tipo FROM gestion WHERE id = :id"), {"id": g.id}).fetchone()
-        tipo_val = row[0] if row is not None else None
-        out.append(
-            {
-                "id": g.id,
-                "nombre": g.nombre,
-                "descripcion": g.descripcion,
-                "estado_id": g.estado_id,
-                "tipo": tipo_val,
-                "responsable_id": g.responsable_id,
-                "fecha_creacion": _to_iso_z(g.fecha_creacion),
-            }
-        )
-    return out
+# Resumen por gestión (último evento, nº de eventos, desde cuándo en el estado);
+# mismos filtros, paginación keyset y ?nombres=true que /api/gestiones/.
+@router.get("/api/gestiones/summary/items")
+async def list_gestiones_summary(
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    estado_id: Optional[int] = None,
+    responsable_id: Optional[int] = None,
+    tipo: Optional[str] = None,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    nombres: bool = False,
+    db: AsyncSession = Depends(get_read_db),
+    cargadores: Cargadores = Depends(get_cargadores),
+):
+    stmt = resumen.items_query(
+        cursor=cursor,
+        estado_id=estado_id,
+        responsable_id=responsable_id,
+        tipo=tipo,
+        desde=desde,
+        hasta=hasta,
+    )
+    rows = (await db.execute(stmt.limit(limit + 1))).all()
+    rows, next_cursor = split_page(rows, limit, lambda r: (r.fecha_creacion, r.id))
+    items = [resumen.serialize_item_row(r) for r in rows]
+    if nombres:
+        await cargadores.embeber_nombres(items)
+    response = FastJSONResponse(items)
+    set_next_cursor(response, request, next_cursor)
+    return response
+
+
+# Analítica del flujo sobre el log de eventos (ver analitica.py). Resultados
+# cacheados; se refrescan incrementalmente desde el último evento procesado.
+@router.get("/api/analytics/permanencia")
+async def get_analytics_permanencia(tipo: Optional[str] = None, db: AsyncSession = Depends(get_read_db)):
+    motor = await analitica.get_motor(db)
+    cat = await get_catalogo_async(db)
+    estados = [dict(e, estado_nombre=cat.estado_nombre(e["estado_id"])) for e in motor.permanencia(tipo)]
+    return FastJSONResponse({"hasta_evento_id": motor.ultimo_evento_id, "estados": estados})
+
+
+@router.get("/api/analytics/ciclo")
+async def get_analytics_ciclo(tipo: Optional[str] = None, db: AsyncSession = Depends(get_read_db)):
+    motor = await analitica.get_motor(db)
+    return FastJSONResponse({"hasta_evento_id": motor.ultimo_evento_id, "tipos": motor.ciclo(tipo)})
+
+
+@router.get("/api/analytics/throughput")
+async def get_analytics_throughput(
+    desde: Optional[date] = None, hasta: Optional[date] = None, db: AsyncSession = Depends(get_read_db)
+):
+    motor = await analitica.get_motor(db)
+    return FastJSONResponse({"hasta_evento_id": motor.ultimo_evento_id, "dias": motor.throughput(desde, hasta)})
+
+
+# Cambios en tiempo real (ver tiempo_real.py). Sin filtros: todas las gestiones;
+# ?gestion_id=1&gestion_id=2 y/o ?estado_id=3 restringen (cualquiera que coincida).
+@router.get("/api/stream/gestiones")
+async def stream_gestiones(gestion_id: List[int] = Query([]), estado_id: List[int] = Query([])):
+    return StreamingResponse(
+        tiempo_real.sse(gestion_id, estado_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/api/ws/gestiones")
+async def ws_gestiones(websocket: WebSocket, gestion_id: List[int] = Query([]), estado_id: List[int] = Query([])):
+    await websocket.accept()
+    await tiempo_real.websocket(websocket, gestion_id, estado_id)
 
 
 # Gestiones: DETAIL (id o búsqueda por nombre)
-@app.get("/api/gestiones/{code}")
-def get_gestion_by_code(code: str, db: Session = Depends(get_db)):
-    g = None
+# Consultas acotadas: gestión + responsable (JOIN) y eventos ordenados (selectinload).
+# Los códigos no numéricos se resuelven con la búsqueda indexada (mejor rank).
+# Los nombres de estado salen del catálogo en memoria.
+# Si parte de la historia está archivada (archivo_eventos.py) se une con la de evento.
+@router.get("/api/gestiones/{code}")
+async def get_gestion_by_code(code: str, db: AsyncSession = Depends(get_read_db)):
+    stmt = select(Gestion, archivo_eventos.archivada_expr()).options(
+        joinedload(Gestion.responsable), selectinload(Gestion.eventos)
+    )
+    tags = []
     if _is_int(code):
-        g = db.query(Gestion).filter(Gestion.id == int(code)).first()
+        stmt = stmt.where(Gestion.id == int(code))
     else:
-        g = db.query(Gestion).filter(Gestion.nombre.ilike(f"%{code}%")).first()
-
-    if not g:
+        # El resultado por nombre depende de todas las gestiones
+        tags.append(TAG_LISTA)
+        # Mejor resultado de la búsqueda indexada (antes: ILIKE '%code%' y un match arbitrario)
+        hits = await buscar_gestiones(db, code, "prefijo", 1)
+        if not hits:
+            raise HTTPException(status_code=404, detail="Gestión no encontrada")
+        stmt = stmt.where(Gestion.id == hits[0][0].id)
+    row = (await db.execute(stmt.limit(1))).first()
+
+    if not row:
         raise HTTPException(status_code=404, detail="Gestión no encontrada")
+    g, archivada = row
 
-    # Leer tipo con SQL
-    row = db.execute(text("SELECT tipo FROM gestion WHERE id = :id"), {"id": g.id}).fetchone()
-    tipo_val = row[0] if row is not None else None
+    # (fecha, id, etapa) de ambas fuentes; lo archivado suele ser anterior pero se ordena igual
+    historia = [(ev.fecha, ev.id, serialize_etapa(ev)) for ev in g.eventos]
+    if archivada:
+        segmentos = (await db.execute(archivo_eventos.segmentos_query(g.id))).scalars().all()
+        archivados = await asyncio.to_thread(archivo_eventos.leer, segmentos)
+        historia += [(archivo_eventos.fecha_de(e), e["id"], {k: e[k] for k in ETAPA_KEYS}) for e in archivados]
+        historia.sort(key=lambda h: (h[0], h[1]))
 
-    estado_nombre = None
-    if g.estado_id:
-        est = db.query(CatalogoEstado).filter(CatalogoEstado.id == g.estado_id).first()
-        if est:
-            estado_nombre = est.nombre
-
-    eventos = db.query(Evento).filter(Evento.gestion_id == g.id).order_by(Evento.fecha.asc(), Evento.id.asc()).all()
+    cat = await get_catalogo_async(db, [g.estado_id] + [h[2]["estado_id"] for h in historia])
     etapas = []
-    for ev in eventos:
-        ev_estado_nombre = None
-        if ev.estado_id:
-            est2 = db.query(CatalogoEstado).filter(CatalogoEstado.id == ev.estado_id).first()
-            ev_estado_nombre = est2.nombre if est2 else None
-        etapas.append(
-            {
-                "id": ev.id,
-                "fecha": _to_iso_z(ev.fecha),
-                "comentario": ev.comentario,
-                "usuario_id": ev.usuario_id,
-                "estado_id": ev.estado_id,
-                "estado_nombre": ev_estado_nombre,
-            }
-        )
-
-    responsable_nombre = None
-    if g.responsable_id:
-        u = db.query(Usuario).filter(Usuario.id == g.responsable_id).first()
-        responsable_nombre = u.nombre if u else None
-
-    return {
+    for _, _, etapa in historia:
+        etapa["estado_nombre"] = cat.estado_nombre(etapa["estado_id"])
+        etapas.append(etapa)
+
+    response = FastJSONResponse({
         "id": g.id,
         "nombre": g.nombre,
         "descripcion": g.descripcion,
         "estado_id": g.estado_id,
-        "estado_nombre": estado_nombre,
-        "tipo": tipo_val,
+        "estado_nombre": cat.estado_nombre(g.estado_id),
+        "tipo": g.tipo,
         "responsable_id": g.responsable_id,
-        "responsable_nombre": responsable_nombre,
-        "fecha_creacion": _to_iso_z(g.fecha_creacion),
+        "responsable_nombre": g.responsable.nombre if g.responsable else None,
+        "fecha_creacion": to_iso_z(g.fecha_creacion),
+        # Para If-Match en PUT /api/gestiones/{id}
+        "version": g.version,
         "etapas": etapas,
-    }
+    })
+    # Nombres de estado del catálogo: caduca también si éste cambia
+    return etiquetar(response, tag_gestion(g.id), TAG_CATALOGO, *tags)
+
+
+# Estados que puede alcanzar una gestión desde su estado actual
+@router.get("/api/gestiones/{gestion_id}/alcanzables")
+async def get_gestion_alcanzables(
+    gestion_id: int, destino: Optional[int] = None, db: AsyncSession = Depends(get_read_db)
+):
+    row = (await db.execute(select(Gestion.estado_id).where(Gestion.id == gestion_id))).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Gestión no encontrada")
+    out = _alcance((await get_catalogo_async(db)).workflow, row.estado_id, destino)
+    out["gestion_id"] = gestion_id
+    return out
 
 
 # Crear evento / aplicar transición (fix: asignar fecha en el servidor)
-@app.post("/api/gestiones/{gestion_id}/eventos")
-def create_evento(gestion_id: int, payload: EventoCreate, db: Session = Depends(get_db)):
-    g = db.query(Gestion).filter(Gestion.id == gestion_id).first()
+@router.post("/api/gestiones/{gestion_id}/eventos")
+async def create_evento(
+    gestion_id: int,
+    payload: EventoCreate,
+    db: AsyncSession = Depends(get_async_db),
+    usuario: Optional[auth.UsuarioAutenticado] = Depends(auth.usuario_actual),
+):
+    # roles_allowed de la plantilla contra los roles del token (ya parseados): sin consultas
+    roles = auth.roles_de(usuario)
+    if usuario is not None:
+        # Con token el autor es el usuario autenticado, no el que diga el cuerpo
+        if payload.usuario_id not in (None, usuario.id):
+            raise _evento_rechazado(USUARIO_AJENO)
+        payload.usuario_id = usuario.id
+    if escritor_eventos.escritor is not None:
+        return await _create_evento_agrupado(gestion_id, payload, roles)
+    for _ in range(REINTENTOS_CONFLICTO):
+        try:
+            return await _registrar_evento(db, gestion_id, payload, roles)
+        except StaleDataError:
+            # Otra transición se confirmó entre la lectura y el UPDATE (gestion.version):
+            # se revalida contra el estado nuevo
+            await db.rollback()
+            metricas.conflictos += 1
+    raise _evento_rechazado(CONFLICTO_VERSION)
+
+
+# Un evento rechazado responde igual por la vía directa y por la agrupada (cuyo resultado
+# trae el mensaje de ingesta._Lote): mismos mensajes, mismo código
+_CODIGO_RECHAZO = {GESTION_NO_ENCONTRADA: 404, CONFLICTO_VERSION: 409, ROL_NO_PERMITIDO: 403, USUARIO_AJENO: 403}
+
+
+def _evento_rechazado(error):
+    return HTTPException(status_code=_CODIGO_RECHAZO.get(error, 400), detail=error)
+
+
+async def _registrar_evento(db: AsyncSession, gestion_id: int, payload: EventoCreate, roles):
+    """
+    Un intento: sin bloqueos, el cambio de estado es un compare-and-swap sobre version.
+    Valida lo mismo y en el mismo orden que la ingesta (_Lote._validar).
+    """
+    g = await db.get(Gestion, gestion_id)
     if not g:
-        raise HTTPException(status_code=404, detail="Gestión no encontrada")
-
-    if payload.apply_transition and payload.estado_id is not None:
-        if g.estado_id is not None:
-            allowed = (
-                db.query(EstadoTransicion)
-                .filter(EstadoTransicion.from_estado_id == g.estado_id, EstadoTransicion.to_estado_id == payload.estado_id)
-                .first()
-            )
-            if allowed is None:
-                raise HTTPException(status_code=400, detail="Transición no permitida desde el estado actual")
-
-        plantilla = (
-            db.query(ComentarioPlantilla)
-            .filter(ComentarioPlantilla.estado_id == payload.estado_id)
-            .filter(or_(ComentarioPlantilla.tipo_gestion == getattr(g, "tipo", None), ComentarioPlantilla.tipo_gestion == None))
-            .order_by(ComentarioPlantilla.tipo_gestion.desc())
-            .first()
-        )
-
-        if plantilla and plantilla.required and (not payload.comentario or payload.comentario.strip() == ""):
-            raise HTTPException(status_code=400, detail="Se requiere comentario para esta transición")
+        raise _evento_rechazado(GESTION_NO_ENCONTRADA)
+    estado_anterior = g.estado_id
+    if payload.usuario_id is not None and await db.get(Usuario, payload.usuario_id) is None:
+        raise _evento_rechazado(USUARIO_NO_ENCONTRADO)
+    if payload.estado_id is not None:
+        cat = await get_catalogo_async(db)
+        if cat.estado(payload.estado_id) is None:
+            raise _evento_rechazado(ESTADO_NO_ENCONTRADO)
+        if payload.apply_transition:
+            error = cat.workflow.validar(g.estado_id, payload.estado_id, g.tipo, payload.comentario, roles)
+            if error:
+                raise _evento_rechazado(error)
 
     # ===== FIX: asignar fecha del evento en el servidor si no viene desde el cliente =====
     fecha_evento = getattr(payload, "fecha", None)
@@ -263,19 +536,187 @@ def create_evento(gestion_id: int, payload: EventoCreate, db: Session = Depends(
         g.estado_id = payload.estado_id
         db.add(g)
 
-    db.commit()
-    db.refresh(nuevo_evento)
+    # Resumen materializado en la misma transacción (necesita el id del evento)
+    await db.flush()
+    await resumen.registrar_evento(db, g, nuevo_evento, estado_anterior)
+    tiempo_real.notificar(
+        db,
+        tipo="evento",
+        gestion_id=g.id,
+        evento_id=nuevo_evento.id,
+        estado_id=g.estado_id,
+        estado_anterior=estado_anterior,
+        fecha=to_iso_z(nuevo_evento.fecha),
+    )
+    # id y fecha ya están en el objeto (RETURNING del flush, expire_on_commit=False)
+    await db.commit()
+    # El listado sólo cambia si cambió el estado
+    invalidar_respuestas(tag_gestion(g.id), *([TAG_LISTA] if g.estado_id != estado_anterior else []))
 
-    return {
-        "id": nuevo_evento.id,
-        "gestion_id": nuevo_evento.gestion_id,
-        "usuario_id": nuevo_evento.usuario_id,
-        "fecha": _to_iso_z(nuevo_evento.fecha),
-        "comentario": nuevo_evento.comentario,
-        "estado_id": nuevo_evento.estado_id,
-    }
+    return FastJSONResponse(serialize_evento(nuevo_evento))
 
 
-@app.get("/")
+async def _create_evento_agrupado(gestion_id: int, payload: EventoCreate, roles):
+    """ESCRITURA_AGRUPADA: el evento se confirma junto con los demás encolados (escritor_eventos.py)."""
+    r = await escritor_eventos.escritor.escribir(EventoBulkItem(gestion_id=gestion_id, **payload.model_dump()), roles)
+    if not r["ok"]:
+        raise _evento_rechazado(r["error"])
+    return FastJSONResponse(
+        {
+            "id": r["id"],
+            "gestion_id": gestion_id,
+            "usuario_id": payload.usuario_id,
+            "fecha": r["fecha"],
+            "comentario": payload.comentario,
+            "estado_id": payload.estado_id,
+        }
+    )
+
+
+# Ingesta masiva: JSON array o NDJSON (application/x-ndjson, se lee en streaming).
+# Una transacción; respuesta con resultado por item (index, ok, id | error).
+@router.post("/api/eventos/bulk")
+async def create_eventos_bulk(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    usuario: Optional[auth.UsuarioAutenticado] = Depends(auth.usuario_actual),
+):
+    cat = await get_catalogo_async(db)
+    roles = auth.roles_de(usuario)
+    usuario_id = usuario.id if usuario is not None else None
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        try:
+            resultados = await ingestar_ndjson(db, cat, request.stream(), roles=roles, usuario_id=usuario_id)
+        except OverflowError:
+            raise HTTPException(status_code=413, detail=f"Máximo {MAX_ITEMS} eventos por petición")
+        except ConflictoVersion:
+            # El cuerpo ya se consumió en streaming: no se puede reintentar aquí
+            metricas.conflictos += 1
+            raise HTTPException(status_code=409, detail=CONFLICTO_VERSION)
+    else:
+        try:
+            items = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="JSON inválido")
+        if not isinstance(items, list):
+            raise HTTPException(status_code=400, detail="Se esperaba un array JSON de eventos")
+        if len(items) > MAX_ITEMS:
+            raise HTTPException(status_code=413, detail=f"Máximo {MAX_ITEMS} eventos por petición")
+        for intento in range(REINTENTOS_CONFLICTO):
+            try:
+                resultados = await ingestar_json(db, cat, items, roles, usuario_id)
+                break
+            except ConflictoVersion:
+                metricas.conflictos += 1
+        else:
+            raise HTTPException(status_code=409, detail=CONFLICTO_VERSION)
+    ok = sum(1 for r in resultados if r["ok"])
+    if ok:
+        invalidar_respuestas(TAG_LISTA, *{tag_gestion(r["gestion_id"]) for r in resultados if r["ok"]})
+    return FastJSONResponse({"total": len(resultados), "ok": ok, "errores": len(resultados) - ok, "resultados": resultados})
+
+
+# Exportación en streaming (mismos filtros que los listados)
+@router.get("/api/export/gestiones")
+def export_gestiones(
+    formato: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    gzip: bool = False,
+    estado_id: Optional[int] = None,
+    responsable_id: Optional[int] = None,
+    tipo: Optional[str] = None,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+):
+    stmt = gestiones_query(estado_id=estado_id, responsable_id=responsable_id, tipo=tipo, desde=desde, hasta=hasta)
+    columnas = [c.key for c in GESTION_COLUMNS]
+    return exportar(stmt, serialize_gestion_row, columnas, formato, "gestiones", gzip)
+
+
+@router.get("/api/export/eventos")
+def export_eventos(
+    formato: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    gzip: bool = False,
+    gestion_id: Optional[int] = None,
+    estado_id: Optional[int] = None,
+    usuario_id: Optional[int] = None,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+):
+    stmt = eventos_query(gestion_id=gestion_id, estado_id=estado_id, usuario_id=usuario_id, desde=desde, hasta=hasta)
+    columnas = [c.key for c in EVENTO_COLUMNS]
+    return exportar(stmt, serialize_evento_row, columnas, formato, "eventos", gzip)
+
+
+@router.get("/")
 def root():
-    return {"status": "ok", "message": "API Gestor funcionando (tipo fix)"}
\ No newline at end of file
+    return {"status": "ok", "message": "API Gestor funcionando (tipo fix)"}
+
+
+def create_app():
+    """
+    Construir la aplicación no toca la BD ni arranca hilos (eso es el lifespan, por
+    worker). La configuración es la de get_settings(), la misma que leen db, auth y las
+    cachés. `uvicorn main:app`, `uvicorn --factory main:create_app` o gunicorn con
+    gunicorn.conf.py (--preload).
+    """
+    settings = get_settings()
+    if settings.entorno != "desarrollo" and settings.jwt_secret == Settings.jwt_secret:
+        # Con la clave de ejemplo cualquiera puede firmar tokens
+        raise RuntimeError(f"JWT_SECRET no puede ser el valor por defecto con ENTORNO={settings.entorno}")
+    docs = settings.documentacion
+    app = FastAPI(
+        title="Gestor - API (tipo fix)",
+        lifespan=lifespan,
+        default_response_class=FastJSONResponse,
+        docs_url="/docs" if docs else None,
+        redoc_url="/redoc" if docs else None,
+        openapi_url="/openapi.json" if docs else None,
+    )
+
+    # Caché de GET con ETag (respuesta_cache.py); CORS se añade después para envolverla
+    app.add_middleware(CacheMiddleware)
+
+    # Token JWT (auth.py): por fuera de la caché para que un HIT no se salte la autenticación
+    app.add_middleware(auth.AuthMiddleware)
+
+    # CORS (CORS_ORIGENES)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=list(settings.cors_origenes),
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "Link", "ETag", "Server-Timing"],
+    )
+
+    # Consultas y tiempo de BD por request (Server-Timing, /metrics); el más externo para
+    # medir también las respuestas servidas desde la caché
+    app.add_middleware(InstrumentacionMiddleware)
+
+    # Escrituras de gestiones/usuarios y listado de eventos (routers/); los GET calientes
+    # de gestiones están en este módulo y van después
+    incluidos = [
+        (auth_router.router, "/api/auth", ["auth"]),
+        (gestiones_router.router, "/api/gestiones", ["gestiones"]),
+        (eventos_router.router, "/api/eventos", ["eventos"]),
+        (usuarios_router.router, "/api/usuarios", ["usuarios"]),
+    ]
+    if settings.rutas_admin:
+        incluidos.append((admin_router.router, "/api/admin", ["admin"]))
+    incluidos.append((router, "", None))
+    for r, prefijo, tags in incluidos:
+        app.include_router(r, prefix=prefijo, tags=tags)
+        # Etiqueta route= de /metrics con la plantilla completa (prefijo incluido)
+        registrar_rutas(r, prefijo)
+    return app
+
+
+def __getattr__(nombre):
+    # main.app se construye al pedirlo (uvicorn main:app, gunicorn, benchmarks): importar
+    # main o usar --factory no crea una segunda aplicación
+    global app
+    if nombre == "app":
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
@@ -0,0 +1,162 @@
+# migraciones/__init__.py
+# Migraciones versionadas del esquema (sustituyen a create_all al importar main).
+# - Cada migración es un módulo mNNNN_descripcion.py con subir(conn) y, opcionalmente,
+#   TRANSACCIONAL = False (p.ej. CREATE INDEX CONCURRENTLY, que no admite transacción).
+# - Las aplicadas se registran en schema_version; un advisory lock de Postgres evita que
+#   dos despliegues migren a la vez.
+# - Una migración ya publicada no se edita: los cambios van en una nueva. Las no
+#   transaccionales deben ser idempotentes (IF NOT EXISTS): si fallan a medias se reintentan.
+# - La API no ejecuta DDL al arrancar: sólo comprobar() consulta la versión y avisa.
+#   python -m migraciones [estado|subir|verificar]
+import importlib
+import logging
+import pkgutil
+import re
+import time
+from collections import namedtuple
+
+from sqlalchemy import Column, Integer, MetaData, String, Table, TIMESTAMP, func, inspect, select, text
+from sqlalchemy.exc import DBAPIError
+
+logger = logging.getLogger(__name__)
+
+# Clave arbitraria para pg_advisory_lock
+LOCK_ID = 0x6765_7374
+_NOMBRE = re.compile(r"m(\d{4})_\w+$")
+
+_meta = MetaData()
+schema_version = Table(
+    "schema_version",
+    _meta,
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("nombre", String(200), nullable=False),
+    Column("aplicada_en", TIMESTAMP, server_default=func.now()),
+    Column("duracion_ms", Integer),
+)
+
+Migracion = namedtuple("Migracion", "version nombre modulo")
+
+
+def disponibles():
+    out = []
+    for info in pkgutil.iter_modules(__path__):
+        m = _NOMBRE.match(info.name)
+        if m:
+            out.append(Migracion(int(m.group(1)), info.name, importlib.import_module(f"{__name__}.{info.name}")))
+    out.sort(key=lambda m: m.version)
+    versiones = [m.version for m in out]
+    if len(set(versiones)) != len(versiones):
+        raise RuntimeError(f"Versiones de migración repetidas: {versiones}")
+    return out
+
+
+def aplicadas(conn):
+    if not inspect(conn).has_table(schema_version.name):
+        return set()
+    return set(conn.execute(select(schema_version.c.version)).scalars())
+
+
+def pendientes(engine):
+    with engine.connect() as conn:
+        hechas = aplicadas(conn)
+    return [m for m in disponibles() if m.version not in hechas]
+
+
+def subir(engine, hasta=None, log=logger.info):
+    """Aplica en orden las migraciones pendientes (hasta `hasta` incluida). Devuelve las aplicadas."""
+    postgres = engine.dialect.name == "postgresql"
+    hechas = []
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as lock:
+        if postgres:
+            lock.execute(text("SELECT pg_advisory_lock(:k)"), {"k": LOCK_ID})
+        try:
+            _meta.create_all(lock, checkfirst=True)
+            ya = aplicadas(lock)
+            for m in disponibles():
+                if m.version in ya or (hasta is not None and m.version > hasta):
+                    continue
+                log(f"Aplicando {m.nombre}...")
+                t0 = time.perf_counter()
+                if getattr(m.modulo, "TRANSACCIONAL", True):
+                    with engine.begin() as conn:
+                        m.modulo.subir(conn)
+                        _registrar(conn, m, t0)
+                else:
+                    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                        m.modulo.subir(conn)
+                        _registrar(conn, m, t0)
+                log(f"  {m.nombre}: {(time.perf_counter() - t0) * 1000:.0f} ms")
+                hechas.append(m)
+        finally:
+            if postgres:
+                lock.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": LOCK_ID})
+    return hechas
+
+
+def _registrar(conn, m, t0):
+    conn.execute(
+        schema_version.insert().values(
+            version=m.version, nombre=m.nombre, duracion_ms=int((time.perf_counter() - t0) * 1000)
+        )
+    )
+
+
+def comprobar(engine):
+    """
+    Al arrancar la API: una sola consulta a schema_version (sin DDL ni inspección de tablas).
+    Avisa en el log si faltan migraciones; devuelve la versión de la BD (None si no hay).
+    """
+    ultima = disponibles()[-1].version
+    try:
+        with engine.connect() as conn:
+            actual = conn.execute(select(func.max(schema_version.c.version))).scalar()
+    except DBAPIError:
+        actual = None
+    if actual is None:
+        logger.warning("La BD no tiene esquema versionado: ejecutar `python -m migraciones subir`")
+    elif actual < ultima:
+        logger.warning("Esquema en la versión %s, hay migraciones pendientes hasta la %s", actual, ultima)
+    return actual
+
+
+def crear_indice(conn, nombre, tabla, columnas, using=None):
+    """
+    CREATE INDEX idempotente. En Postgres usa CONCURRENTLY (no bloquea escrituras en
+    tablas grandes como evento) y requiere una conexión en AUTOCOMMIT; si un intento
+    anterior dejó el índice inválido, lo borra y lo vuelve a crear.
+    """
+    if conn.dialect.name != "postgresql":
+        conn.exec_driver_sql(f"CREATE INDEX IF NOT EXISTS {nombre} ON {tabla} ({columnas})")
+        return
+    valido = conn.execute(
+        text(
+            "SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :n AND pg_table_is_visible(c.oid)"
+        ),
+        {"n": nombre},
+    ).scalar()
+    if valido is False:
+        conn.exec_driver_sql(f"DROP INDEX CONCURRENTLY IF EXISTS {nombre}")
+    metodo = f" USING {using}" if using else ""
+    conn.exec_driver_sql(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {nombre} ON {tabla}{metodo} ({columnas})")
+
+
+def verificar(engine, metadata):
+    """Diferencias entre los modelos y la BD (tablas, columnas e índices que faltan)."""
+    insp = inspect(engine)
+    postgres = engine.dialect.name == "postgresql"
+    faltan = []
+    for tabla in metadata.sorted_tables:
+        if not insp.has_table(tabla.name):
+            faltan.append(f"tabla {tabla.name}")
+            continue
+        columnas = {c["name"] for c in insp.get_columns(tabla.name)}
+        faltan += [f"columna {tabla.name}.{c.name}" for c in tabla.columns if c.name not in columnas]
+        indices = {i["name"] for i in insp.get_indexes(tabla.name)}
+        for idx in tabla.indexes:
+            # Índices de expresión (full-text) sólo existen en Postgres
+            if not postgres and any(not isinstance(e, Column) for e in idx.expressions):
+                continue
+            if idx.name not in indices:
+                faltan.append(f"índice {idx.name}")
+    return faltan
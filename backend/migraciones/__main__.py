@@ -0,0 +1,31 @@
+# python -m migraciones [estado|subir [version]|verificar]   (desde backend/, usa DATABASE_URL)
+import sys
+
+import migraciones
+from db import Base, engine
+import models  # noqa: F401  registra todas las tablas en Base.metadata
+
+
+def main(args):
+    orden = args[0] if args else "estado"
+    if orden == "subir":
+        hechas = migraciones.subir(engine, hasta=int(args[1]) if len(args) > 1 else None, log=print)
+        print(f"{len(hechas)} migraciones aplicadas" if hechas else "El esquema ya está al día")
+    elif orden == "estado":
+        pendientes = migraciones.pendientes(engine)
+        for m in migraciones.disponibles():
+            print(f"{'pendiente' if m in pendientes else 'aplicada '} {m.nombre}")
+    elif orden == "verificar":
+        faltan = migraciones.verificar(engine, Base.metadata)
+        for f in faltan:
+            print(f"falta {f}")
+        print("Esquema y modelos coinciden" if not faltan else "Hace falta una migración nueva")
+        return 1 if faltan else 0
+    else:
+        print("uso: python -m migraciones [estado|subir [version]|verificar]")
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
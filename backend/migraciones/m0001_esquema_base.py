@@ -0,0 +1,78 @@
+# Esquema base: las tablas tal como las creaba create_all. Copia congelada (no importa
+# models): los cambios posteriores de los modelos van en migraciones nuevas.
+# checkfirst: en una BD creada antes con create_all sólo falta lo que no existía.
+from sqlalchemy import Boolean, Column, ForeignKey, Integer, MetaData, String, Table, Text, TIMESTAMP, func
+
+meta = MetaData()
+
+Table(
+    "catalogo_estado",
+    meta,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("nombre", String(50), nullable=False),
+    Column("orden", Integer),
+    Column("is_terminal", Boolean),
+)
+Table(
+    "estado_transiciones",
+    meta,
+    Column("from_estado_id", Integer, ForeignKey("catalogo_estado.id", ondelete="CASCADE"), primary_key=True),
+    Column("to_estado_id", Integer, ForeignKey("catalogo_estado.id", ondelete="CASCADE"), primary_key=True),
+)
+Table(
+    "usuario",
+    meta,
+    Column("id", Integer, primary_key=True),
+    Column("nombre", String(100)),
+    Column("correo", String(100)),
+)
+Table(
+    "gestion",
+    meta,
+    Column("id", Integer, primary_key=True),
+    Column("nombre", String(100), nullable=False),
+    Column("descripcion", Text),
+    Column("estado_id", Integer, ForeignKey("catalogo_estado.id")),
+    Column("responsable_id", Integer, ForeignKey("usuario.id")),
+    Column("fecha_creacion", TIMESTAMP, server_default=func.now()),
+    Column("tipo", String(100)),
+)
+Table(
+    "evento",
+    meta,
+    Column("id", Integer, primary_key=True),
+    Column("gestion_id", Integer, ForeignKey("gestion.id")),
+    Column("usuario_id", Integer, ForeignKey("usuario.id")),
+    Column("fecha", TIMESTAMP, server_default=func.now()),
+    Column("comentario", Text),
+    Column("estado_id", Integer, ForeignKey("catalogo_estado.id")),
+)
+Table(
+    "comentario_plantilla",
+    meta,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("tipo_gestion", String(100)),
+    Column("estado_id", Integer, ForeignKey("catalogo_estado.id", ondelete="CASCADE"), nullable=False),
+    Column("titulo", String(200)),
+    Column("template", Text),
+    Column("required", Boolean),
+    Column("roles_allowed", String(200)),
+    Column("created_at", TIMESTAMP, server_default=func.now()),
+    Column("updated_at", TIMESTAMP, server_default=func.now()),
+)
+Table(
+    "gestion_resumen",
+    meta,
+    Column("gestion_id", Integer, ForeignKey("gestion.id", ondelete="CASCADE"), primary_key=True),
+    Column("estado_id", Integer, ForeignKey("catalogo_estado.id")),
+    Column("tipo", String(100)),
+    Column("responsable_id", Integer, ForeignKey("usuario.id")),
+    Column("num_eventos", Integer, nullable=False),
+    Column("ultimo_evento_id", Integer),
+    Column("ultimo_evento_fecha", TIMESTAMP),
+    Column("estado_desde", TIMESTAMP),
+)
+
+
+def subir(conn):
+    meta.create_all(conn, checkfirst=True)
@@ -0,0 +1,33 @@
+# Índices de las consultas calientes (antes sql/indices.sql, a mano). Fuera de transacción:
+# en Postgres se crean con CONCURRENTLY para no bloquear escrituras en evento/gestion.
+from migraciones import crear_indice
+
+TRANSACCIONAL = False
+
+INDICES = [
+    # Paginación keyset (fecha_creacion, id), con y sin filtro por estado / responsable
+    ("ix_gestion_fecha_creacion_id", "gestion", "fecha_creacion, id"),
+    ("ix_gestion_estado_fecha_creacion_id", "gestion", "estado_id, fecha_creacion, id"),
+    ("ix_gestion_responsable_fecha_creacion_id", "gestion", "responsable_id, fecha_creacion, id"),
+    # Historial global y línea de tiempo por gestión
+    ("ix_evento_fecha_id", "evento", "fecha, id"),
+    ("ix_evento_gestion_fecha_id", "evento", "gestion_id, fecha, id"),
+    ("ix_comentario_plantilla_estado_tipo", "comentario_plantilla", "estado_id, tipo_gestion"),
+    ("ix_gestion_resumen_estado", "gestion_resumen", "estado_id"),
+    ("ix_gestion_resumen_tipo", "gestion_resumen", "tipo"),
+    ("ix_gestion_resumen_responsable", "gestion_resumen", "responsable_id"),
+]
+
+
+def subir(conn):
+    for nombre, tabla, columnas in INDICES:
+        crear_indice(conn, nombre, tabla, columnas)
+    if conn.dialect.name == "postgresql":
+        # Búsqueda full-text (busqueda.py): la expresión debe coincidir con la de la consulta
+        crear_indice(
+            conn,
+            "ix_gestion_busqueda",
+            "gestion",
+            "to_tsvector('spanish'::regconfig, coalesce(nombre, '') || ' ' || coalesce(descripcion, ''))",
+            using="GIN",
+        )
@@ -0,0 +1,31 @@
+# Triggers que avisan a los workers (LISTEN catalogo_cambio) cuando cambian los catálogos,
+# para que invaliden su snapshot en memoria (catalogo_cache.py). Antes sql/catalogo_notify.sql.
+# Sólo Postgres; en SQLite los catálogos caducan por TTL.
+SQL = """
+CREATE OR REPLACE FUNCTION notify_catalogo_cambio() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('catalogo_cambio', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_catalogo_estado_notify ON catalogo_estado;
+CREATE TRIGGER trg_catalogo_estado_notify
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON catalogo_estado
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_catalogo_cambio();
+
+DROP TRIGGER IF EXISTS trg_estado_transiciones_notify ON estado_transiciones;
+CREATE TRIGGER trg_estado_transiciones_notify
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON estado_transiciones
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_catalogo_cambio();
+
+DROP TRIGGER IF EXISTS trg_comentario_plantilla_notify ON comentario_plantilla;
+CREATE TRIGGER trg_comentario_plantilla_notify
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON comentario_plantilla
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_catalogo_cambio();
+"""
+
+
+def subir(conn):
+    if conn.dialect.name == "postgresql":
+        conn.exec_driver_sql(SQL)
@@ -0,0 +1,28 @@
+# Índice de los segmentos de eventos archivados en almacenamiento frío (archivo_eventos.py).
+from sqlalchemy import BigInteger, Column, ForeignKey, Index, Integer, MetaData, String, Table, TIMESTAMP, func
+
+meta = MetaData()
+
+# Referencia para la FK; ya existe (m0001) y create_all no la toca
+Table("gestion", meta, Column("id", Integer, primary_key=True))
+
+Table(
+    "evento_archivado",
+    meta,
+    Column("id", Integer, primary_key=True),
+    Column("gestion_id", Integer, ForeignKey("gestion.id", ondelete="CASCADE"), nullable=False),
+    Column("archivo", String(255), nullable=False),
+    Column("posicion", BigInteger, nullable=False),
+    Column("longitud", Integer, nullable=False),
+    Column("num_eventos", Integer, nullable=False),
+    Column("primer_evento_id", Integer),
+    Column("ultimo_evento_id", Integer),
+    Column("desde", TIMESTAMP),
+    Column("hasta", TIMESTAMP),
+    Column("archivado_en", TIMESTAMP, server_default=func.now()),
+    Index("ix_evento_archivado_gestion", "gestion_id"),
+)
+
+
+def subir(conn):
+    meta.tables["evento_archivado"].create(conn, checkfirst=True)
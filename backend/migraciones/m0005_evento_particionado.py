@@ -0,0 +1,63 @@
+# evento particionada por mes de fecha (sólo Postgres; en SQLite no hace nada).
+# Sin copiar filas: la tabla actual pasa a ser la partición evento_historico (MINVALUE hasta
+# el corte). Los pasos que recorren la tabla (VALIDATE, índice único) no bloquean escrituras;
+# el cambio de nombre y el ATTACH van en una transacción corta.
+from datetime import datetime
+
+import particiones
+
+TRANSACCIONAL = False
+MESES_ADELANTE = 3
+
+
+def subir(conn):
+    if conn.dialect.name != "postgresql" or particiones.particionada(conn):
+        return
+    # Al menos un mes de margen: las filas nuevas deben caer antes del corte hasta el ATTACH
+    corte = particiones.inicio_mes(datetime.utcnow(), 2)
+
+    # 1. fecha es la clave de partición: sin NULL. Un CHECK validado permite después
+    #    SET NOT NULL y ATTACH sin volver a recorrer la tabla.
+    conn.exec_driver_sql("UPDATE evento SET fecha = now() WHERE fecha IS NULL")
+    conn.exec_driver_sql("ALTER TABLE evento DROP CONSTRAINT IF EXISTS evento_historico_rango")
+    conn.exec_driver_sql(
+        f"ALTER TABLE evento ADD CONSTRAINT evento_historico_rango "
+        f"CHECK (fecha IS NOT NULL AND fecha < '{corte:%Y-%m-%d}') NOT VALID"
+    )
+    conn.exec_driver_sql("ALTER TABLE evento VALIDATE CONSTRAINT evento_historico_rango")
+    # 2. La PK de una tabla particionada debe incluir la clave: (id, fecha)
+    conn.exec_driver_sql("DROP INDEX CONCURRENTLY IF EXISTS evento_historico_id_fecha")
+    conn.exec_driver_sql("CREATE UNIQUE INDEX CONCURRENTLY evento_historico_id_fecha ON evento (id, fecha)")
+
+    # 3. Cambio breve: padre particionado con los mismos índices, FKs y secuencia
+    with conn.engine.begin() as tx:
+        tx.exec_driver_sql("LOCK TABLE evento IN ACCESS EXCLUSIVE MODE")
+        tx.exec_driver_sql("ALTER TABLE evento RENAME TO evento_historico")
+        tx.exec_driver_sql("ALTER INDEX ix_evento_fecha_id RENAME TO ix_evento_historico_fecha_id")
+        tx.exec_driver_sql("ALTER INDEX ix_evento_gestion_fecha_id RENAME TO ix_evento_historico_gestion_fecha_id")
+        tx.exec_driver_sql("ALTER TABLE evento_historico ALTER COLUMN fecha SET NOT NULL")
+        tx.exec_driver_sql(
+            """
+            CREATE TABLE evento (
+                id INTEGER NOT NULL DEFAULT nextval('evento_id_seq'),
+                gestion_id INTEGER REFERENCES gestion (id),
+                usuario_id INTEGER REFERENCES usuario (id),
+                fecha TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT now(),
+                comentario TEXT,
+                estado_id INTEGER REFERENCES catalogo_estado (id),
+                PRIMARY KEY (id, fecha)
+            ) PARTITION BY RANGE (fecha)
+            """
+        )
+        tx.exec_driver_sql("ALTER SEQUENCE evento_id_seq OWNED BY evento.id")
+        tx.exec_driver_sql("CREATE INDEX ix_evento_fecha_id ON evento (fecha, id)")
+        tx.exec_driver_sql("CREATE INDEX ix_evento_gestion_fecha_id ON evento (gestion_id, fecha, id)")
+        # ATTACH reutiliza los índices equivalentes de la partición y no la recorre (CHECK validado)
+        tx.exec_driver_sql(
+            f"ALTER TABLE evento ATTACH PARTITION evento_historico FOR VALUES FROM (MINVALUE) TO ('{corte:%Y-%m-%d}')"
+        )
+        tx.exec_driver_sql(f"CREATE TABLE {particiones.DEFAULT} PARTITION OF evento DEFAULT")
+    conn.exec_driver_sql("ALTER TABLE evento_historico DROP CONSTRAINT evento_historico_rango")
+
+    # 4. Los próximos meses (después, cron con `python particiones.py`)
+    particiones.asegurar(conn.engine, MESES_ADELANTE)
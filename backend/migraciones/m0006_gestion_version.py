@@ -0,0 +1,9 @@
+# gestion.version para el control de concurrencia optimista (transiciones e If-Match).
+# Columna con default constante: en Postgres 11+ no reescribe la tabla.
+from sqlalchemy import inspect
+
+
+def subir(conn):
+    if "version" in {c["name"] for c in inspect(conn).get_columns("gestion")}:
+        return
+    conn.exec_driver_sql("ALTER TABLE gestion ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
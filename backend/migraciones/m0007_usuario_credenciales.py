@@ -0,0 +1,17 @@
+# Credenciales para el login JWT (auth.py): hash bcrypt y roles del usuario. Índice por
+# correo para el login (se busca por correo).
+from sqlalchemy import inspect
+
+from migraciones import crear_indice
+
+# El índice va con CONCURRENTLY en Postgres
+TRANSACCIONAL = False
+
+
+def subir(conn):
+    columnas = {c["name"] for c in inspect(conn).get_columns("usuario")}
+    if "password_hash" not in columnas:
+        conn.exec_driver_sql("ALTER TABLE usuario ADD COLUMN password_hash VARCHAR(255)")
+    if "roles" not in columnas:
+        conn.exec_driver_sql("ALTER TABLE usuario ADD COLUMN roles VARCHAR(200)")
+    crear_indice(conn, "ix_usuario_correo", "usuario", "correo")
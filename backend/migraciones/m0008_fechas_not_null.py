@@ -0,0 +1,30 @@
+# gestion.fecha_creacion y evento.fecha son la clave de la paginación keyset
+# (pagination.py): una fila con NULL quedaba fuera de (fecha, id) > cursor y rompía
+# encode_cursor. Se rellenan y pasan a NOT NULL.
+# - gestion sin fecha: la de su primer evento o, sin eventos, la actual.
+# - En Postgres evento.fecha ya es NOT NULL (clave de partición, m0005). En gestion el
+#   CHECK validado permite SET NOT NULL sin recorrer la tabla con el bloqueo exclusivo.
+# - SQLite no altera columnas: sólo el relleno (las filas nuevas llevan default).
+
+# Sin transacción: cada paso es idempotente y VALIDATE no retiene los bloqueos del UPDATE
+TRANSACCIONAL = False
+
+_RELLENO_GESTION = (
+    "UPDATE gestion SET fecha_creacion = COALESCE("
+    "(SELECT min(e.fecha) FROM evento e WHERE e.gestion_id = gestion.id), CURRENT_TIMESTAMP) "
+    "WHERE fecha_creacion IS NULL"
+)
+
+
+def subir(conn):
+    conn.exec_driver_sql(_RELLENO_GESTION)
+    if conn.dialect.name != "postgresql":
+        conn.exec_driver_sql("UPDATE evento SET fecha = CURRENT_TIMESTAMP WHERE fecha IS NULL")
+        return
+    conn.exec_driver_sql("ALTER TABLE gestion DROP CONSTRAINT IF EXISTS gestion_fecha_creacion_nn")
+    conn.exec_driver_sql(
+        "ALTER TABLE gestion ADD CONSTRAINT gestion_fecha_creacion_nn CHECK (fecha_creacion IS NOT NULL) NOT VALID"
+    )
+    conn.exec_driver_sql("ALTER TABLE gestion VALIDATE CONSTRAINT gestion_fecha_creacion_nn")
+    conn.exec_driver_sql("ALTER TABLE gestion ALTER COLUMN fecha_creacion SET NOT NULL")
+    conn.exec_driver_sql("ALTER TABLE gestion DROP CONSTRAINT gestion_fecha_creacion_nn")
@@ -0,0 +1,44 @@
+# Relleno de gestion_resumen (resumen.py): una fila por gestión que no la tenga,
+# calculada desde sus eventos con el mismo criterio que resumen.reconstruir. Después de
+# los índices (m0002) y del archivo (m0004): las gestiones con historia archivada se
+# dejan como están, igual que en la reconstrucción.
+# Un solo INSERT ... SELECT: un recorrido ordenado de evento con funciones de ventana
+# y GROUP BY por gestión, sin subconsultas correlacionadas.
+#   rn:    posición del evento empezando por el último, en orden (fecha, id)
+#   otros: eventos desde él hasta el último que registran un estado distinto del actual;
+#          0 = está en el último tramo con el estado actual (estado_desde = el más antiguo)
+_RELLENO = """
+INSERT INTO gestion_resumen (
+    gestion_id, estado_id, tipo, responsable_id,
+    num_eventos, ultimo_evento_id, ultimo_evento_fecha, estado_desde
+)
+SELECT
+    g.id, g.estado_id, g.tipo, g.responsable_id,
+    COALESCE(r.num_eventos, 0), r.ultimo_evento_id, r.ultimo_evento_fecha, r.estado_desde
+FROM gestion g
+LEFT JOIN (
+    SELECT
+        ev.gestion_id,
+        count(*) AS num_eventos,
+        max(CASE WHEN ev.rn = 1 THEN ev.id END) AS ultimo_evento_id,
+        max(CASE WHEN ev.rn = 1 THEN ev.fecha END) AS ultimo_evento_fecha,
+        min(CASE WHEN ev.estado_id = ev.actual AND ev.otros = 0 THEN ev.fecha END) AS estado_desde
+    FROM (
+        SELECT
+            e.gestion_id, e.id, e.fecha, e.estado_id, g2.estado_id AS actual,
+            row_number() OVER ultimos AS rn,
+            sum(CASE WHEN e.estado_id IS NOT NULL AND e.estado_id <> g2.estado_id THEN 1 ELSE 0 END)
+                OVER (ultimos ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW) AS otros
+        FROM evento e
+        JOIN gestion g2 ON g2.id = e.gestion_id
+        WINDOW ultimos AS (PARTITION BY e.gestion_id ORDER BY e.fecha DESC, e.id DESC)
+    ) ev
+    GROUP BY ev.gestion_id
+) r ON r.gestion_id = g.id
+WHERE NOT EXISTS (SELECT 1 FROM gestion_resumen gr WHERE gr.gestion_id = g.id)
+  AND NOT EXISTS (SELECT 1 FROM evento_archivado a WHERE a.gestion_id = g.id)
+"""
+
+
+def subir(conn):
+    conn.exec_driver_sql(_RELLENO)
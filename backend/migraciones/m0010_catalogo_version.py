@@ -0,0 +1,25 @@
+# Contador de versión de los catálogos (sólo Postgres), incrementado por los mismos
+# triggers de m0003 en la transacción del cambio. El snapshot guarda la versión con la que
+# se cargó; al (re)conectar, el listener de catalogo_cache compara con una consulta de una
+# fila en vez de invalidar a ciegas. Así los workers de gunicorn conservan el snapshot
+# precargado en el maestro si los catálogos no cambiaron desde el fork.
+SQL = """
+CREATE TABLE IF NOT EXISTS catalogo_version (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    version BIGINT NOT NULL DEFAULT 0
+);
+INSERT INTO catalogo_version (id, version) VALUES (TRUE, 0) ON CONFLICT (id) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION notify_catalogo_cambio() RETURNS trigger AS $$
+BEGIN
+    UPDATE catalogo_version SET version = version + 1;
+    PERFORM pg_notify('catalogo_cambio', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+
+def subir(conn):
+    if conn.dialect.name == "postgresql":
+        conn.exec_driver_sql(SQL)
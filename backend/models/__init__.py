@@ -1,4 +1,4 @@
-from .models import CatalogoEstado, EstadoTransicion, Usuario, Gestion, Evento, ComentarioPlantilla
+from .models import CatalogoEstado, EstadoTransicion, Usuario, Gestion, Evento, ComentarioPlantilla, GestionResumen, EventoArchivado
 
 __all__ = [
     "CatalogoEstado",
@@ -7,4 +7,6 @@ __all__ = [
     "Gestion",
     "Evento",
     "ComentarioPlantilla",
+    "GestionResumen",
+    "EventoArchivado",
 ]
\ No newline at end of file
@@ -1,6 +1,13 @@
 # backend/models/models.py
-# Modelos SQLAlchemy (incluye ComentarioPlantilla)
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, TIMESTAMP, Boolean
+# Modelos SQLAlchemy: única definición del esquema (importar siempre desde `models`).
+# Las fechas se guardan en UTC sin zona: default en Python (utcnow) para el ORM y
+# server_default now() para inserts que no pasan por él.
+# Todo cambio de esquema aquí necesita su migración en migraciones/ (create_all sólo se
+# usa en los benchmarks); `python -m migraciones verificar` detecta las que falten.
+from datetime import datetime
+
+from sqlalchemy import BigInteger, Column, Integer, String, Text, ForeignKey, TIMESTAMP, Boolean, Index, text
+from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from db import Base
 
@@ -27,6 +34,14 @@ class Usuario(Base):
     id = Column(Integer, primary_key=True)
     nombre = Column(String(100))
     correo = Column(String(100))
+    # Login (auth.py): hash bcrypt y roles separados por comas, como roles_allowed
+    password_hash = Column(String(255))
+    roles = Column(String(200))
+
+    gestiones = relationship("Gestion", back_populates="responsable")
+    eventos = relationship("Evento", back_populates="usuario")
+
+    __table_args__ = (Index("ix_usuario_correo", "correo"),)
 
     def __repr__(self):
         return f"<Usuario id={self.id} nombre={self.nombre}>"
@@ -38,7 +53,36 @@ class Gestion(Base):
     descripcion = Column(Text)
     estado_id = Column(Integer, ForeignKey("catalogo_estado.id"))
     responsable_id = Column(Integer, ForeignKey("usuario.id"))
-    fecha_creacion = Column(TIMESTAMP, server_default=func.now())
+    fecha_creacion = Column(TIMESTAMP, nullable=False, default=datetime.utcnow, server_default=func.now())
+    tipo = Column(String(100))
+    # Control optimista: el ORM emite UPDATE ... WHERE id = :id AND version = :v (versión
+    # incrementada) y lanza StaleDataError si otra transacción la cambió antes
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+
+    responsable = relationship("Usuario", back_populates="gestiones")
+    estado = relationship("CatalogoEstado")
+    # Línea de tiempo ya ordenada; cargar con selectinload para evitar N+1.
+    # El historial es de sólo inserción: borrar la gestión no toca sus eventos (ni los
+    # carga ni los desvincula); la FK lo impide mientras existan.
+    eventos = relationship(
+        "Evento", back_populates="gestion", order_by="(Evento.fecha, Evento.id)", passive_deletes="all"
+    )
+
+    # Índices para la paginación keyset (fecha_creacion, id), con y sin filtro.
+    # (estado_id, ...) y (responsable_id, ...) sirven también a los filtros/GROUP BY sólo
+    # por estado_id o responsable_id: un índice de una columna sería redundante.
+    __table_args__ = (
+        Index("ix_gestion_fecha_creacion_id", "fecha_creacion", "id"),
+        Index("ix_gestion_estado_fecha_creacion_id", "estado_id", "fecha_creacion", "id"),
+        Index("ix_gestion_responsable_fecha_creacion_id", "responsable_id", "fecha_creacion", "id"),
+        # Búsqueda full-text (busqueda.py); sólo existe en Postgres
+        Index(
+            "ix_gestion_busqueda",
+            text("to_tsvector('spanish'::regconfig, coalesce(nombre, '') || ' ' || coalesce(descripcion, ''))"),
+            postgresql_using="gin",
+        ).ddl_if(dialect="postgresql"),
+    )
+    __mapper_args__ = {"version_id_col": version}
 
     def __repr__(self):
         return f"<Gestion id={self.id} nombre={self.nombre}>"
@@ -48,13 +92,73 @@ class Evento(Base):
     id = Column(Integer, primary_key=True)
     gestion_id = Column(Integer, ForeignKey("gestion.id"))
     usuario_id = Column(Integer, ForeignKey("usuario.id"))
-    fecha = Column(TIMESTAMP, server_default=func.now())
+    fecha = Column(TIMESTAMP, nullable=False, default=datetime.utcnow, server_default=func.now())
     comentario = Column(Text)
     estado_id = Column(Integer, ForeignKey("catalogo_estado.id"))
 
+    gestion = relationship("Gestion", back_populates="eventos")
+    usuario = relationship("Usuario", back_populates="eventos")
+    estado = relationship("CatalogoEstado")
+
+    # En Postgres la tabla está particionada por mes de fecha (migraciones/m0005,
+    # particiones.py) y su PK real es (id, fecha); para el ORM basta con id.
+    __table_args__ = (
+        Index("ix_evento_fecha_id", "fecha", "id"),
+        Index("ix_evento_gestion_fecha_id", "gestion_id", "fecha", "id"),
+    )
+
     def __repr__(self):
         return f"<Evento id={self.id} gestion={self.gestion_id}>"
 
+class EventoArchivado(Base):
+    """
+    Segmento de la historia de una gestión movido a almacenamiento frío (archivo_eventos.py):
+    un miembro gzip de `archivo` que empieza en `posicion` y ocupa `longitud` bytes.
+    """
+    __tablename__ = "evento_archivado"
+    id = Column(Integer, primary_key=True)
+    gestion_id = Column(Integer, ForeignKey("gestion.id", ondelete="CASCADE"), nullable=False)
+    archivo = Column(String(255), nullable=False)  # relativo a ARCHIVO_EVENTOS_DIR
+    posicion = Column(BigInteger, nullable=False)
+    longitud = Column(Integer, nullable=False)
+    num_eventos = Column(Integer, nullable=False)
+    primer_evento_id = Column(Integer)
+    ultimo_evento_id = Column(Integer)
+    desde = Column(TIMESTAMP)
+    hasta = Column(TIMESTAMP)
+    archivado_en = Column(TIMESTAMP, default=datetime.utcnow, server_default=func.now())
+
+    __table_args__ = (Index("ix_evento_archivado_gestion", "gestion_id"),)
+
+    def __repr__(self):
+        return f"<EventoArchivado gestion={self.gestion_id} eventos={self.num_eventos}>"
+
+class GestionResumen(Base):
+    """
+    Proyección materializada por gestión (resumen.py): estado actual, último evento,
+    número de eventos y desde cuándo está en el estado. La mantiene create_evento /
+    la ingesta masiva en la misma transacción; `python resumen.py` la reconstruye.
+    """
+    __tablename__ = "gestion_resumen"
+    gestion_id = Column(Integer, ForeignKey("gestion.id", ondelete="CASCADE"), primary_key=True)
+    estado_id = Column(Integer, ForeignKey("catalogo_estado.id"))
+    tipo = Column(String(100))
+    responsable_id = Column(Integer, ForeignKey("usuario.id"))
+    num_eventos = Column(Integer, nullable=False, default=0)
+    ultimo_evento_id = Column(Integer)
+    ultimo_evento_fecha = Column(TIMESTAMP)
+    # NULL = sin transiciones registradas: en el estado desde gestion.fecha_creacion
+    estado_desde = Column(TIMESTAMP)
+
+    __table_args__ = (
+        Index("ix_gestion_resumen_estado", "estado_id"),
+        Index("ix_gestion_resumen_tipo", "tipo"),
+        Index("ix_gestion_resumen_responsable", "responsable_id"),
+    )
+
+    def __repr__(self):
+        return f"<GestionResumen gestion={self.gestion_id} eventos={self.num_eventos}>"
+
 class ComentarioPlantilla(Base):
     __tablename__ = "comentario_plantilla"
     id = Column(Integer, primary_key=True, index=True)
@@ -67,5 +171,10 @@ class ComentarioPlantilla(Base):
     created_at = Column(TIMESTAMP, server_default=func.now())
     updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
 
+    estado = relationship("CatalogoEstado")
+
+    # plantilla_para(estado_id, tipo) y la carga del catálogo filtran por estos dos
+    __table_args__ = (Index("ix_comentario_plantilla_estado_tipo", "estado_id", "tipo_gestion"),)
+
     def __repr__(self):
         return f"<ComentarioPlantilla id={self.id} estado_id={self.estado_id} tipo={self.tipo_gestion}>"
\ No newline at end of file
@@ -0,0 +1,58 @@
+# pagination.py
+# Paginación por keyset (cursor opaco sobre (fecha, id)).
+# El costo de la página N es el mismo que el de la página 1: se filtra con
+# (fecha, id) > (fecha_cursor, id_cursor) sobre un índice compuesto, sin OFFSET.
+# Las columnas de fecha son NOT NULL (migraciones/m0008): un NULL no entraría en la
+# comparación y la fila no saldría en ninguna página.
+import base64
+import json
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 500
+
+
+def encode_cursor(fecha, id_):
+    raw = json.dumps([fecha.isoformat(), id_], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        fecha, id_ = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(fecha), int(id_)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def apply_keyset(stmt, fecha_col, id_col, cursor=None):
+    """Ordena por (fecha, id) y, si hay cursor, continúa después de esa fila."""
+    stmt = stmt.order_by(fecha_col, id_col)
+    if cursor:
+        fecha, id_ = decode_cursor(cursor)
+        stmt = stmt.where(tuple_(fecha_col, id_col) > tuple_(fecha, id_))
+    return stmt
+
+
+def split_page(rows, limit, key):
+    """
+    rows viene de una consulta con LIMIT limit + 1.
+    Devuelve (filas_de_la_página, next_cursor o None); key(fila) -> (fecha, id).
+    """
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(*key(rows[-1]))
+
+
+def set_next_cursor(response, request, next_cursor):
+    """Expone el siguiente cursor en X-Next-Cursor y en un Link rel="next"."""
+    if next_cursor is None:
+        return
+    response.headers["X-Next-Cursor"] = next_cursor
+    url = request.url.include_query_params(cursor=next_cursor)
+    response.headers["Link"] = f'<{url}>; rel="next"'
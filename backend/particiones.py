@@ -0,0 +1,104 @@
+# particiones.py
+# Particiones mensuales de evento por fecha (sólo Postgres; la conversión la hace
+# migraciones/m0005_evento_particionado.py).
+# - evento_historico: la tabla original, adjuntada como partición hasta el mes de la migración.
+# - evento_pAAAAMM: una por mes, creadas por adelantado con asegurar().
+# - evento_default: red de seguridad; si recibió filas de un mes que luego se crea, se
+#   mueven a su partición al crearla.
+# Ejecutar mensualmente (cron) para tener siempre los próximos meses creados:
+#   python particiones.py [meses]     (por defecto 3)
+import re
+import sys
+from datetime import datetime
+
+from sqlalchemy import text
+
+PADRE = "evento"
+DEFAULT = "evento_default"
+_HASTA = re.compile(r"TO \('([^']+)'\)")
+
+
+def particionada(conn):
+    if conn.dialect.name != "postgresql":
+        return False
+    tipo = conn.execute(
+        text("SELECT relkind FROM pg_class WHERE relname = :t AND pg_table_is_visible(oid)"), {"t": PADRE}
+    ).scalar()
+    return tipo == "p"
+
+
+def inicio_mes(fecha, meses=0):
+    """Primer día del mes de `fecha` desplazado `meses` meses."""
+    n = fecha.year * 12 + fecha.month - 1 + meses
+    return datetime(n // 12, n % 12 + 1, 1)
+
+
+def nombre(mes):
+    return f"{PADRE}_p{mes:%Y%m}"
+
+
+def listar(conn):
+    """[(partición, límites, filas estimadas)] en orden de creación."""
+    return conn.execute(
+        text(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::bigint "
+            "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = CAST(:t AS regclass) ORDER BY c.oid"
+        ),
+        {"t": PADRE},
+    ).all()
+
+
+def _hasta_maximo(conn):
+    limites = [datetime.fromisoformat(m.group(1)) for _, b, _ in listar(conn) if (m := _HASTA.search(b or ""))]
+    return max(limites, default=None)
+
+
+def crear_mes(engine, mes):
+    """
+    Crea la partición del mes en una transacción corta: tabla suelta, mueve las filas que
+    hubieran caído en evento_default y la adjunta (los índices del padre se crean solos).
+    """
+    desde, hasta = inicio_mes(mes), inicio_mes(mes, 1)
+    tabla = nombre(desde)
+    with engine.begin() as conn:
+        conn.exec_driver_sql(f"CREATE TABLE {tabla} (LIKE {PADRE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+        conn.execute(
+            text(
+                f"WITH movidas AS (DELETE FROM {DEFAULT} WHERE fecha >= :desde AND fecha < :hasta RETURNING *) "
+                f"INSERT INTO {tabla} SELECT * FROM movidas"
+            ),
+            {"desde": desde, "hasta": hasta},
+        )
+        conn.exec_driver_sql(
+            f"ALTER TABLE {PADRE} ATTACH PARTITION {tabla} FOR VALUES FROM ('{desde:%Y-%m-%d}') TO ('{hasta:%Y-%m-%d}')"
+        )
+    return tabla
+
+
+def asegurar(engine, meses=3, ahora=None):
+    """Crea las particiones que falten desde el mes actual hasta `meses` meses después."""
+    with engine.connect() as conn:
+        if not particionada(conn):
+            return []
+        cubierto = _hasta_maximo(conn)
+    creadas = []
+    actual = inicio_mes(ahora or datetime.utcnow())
+    for i in range(meses + 1):
+        mes = inicio_mes(actual, i)
+        if cubierto is not None and mes < cubierto:
+            continue
+        creadas.append(crear_mes(engine, mes))
+    return creadas
+
+
+if __name__ == "__main__":
+    from db import engine
+
+    creadas = asegurar(engine, int(sys.argv[1]) if len(sys.argv) > 1 else 3)
+    print(f"Particiones creadas: {', '.join(creadas) or 'ninguna'}")
+    with engine.connect() as conn:
+        if not particionada(conn):
+            print("evento no está particionada (¿Postgres y migraciones al día?)")
+        for tabla, limites, filas in listar(conn) if particionada(conn) else ():
+            print(f"  {tabla:<24} {limites}  ~{filas} filas")
@@ -0,0 +1,93 @@
+# queries.py
+# Consultas proyectadas (columnas explícitas) para los listados de la API.
+# Devuelven Select de SQLAlchemy Core: las filas no pasan por el identity map.
+from sqlalchemy import select
+
+from models import Evento, Gestion, Usuario
+from pagination import apply_keyset
+from serializers import naive_utc, object_serializer, row_serializer, to_iso_z
+
+GESTION_COLUMNS = (
+    Gestion.id,
+    Gestion.nombre,
+    Gestion.descripcion,
+    Gestion.estado_id,
+    Gestion.tipo,
+    Gestion.responsable_id,
+    Gestion.fecha_creacion,
+)
+
+serialize_gestion_row = row_serializer(
+    [c.key for c in GESTION_COLUMNS],
+    {"fecha_creacion": to_iso_z},
+)
+
+
+def filter_gestiones(stmt, estado_id=None, responsable_id=None, tipo=None, desde=None, hasta=None):
+    """Filtros comunes de gestiones (listado, exportación...). None = sin filtro."""
+    if estado_id is not None:
+        stmt = stmt.where(Gestion.estado_id == estado_id)
+    if responsable_id is not None:
+        stmt = stmt.where(Gestion.responsable_id == responsable_id)
+    if tipo is not None:
+        stmt = stmt.where(Gestion.tipo == tipo)
+    if desde is not None:
+        stmt = stmt.where(Gestion.fecha_creacion >= naive_utc(desde))
+    if hasta is not None:
+        stmt = stmt.where(Gestion.fecha_creacion < naive_utc(hasta))
+    return stmt
+
+
+def gestiones_query(cursor=None, **filtros):
+    """SELECT de las columnas del listado (tipo incluido), ordenado por (fecha_creacion, id)."""
+    stmt = filter_gestiones(select(*GESTION_COLUMNS), **filtros)
+    return apply_keyset(stmt, Gestion.fecha_creacion, Gestion.id, cursor)
+
+
+EVENTO_COLUMNS = (
+    Evento.id,
+    Evento.gestion_id,
+    Evento.usuario_id,
+    Evento.fecha,
+    Evento.comentario,
+    Evento.estado_id,
+)
+
+serialize_evento_row = row_serializer(
+    [c.key for c in EVENTO_COLUMNS],
+    {"fecha": to_iso_z},
+)
+# Desde objetos ORM: respuesta de create_evento y etapas del detalle
+serialize_evento = object_serializer(
+    [c.key for c in EVENTO_COLUMNS],
+    {"fecha": to_iso_z},
+)
+ETAPA_KEYS = ("id", "fecha", "comentario", "usuario_id", "estado_id")
+serialize_etapa = object_serializer(
+    list(ETAPA_KEYS),
+    {"fecha": to_iso_z},
+)
+
+USUARIO_COLUMNS = (Usuario.id, Usuario.nombre, Usuario.correo)
+
+serialize_usuario_row = row_serializer([c.key for c in USUARIO_COLUMNS])
+
+
+def filter_eventos(stmt, gestion_id=None, estado_id=None, usuario_id=None, desde=None, hasta=None):
+    if gestion_id is not None:
+        stmt = stmt.where(Evento.gestion_id == gestion_id)
+    if estado_id is not None:
+        stmt = stmt.where(Evento.estado_id == estado_id)
+    if usuario_id is not None:
+        stmt = stmt.where(Evento.usuario_id == usuario_id)
+    if desde is not None:
+        stmt = stmt.where(Evento.fecha >= naive_utc(desde))
+    if hasta is not None:
+        stmt = stmt.where(Evento.fecha < naive_utc(hasta))
+    return stmt
+
+
+def eventos_query(cursor=None, **filtros):
+    """SELECT de eventos (historial completo), ordenado por (fecha, id)."""
+    stmt = filter_eventos(select(*EVENTO_COLUMNS), **filtros)
+    return apply_keyset(stmt, Evento.fecha, Evento.id, cursor)
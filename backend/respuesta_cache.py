@@ -0,0 +1,304 @@
+# respuesta_cache.py
+# Caché de respuestas GET con ETag débil e invalidación por etiquetas.
+# - El endpoint declara de qué datos depende su respuesta con etiquetar(response, ...)
+#   (p. ej. "gestion:5", "gestiones"); sólo esas respuestas se cachean.
+# - Cada etiqueta tiene un contador de versión; create_evento, crear/actualizar/eliminar
+#   gestión llaman a invalidar(...) tras el commit y sólo caducan lo que tocaron. Un cambio
+#   de catálogos (catalogo_cache.invalidar) caduca los listados y TAG_CATALOGO.
+# - ETag = hash(ruta + params + versiones de sus etiquetas): If-None-Match se responde
+#   con 304 sin ejecutar el endpoint ni consultar la BD.
+# - Almacenamiento: LRU en memoria acotado por bytes (un worker) o cualquier cliente
+#   compatible con Redis (get/set/mget/incr) para compartir entre workers.
+# - Con el LRU en memoria y varios workers, invalidar() se difunde a los demás por el
+#   puente LISTEN/NOTIFY de tiempo_real.py; sin puente (SQLite, TIEMPO_REAL_NOTIFY=false)
+#   gunicorn.conf.py no arranca más de un worker sin REDIS_URL.
+import hashlib
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict, namedtuple
+
+from settings import get_settings
+
+HEADER_TAGS = "X-Cache-Tags"
+TAG_LISTA = "gestiones"
+# Respuestas con datos del catálogo en memoria (nombres de estado): caducan cuando cambia
+TAG_CATALOGO = "catalogo"
+_TAGS = HEADER_TAGS.lower().encode()
+_GLOBAL = "*"
+# Cabeceras de la respuesta original que se guardan con el cuerpo
+_CABECERAS = (b"content-type", b"x-next-cursor", b"link")
+
+Entrada = namedtuple("Entrada", "etag tags versiones headers body")
+
+
+def tag_gestion(gestion_id):
+    return f"gestion:{gestion_id}"
+
+
+class MemoriaLRU:
+    """LRU por tamaño (bytes de cuerpo) con expiración; versiones de etiqueta en el proceso."""
+
+    def __init__(self, max_bytes, ttl_segundos):
+        self.max_bytes = max_bytes
+        self.ttl = ttl_segundos
+        self.epoca = uuid.uuid4().hex
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()  # clave -> (entrada, tamaño, expira)
+        self._bytes = 0
+        self._versiones = {}
+        self.aciertos = 0
+        self.fallos = 0
+        self.expulsiones = 0
+
+    def obtener(self, clave):
+        with self._lock:
+            item = self._entradas.get(clave)
+            if item is None or item[2] < time.monotonic():
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return item[0]
+
+    def guardar(self, clave, entrada):
+        tam = len(entrada.body) + len(clave) + 256
+        if tam > self.max_bytes // 4:
+            return
+        with self._lock:
+            viejo = self._entradas.pop(clave, None)
+            if viejo is not None:
+                self._bytes -= viejo[1]
+            self._entradas[clave] = (entrada, tam, time.monotonic() + self.ttl)
+            self._bytes += tam
+            while self._bytes > self.max_bytes:
+                _, (_, t, _) = self._entradas.popitem(last=False)
+                self._bytes -= t
+                self.expulsiones += 1
+
+    def versiones(self, tags):
+        with self._lock:
+            return [self._versiones.get(t, 0) for t in tags]
+
+    def incrementar(self, tags):
+        with self._lock:
+            for t in (*tags, _GLOBAL):
+                self._versiones[t] = self._versiones.get(t, 0) + 1
+
+    def vaciar(self):
+        """Descarta todo; la época nueva invalida también los ETag que tengan los clientes."""
+        with self._lock:
+            self._entradas.clear()
+            self._bytes = 0
+            self.epoca = uuid.uuid4().hex
+            self._versiones[_GLOBAL] = self._versiones.get(_GLOBAL, 0) + 1
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                "backend": "memoria",
+                "entradas": len(self._entradas),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "expulsiones": self.expulsiones,
+            }
+
+
+class RedisBackend:
+    """
+    Cualquier cliente con get/set(ex=, nx=)/mget/incr (redis-py o un sustituto local).
+    La expulsión por tamaño la hace Redis (maxmemory + allkeys-lru).
+    """
+
+    def __init__(self, cliente, ttl_segundos, prefijo="gestor:cache:"):
+        self.cliente = cliente
+        self.ttl = ttl_segundos
+        self.prefijo = prefijo
+        self.cliente.set(prefijo + "epoca", uuid.uuid4().hex, nx=True)
+        epoca = self.cliente.get(prefijo + "epoca")
+        self.epoca = epoca.decode() if isinstance(epoca, bytes) else epoca
+
+    def obtener(self, clave):
+        raw = self.cliente.get(self.prefijo + "r:" + clave)
+        if raw is None:
+            return None
+        meta, body = raw.split(b"\n", 1)
+        m = json.loads(meta)
+        headers = [(k.encode("latin-1"), v.encode("latin-1")) for k, v in m["headers"]]
+        return Entrada(m["etag"], tuple(m["tags"]), tuple(m["versiones"]), headers, body)
+
+    def guardar(self, clave, entrada):
+        meta = json.dumps(
+            {
+                "etag": entrada.etag,
+                "tags": entrada.tags,
+                "versiones": entrada.versiones,
+                "headers": [[k.decode("latin-1"), v.decode("latin-1")] for k, v in entrada.headers],
+            }
+        ).encode()
+        self.cliente.set(self.prefijo + "r:" + clave, meta + b"\n" + entrada.body, ex=max(int(self.ttl), 1))
+
+    def versiones(self, tags):
+        if not tags:
+            return []
+        return [int(v or 0) for v in self.cliente.mget([self.prefijo + "v:" + t for t in tags])]
+
+    def incrementar(self, tags):
+        for t in (*tags, _GLOBAL):
+            self.cliente.incr(self.prefijo + "v:" + t)
+
+    def estadisticas(self):
+        return {"backend": "redis", "epoca": self.epoca}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                cfg = get_settings()
+                if cfg.redis_url:
+                    import redis
+
+                    _cache = RedisBackend(redis.Redis.from_url(cfg.redis_url), cfg.cache_ttl_segundos)
+                else:
+                    _cache = MemoriaLRU(cfg.cache_max_bytes, cfg.cache_ttl_segundos)
+    return _cache
+
+
+def etiquetar(response, *tags):
+    """Marca la respuesta como cacheable y dependiente de estas etiquetas."""
+    response.headers[HEADER_TAGS] = " ".join(tags)
+    return response
+
+
+_difusor = None
+
+
+def difundir_con(funcion):
+    """funcion(tags) avisa a los otros workers (tiempo_real.iniciar); None la desconecta."""
+    global _difusor
+    _difusor = funcion
+
+
+def invalidar(*tags):
+    """Llamar tras el commit: caduca las respuestas que dependen de estas etiquetas."""
+    if tags:
+        cache = get_cache()
+        cache.incrementar(tags)
+        # Con Redis las versiones ya son compartidas
+        if _difusor is not None and isinstance(cache, MemoriaLRU):
+            _difusor(tags)
+
+
+def invalidar_local(tags):
+    """Invalidación recibida de otro worker: sólo este proceso."""
+    get_cache().incrementar(tags)
+
+
+def vaciar_local():
+    """Tras perder avisos de otros workers (reconexión del puente)."""
+    cache = get_cache()
+    if isinstance(cache, MemoriaLRU):
+        cache.vaciar()
+
+
+def _etag(cache, clave, tags, versiones):
+    raw = f"{cache.epoca}|{clave}|{'|'.join(f'{t}={v}' for t, v in zip(tags, versiones))}"
+    return 'W/"' + hashlib.sha1(raw.encode()).hexdigest()[:24] + '"'
+
+
+def _coincide(if_none_match, etag):
+    if not if_none_match:
+        return False
+    valor = etag[2:]
+    for candidato in if_none_match.split(","):
+        candidato = candidato.strip()
+        if candidato == "*" or candidato.removeprefix("W/") == valor:
+            return True
+    return False
+
+
+class CacheMiddleware:
+    """Middleware ASGI: sólo GET; el resto pasa sin tocar."""
+
+    def __init__(self, app, cache=None):
+        self.app = app
+        self._cache = cache
+
+    @property
+    def cache(self):
+        return self._cache or get_cache()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+        cache = self.cache
+        query = "&".join(sorted(scope.get("query_string", b"").decode("latin-1").split("&")))
+        clave = scope["path"] + "?" + query
+        if_none_match = None
+        for k, v in scope["headers"]:
+            if k == b"if-none-match":
+                if_none_match = v.decode("latin-1")
+
+        entrada = cache.obtener(clave)
+        if entrada is not None and tuple(cache.versiones(entrada.tags)) == entrada.versiones:
+            await self._enviar(send, entrada.etag, if_none_match, entrada.headers, entrada.body, b"HIT")
+            return
+
+        global_antes = cache.versiones([_GLOBAL])[0]
+        inicio = None
+        partes = []
+        tags = None
+
+        async def capturar(message):
+            nonlocal inicio, tags
+            if message["type"] == "http.response.start":
+                headers = message.get("headers", [])
+                valor = next((v for k, v in headers if k == _TAGS), None)
+                if message["status"] != 200 or valor is None:
+                    await send(message)
+                    return
+                tags = tuple(sorted(set(valor.decode().split())))
+                inicio = message
+                return
+            if inicio is None:
+                await send(message)
+                return
+            partes.append(message.get("body", b""))
+            if message.get("more_body"):
+                return
+            body = b"".join(partes)
+            versiones = cache.versiones([*tags, _GLOBAL])
+            if versiones[-1] != global_antes:
+                # Hubo escrituras mientras se generaba: no se cachea ni se da ETag
+                inicio["headers"] = [(k, v) for k, v in inicio["headers"] if k != _TAGS]
+                await send(inicio)
+                await send({"type": "http.response.body", "body": body})
+                return
+            headers = [(k, v) for k, v in inicio["headers"] if k in _CABECERAS]
+            versiones = tuple(versiones[:-1])
+            etag = _etag(cache, clave, tags, versiones)
+            cache.guardar(clave, Entrada(etag, tags, versiones, headers, body))
+            await self._enviar(send, etag, if_none_match, headers, body, b"MISS")
+
+        await self.app(scope, receive, capturar)
+
+    @staticmethod
+    async def _enviar(send, etag, if_none_match, headers, body, estado):
+        extra = [(b"etag", etag.encode()), (b"cache-control", b"no-cache"), (b"x-cache", estado)]
+        if _coincide(if_none_match, etag):
+            await send({"type": "http.response.start", "status": 304, "headers": extra})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        headers = [*headers, *extra, (b"content-length", str(len(body)).encode())]
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
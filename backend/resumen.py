@@ -0,0 +1,263 @@
+# resumen.py
+# Proyección materializada por gestión (tabla gestion_resumen): estado actual,
+# último evento, número de eventos y desde cuándo está en el estado.
+# - create_evento y la ingesta masiva la actualizan con un upsert incremental en la
+#   misma transacción que el evento (num_eventos = num_eventos + n).
+# - GET /api/gestiones/summary agrupa sobre esta tabla (sin recorrer eventos).
+# - El relleno inicial lo hace una migración (migraciones/m0009_resumen_relleno.py).
+#   Reconstrucción / reparación:  python resumen.py [gestion_id ...]
+import sys
+from datetime import datetime
+
+from sqlalchemy import and_, delete, func, insert, literal, or_, select
+
+from models import Evento, EventoArchivado, Gestion, GestionResumen
+from pagination import apply_keyset
+from queries import filter_gestiones
+from serializers import row_serializer, to_iso_z
+
+T = GestionResumen.__table__
+
+
+def _dialect_insert(dialect):
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        raise NotImplementedError(f"gestion_resumen: upsert no soportado en {dialect}")
+    return dialect_insert
+
+
+def _upsert(dialect):
+    """INSERT ... ON CONFLICT (gestion_id) DO UPDATE sumando los eventos nuevos."""
+    ins = _dialect_insert(dialect)(T)
+    ex = ins.excluded
+    return ins.on_conflict_do_update(
+        index_elements=[T.c.gestion_id],
+        set_={
+            "estado_id": ex.estado_id,
+            "tipo": ex.tipo,
+            "responsable_id": ex.responsable_id,
+            "num_eventos": T.c.num_eventos + ex.num_eventos,
+            "ultimo_evento_id": ex.ultimo_evento_id,
+            "ultimo_evento_fecha": ex.ultimo_evento_fecha,
+            # NULL = el estado no cambió en estos eventos: se conserva el anterior
+            "estado_desde": func.coalesce(ex.estado_desde, T.c.estado_desde),
+        },
+    )
+
+
+def fila(gestion_id, estado_id, tipo, responsable_id, num_eventos, ultimo_id, ultima_fecha, cambio_estado):
+    return {
+        "gestion_id": gestion_id,
+        "estado_id": estado_id,
+        "tipo": tipo,
+        "responsable_id": responsable_id,
+        "num_eventos": num_eventos,
+        "ultimo_evento_id": ultimo_id,
+        "ultimo_evento_fecha": ultima_fecha,
+        "estado_desde": ultima_fecha if cambio_estado else None,
+    }
+
+
+async def registrar(db, filas):
+    """Aplica las filas de fila() en la transacción de db (AsyncSession)."""
+    if filas:
+        await db.execute(_upsert(db.bind.dialect.name), filas)
+
+
+async def registrar_evento(db, gestion, evento, estado_anterior):
+    """Tras db.flush() del evento: un upsert con los valores ya en memoria."""
+    await registrar(
+        db,
+        [
+            fila(
+                gestion.id,
+                gestion.estado_id,
+                gestion.tipo,
+                gestion.responsable_id,
+                1,
+                evento.id,
+                evento.fecha,
+                gestion.estado_id != estado_anterior,
+            )
+        ],
+    )
+
+
+def sincronizar_gestion(db, gestion, cambio_estado=False):
+    """
+    Alta/edición de una gestión fuera del flujo de eventos (Session síncrona):
+    copia estado, tipo y responsable sin tocar los contadores de eventos.
+    """
+    ins = _dialect_insert(db.get_bind().dialect.name)(T).values(
+        gestion_id=gestion.id,
+        estado_id=gestion.estado_id,
+        tipo=gestion.tipo,
+        responsable_id=gestion.responsable_id,
+        num_eventos=0,
+        estado_desde=datetime.utcnow() if cambio_estado else None,
+    )
+    db.execute(
+        ins.on_conflict_do_update(
+            index_elements=[T.c.gestion_id],
+            set_={
+                "estado_id": ins.excluded.estado_id,
+                "tipo": ins.excluded.tipo,
+                "responsable_id": ins.excluded.responsable_id,
+                "estado_desde": func.coalesce(ins.excluded.estado_desde, T.c.estado_desde),
+            },
+        )
+    )
+
+
+def eliminar_gestion(db, gestion_id):
+    """Sin depender de ON DELETE CASCADE (SQLite no aplica FKs por defecto)."""
+    db.execute(delete(T).where(T.c.gestion_id == gestion_id))
+
+
+# ---------------------------------------------------------------------------
+# Reconstrucción desde evento (backfill / reparación)
+# ---------------------------------------------------------------------------
+def _select_reconstruccion():
+    """
+    Una fila por gestión calculada desde sus eventos (índice ix_evento_gestion_fecha_id).
+    estado_desde: primer evento del último tramo con el estado actual. El histórico no
+    distingue eventos con estado no aplicado, así que es una aproximación.
+    """
+    ev = Evento.__table__
+    de_la_gestion = ev.c.gestion_id == Gestion.id
+    ultimo = select(ev.c.id, ev.c.fecha).where(de_la_gestion).order_by(ev.c.fecha.desc(), ev.c.id.desc()).limit(1)
+    otro = ev.alias("otro")
+    # ... sin un evento posterior, en orden (fecha, id), que registre otro estado
+    otro_posterior = (
+        select(otro.c.id)
+        .where(
+            otro.c.gestion_id == ev.c.gestion_id,
+            otro.c.estado_id.is_not(None),
+            otro.c.estado_id != Gestion.estado_id,
+            or_(otro.c.fecha > ev.c.fecha, and_(otro.c.fecha == ev.c.fecha, otro.c.id > ev.c.id)),
+        )
+        # gestion y evento son los de las consultas exteriores (dos niveles más arriba)
+        .correlate_except(otro)
+        .exists()
+    )
+    estado_desde = (
+        select(func.min(ev.c.fecha))
+        .where(de_la_gestion, ev.c.estado_id == Gestion.estado_id, ~otro_posterior)
+        .scalar_subquery()
+    )
+    return select(
+        Gestion.id,
+        Gestion.estado_id,
+        Gestion.tipo,
+        Gestion.responsable_id,
+        select(func.count()).select_from(ev).where(de_la_gestion).scalar_subquery(),
+        ultimo.with_only_columns(ev.c.id).scalar_subquery(),
+        ultimo.with_only_columns(ev.c.fecha).scalar_subquery(),
+        estado_desde,
+    )
+
+
+def reconstruir(db, gestion_ids=None):
+    """
+    Recalcula gestion_resumen (todas o sólo gestion_ids) en una transacción de db (Session).
+    Las gestiones con historia archivada (archivo_eventos.py) se dejan como están: evento ya
+    no tiene todos sus eventos y su fila sigue al día con los upserts incrementales.
+    """
+    archivadas = select(EventoArchivado.gestion_id)
+    stmt = _select_reconstruccion().where(Gestion.id.not_in(archivadas))
+    borrar = delete(T).where(T.c.gestion_id.not_in(archivadas))
+    if gestion_ids:
+        stmt = stmt.where(Gestion.id.in_(gestion_ids))
+        borrar = borrar.where(T.c.gestion_id.in_(gestion_ids))
+    db.execute(borrar)
+    columnas = [
+        "gestion_id",
+        "estado_id",
+        "tipo",
+        "responsable_id",
+        "num_eventos",
+        "ultimo_evento_id",
+        "ultimo_evento_fecha",
+        "estado_desde",
+    ]
+    n = db.execute(insert(T).from_select(columnas, stmt)).rowcount
+    db.commit()
+    return n
+
+
+# ---------------------------------------------------------------------------
+# Lectura
+# ---------------------------------------------------------------------------
+_AGRUPACIONES = {
+    "por_estado": T.c.estado_id,
+    "por_tipo": T.c.tipo,
+    "por_responsable": T.c.responsable_id,
+}
+
+
+def _filtrar(stmt, estado_id=None, tipo=None, responsable_id=None):
+    if estado_id is not None:
+        stmt = stmt.where(T.c.estado_id == estado_id)
+    if tipo is not None:
+        stmt = stmt.where(T.c.tipo == tipo)
+    if responsable_id is not None:
+        stmt = stmt.where(T.c.responsable_id == responsable_id)
+    return stmt
+
+
+async def agrupado(db, catalogo, **filtros):
+    """Totales y conteos por estado_id, tipo y responsable_id (GROUP BY sobre gestion_resumen)."""
+    metricas = (
+        func.count().label("gestiones"),
+        func.coalesce(func.sum(T.c.num_eventos), 0).label("eventos"),
+        func.max(T.c.ultimo_evento_fecha).label("ultimo_evento"),
+    )
+    total = (await db.execute(_filtrar(select(*metricas), **filtros))).one()
+    out = {"gestiones": total.gestiones, "eventos": total.eventos, "ultimo_evento": to_iso_z(total.ultimo_evento)}
+    for clave, col in _AGRUPACIONES.items():
+        stmt = _filtrar(select(col, *metricas), **filtros).group_by(col).order_by(col)
+        grupos = []
+        for r in await db.execute(stmt):
+            grupo = {col.key: r[0], "gestiones": r.gestiones, "eventos": r.eventos, "ultimo_evento": to_iso_z(r.ultimo_evento)}
+            if clave == "por_estado":
+                grupo["estado_nombre"] = catalogo.estado_nombre(r[0])
+            grupos.append(grupo)
+        out[clave] = grupos
+    return out
+
+
+ITEM_COLUMNS = (
+    Gestion.id,
+    Gestion.nombre,
+    Gestion.estado_id,
+    Gestion.tipo,
+    Gestion.responsable_id,
+    Gestion.fecha_creacion,
+    func.coalesce(T.c.num_eventos, literal(0)).label("num_eventos"),
+    T.c.ultimo_evento_fecha,
+    func.coalesce(T.c.estado_desde, Gestion.fecha_creacion).label("estado_desde"),
+)
+
+serialize_item_row = row_serializer(
+    [c.key for c in ITEM_COLUMNS],
+    {"fecha_creacion": to_iso_z, "ultimo_evento_fecha": to_iso_z, "estado_desde": to_iso_z},
+)
+
+
+def items_query(cursor=None, **filtros):
+    """Resumen por gestión (LEFT JOIN: las gestiones sin eventos salen con 0), keyset como el listado."""
+    stmt = select(*ITEM_COLUMNS).select_from(Gestion).outerjoin(T, T.c.gestion_id == Gestion.id)
+    stmt = filter_gestiones(stmt, **filtros)
+    return apply_keyset(stmt, Gestion.fecha_creacion, Gestion.id, cursor)
+
+
+if __name__ == "__main__":
+    from db import SessionLocal
+
+    ids = [int(a) for a in sys.argv[1:]]
+    with SessionLocal() as db:
+        n = reconstruir(db, ids or None)
+    print(f"gestion_resumen: {n} filas reconstruidas")
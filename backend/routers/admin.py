@@ -0,0 +1,60 @@
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from auth import requerir_rol
+from db import get_db, get_read_db, pool_metrics
+from catalogo_cache import get_catalogo, invalidar
+from instrumentacion import Perfilador
+from respuesta_cache import get_cache
+from settings import get_settings
+import analitica
+import tiempo_real
+
+# Administración y diagnóstico; main.create_app sólo lo monta con RUTAS_ADMIN=true y
+# todas las rutas exigen un token con el rol admin
+router = APIRouter(dependencies=[Depends(requerir_rol("admin"))])
+
+@router.post("/catalogos/invalidar")
+def invalidar_catalogos(db: Session = Depends(get_db)):
+    invalidar()
+    cat = get_catalogo(db)
+    return {"version": cat.version, "estados": len(cat.estados), "plantillas": len(cat.plantillas_out)}
+
+# Analítica: recálculo completo (p. ej. tras corregir eventos históricos)
+@router.post("/analytics/recalcular")
+async def recalcular_analitica(db: AsyncSession = Depends(get_read_db)):
+    motor = await analitica.get_motor(db, forzar=True)
+    return {"hasta_evento_id": motor.ultimo_evento_id}
+
+# Push en tiempo real: conexiones abiertas, mensajes y desbordes de cola
+@router.get("/tiempo-real")
+def get_tiempo_real_stats():
+    return tiempo_real.hub.estadisticas()
+
+# Caché de respuestas: tamaño, aciertos y expulsiones
+@router.get("/cache")
+def get_cache_stats():
+    return get_cache().estadisticas()
+
+# Pools de conexión: espera de checkout y saturación (ver db.PoolMetrics)
+@router.get("/db/pool")
+def get_pool_metrics():
+    return pool_metrics()
+
+# Perfilador por muestreo (PERFILADOR=true): pilas de todos los hilos durante `segundos`,
+# en formato collapsed para flamegraph.pl / speedscope
+@router.get("/perfil", response_class=PlainTextResponse)
+async def get_perfil(
+    segundos: float = Query(10, gt=0, le=120), intervalo_ms: float = Query(5, ge=1, le=1000)
+):
+    if not get_settings().perfilador:
+        raise HTTPException(status_code=404, detail="Perfilador deshabilitado (PERFILADOR=true)")
+    perfilador = Perfilador(intervalo_ms / 1000)
+    perfilador.start()
+    try:
+        await asyncio.sleep(segundos)
+    finally:
+        await asyncio.to_thread(perfilador.detener)
+    return PlainTextResponse(perfilador.collapsed(), headers={"X-Muestras": str(perfilador.muestras)})
@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from db import get_db
+from models import Usuario
+import auth
+from pydantic import BaseModel
+from typing import List, Optional
+
+
+router = APIRouter()
+
+class LoginIn(BaseModel):
+    correo: str
+    password: str
+    # Token de JWT_RECORDAR_DIAS en lugar de JWT_EXPIRA_MINUTOS
+    recordar: bool = False
+
+class Token(BaseModel):
+    access_token: str
+    token_type: str = "bearer"
+    expira_en: int
+
+class UsuarioActualOut(BaseModel):
+    id: int
+    correo: Optional[str] = None
+    nombre: Optional[str] = None
+    roles: List[str]
+
+# Síncrono a propósito: bcrypt (~0,25 s con 12 rondas) corre en el threadpool, no en el loop
+@router.post("/login", response_model=Token)
+def login(datos: LoginIn, db: Session = Depends(get_db)):
+    usuario = db.execute(select(Usuario).where(Usuario.correo == datos.correo).limit(1)).scalars().first()
+    if not auth.verificar_password(datos.password, usuario.password_hash if usuario else None):
+        raise HTTPException(status_code=401, detail="Credenciales inválidas", headers={"WWW-Authenticate": "Bearer"})
+    token, validez = auth.crear_token(usuario, datos.recordar)
+    return Token(access_token=token, expira_en=validez)
+
+@router.get("/me", response_model=UsuarioActualOut)
+def usuario_actual(usuario: auth.UsuarioAutenticado = Depends(auth.requerir_usuario)):
+    return UsuarioActualOut(id=usuario.id, correo=usuario.correo, nombre=usuario.nombre, roles=sorted(usuario.roles))
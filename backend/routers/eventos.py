@@ -1,46 +1,40 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Query, Request
 from sqlalchemy.orm import Session
-from db import SessionLocal
-from models.evento import Evento
-from pydantic import BaseModel
-from typing import List, Optional
+from db import get_db
+from pagination import DEFAULT_LIMIT, MAX_LIMIT, set_next_cursor, split_page
+from queries import eventos_query, serialize_evento_row
+from serializers import FastJSONResponse
+from typing import Optional
 from datetime import datetime
 
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-class EventoCreate(BaseModel):
-    gestion_id: int
-    usuario_id: int
-    comentario: Optional[str]
-    estado_id: int
-
-class EventoOut(BaseModel):
-    id: int
-    gestion_id: int
-    usuario_id: int
-    fecha: datetime
-    comentario: Optional[str]
-    estado_id: int
-
-    class Config:
-        from_attributes = True
-
-@router.post("/", response_model=EventoOut)
-def crear_evento(evento: EventoCreate, db: Session = Depends(get_db)):
-    nuevo = Evento(**evento.dict())
-    db.add(nuevo)
-    db.commit()
-    db.refresh(nuevo)
-    return nuevo
-
-@router.get("/", response_model=List[EventoOut])
-def listar_eventos(db: Session = Depends(get_db)):
-    return db.query(Evento).all()
\ No newline at end of file
+# Los eventos se crean con POST /api/gestiones/{id}/eventos (valida la transición,
+# mantiene gestion_resumen, la caché y el push) o /api/eventos/bulk.
+
+# Paginación keyset sobre (fecha, id); siguiente página con ?cursor=<X-Next-Cursor>
+@router.get("/")
+def listar_eventos(
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    gestion_id: Optional[int] = None,
+    estado_id: Optional[int] = None,
+    usuario_id: Optional[int] = None,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+):
+    stmt = eventos_query(
+        cursor=cursor,
+        gestion_id=gestion_id,
+        estado_id=estado_id,
+        usuario_id=usuario_id,
+        desde=desde,
+        hasta=hasta,
+    )
+    rows, next_cursor = split_page(db.execute(stmt.limit(limit + 1)).all(), limit, lambda r: (r.fecha, r.id))
+    response = FastJSONResponse([serialize_evento_row(r) for r in rows])
+    set_next_cursor(response, request, next_cursor)
+    return response
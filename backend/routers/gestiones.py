@@ -1,84 +1,159 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException
+from sqlalchemy import exists, or_, select
 from sqlalchemy.orm import Session
-from db import SessionLocal
-from models.gestion import Gestion
-from models.usuario import Usuario
-from models.catalogo import CatalogoEstado
+from sqlalchemy.orm.exc import StaleDataError
+from db import get_db
+from ingesta import CONFLICTO_VERSION, REINTENTOS_CONFLICTO
+from instrumentacion import metricas
+from respuesta_cache import TAG_LISTA, invalidar, tag_gestion
+import tiempo_real
+from models import Evento, EventoArchivado, Gestion
+import resumen
+from serializers import FastJSONResponse, to_iso_z
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Optional
 from datetime import datetime
 
 
 router = APIRouter()
 
-# Dependencia para obtener la sesión de base de datos
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 # Esquemas Pydantic para entrada y salida de datos
 class GestionCreate(BaseModel):
     nombre: str
     descripcion: Optional[str] = None
     estado_id: int
     responsable_id: int
+    tipo: Optional[str] = None
 
 class GestionOut(BaseModel):
     id: int
     nombre: str
     descripcion: Optional[str] = None
-    estado_id: int
-    responsable_id: int
+    estado_id: Optional[int] = None
+    responsable_id: Optional[int] = None
+    tipo: Optional[str] = None
     fecha_creacion: datetime
+    version: int
 
     class Config:
         from_attributes = True
 
+def _gestion_out(gestion, headers=None):
+    """Como GestionOut pero con las fechas en ISO con Z, igual que el resto de la API."""
+    data = {
+        "id": gestion.id,
+        "nombre": gestion.nombre,
+        "descripcion": gestion.descripcion,
+        "estado_id": gestion.estado_id,
+        "responsable_id": gestion.responsable_id,
+        "tipo": gestion.tipo,
+        "fecha_creacion": to_iso_z(gestion.fecha_creacion),
+        "version": gestion.version,
+    }
+    return FastJSONResponse(data, headers=headers)
+
 @router.post("/", response_model=GestionOut)
 def crear_gestion(gestion: GestionCreate, db: Session = Depends(get_db)):
     nueva_gestion = Gestion(
         nombre=gestion.nombre,
         descripcion=gestion.descripcion,
         estado_id=gestion.estado_id,
-        responsable_id=gestion.responsable_id
+        responsable_id=gestion.responsable_id,
+        tipo=gestion.tipo,
     )
     db.add(nueva_gestion)
+    db.flush()
+    resumen.sincronizar_gestion(db, nueva_gestion)
+    tiempo_real.notificar(db, tipo="gestion", accion="creada", gestion_id=nueva_gestion.id, estado_id=nueva_gestion.estado_id)
     db.commit()
     db.refresh(nueva_gestion)
-    return nueva_gestion
+    invalidar(TAG_LISTA)
+    return _gestion_out(nueva_gestion)
 
-@router.get("/", response_model=List[GestionOut])
-def listar_gestiones(db: Session = Depends(get_db)):
-    return db.query(Gestion).all()
+def _versiones(if_match):
+    """Versiones aceptadas por If-Match ("3", 3, W/"3", lista); None = sin condición (o *)."""
+    if if_match is None or if_match.strip() == "*":
+        return None
+    versiones = set()
+    for etag in if_match.split(","):
+        etag = etag.strip().removeprefix("W/").strip('"')
+        if etag.isdigit():
+            versiones.add(int(etag))
+    return versiones
 
-@router.get("/{gestion_id}", response_model=GestionOut)
-def obtener_gestion(gestion_id: int, db: Session = Depends(get_db)):
-    gestion = db.query(Gestion).filter(Gestion.id == gestion_id).first()
-    if not gestion:
+
+def _precondicion_fallida(gestion):
+    if gestion is None:
         raise HTTPException(status_code=404, detail="Gestión no encontrada")
-    return gestion
+    raise HTTPException(
+        status_code=412,
+        detail=f"La gestión cambió (versión actual {gestion.version})",
+        headers={"ETag": f'"{gestion.version}"'},
+    )
+
 
+# Con If-Match: "<version>" (campo version del detalle o ETag de esta respuesta) la
+# actualización es un compare-and-swap; si otro la cambió antes, 412 sin aplicar nada.
+# Sin If-Match gana la última escritura (se reintenta si otra se confirma en medio).
 @router.put("/{gestion_id}", response_model=GestionOut)
-def actualizar_gestion(gestion_id: int, datos: GestionCreate, db: Session = Depends(get_db)):
-    gestion = db.query(Gestion).filter(Gestion.id == gestion_id).first()
-    if not gestion:
-        raise HTTPException(status_code=404, detail="Gestión no encontrada")
-    gestion.nombre = datos.nombre
-    gestion.descripcion = datos.descripcion
-    gestion.estado_id = datos.estado_id
-    gestion.responsable_id = datos.responsable_id
-    db.commit()
+def actualizar_gestion(
+    gestion_id: int,
+    datos: GestionCreate,
+    if_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
+    versiones = _versiones(if_match)
+    for _ in range(REINTENTOS_CONFLICTO):
+        gestion = db.query(Gestion).filter(Gestion.id == gestion_id).first()
+        if not gestion:
+            raise HTTPException(status_code=404, detail="Gestión no encontrada")
+        if versiones is not None and gestion.version not in versiones:
+            _precondicion_fallida(gestion)
+        estado_anterior = gestion.estado_id
+        gestion.nombre = datos.nombre
+        gestion.descripcion = datos.descripcion
+        gestion.estado_id = datos.estado_id
+        gestion.responsable_id = datos.responsable_id
+        gestion.tipo = datos.tipo
+        resumen.sincronizar_gestion(db, gestion, cambio_estado=gestion.estado_id != estado_anterior)
+        try:
+            # UPDATE ... WHERE id = :id AND version = :leida (version_id_col del modelo)
+            db.commit()
+            break
+        except StaleDataError:
+            db.rollback()
+            metricas.conflictos += 1
+            if versiones is not None:
+                _precondicion_fallida(db.get(Gestion, gestion_id, populate_existing=True))
+    else:
+        raise HTTPException(status_code=409, detail=CONFLICTO_VERSION)
     db.refresh(gestion)
-    return gestion
+    # Un solo aviso, ya confirmada la escritura (commit propio: sale por NOTIFY o al hub)
+    tiempo_real.notificar(
+        db, tipo="gestion", accion="actualizada", gestion_id=gestion_id, estado_id=gestion.estado_id, estado_anterior=estado_anterior
+    )
+    db.commit()
+    invalidar(tag_gestion(gestion_id), TAG_LISTA)
+    return _gestion_out(gestion, {"ETag": f'"{gestion.version}"'})
 
 @router.delete("/{gestion_id}")
 def eliminar_gestion(gestion_id: int, db: Session = Depends(get_db)):
     gestion = db.query(Gestion).filter(Gestion.id == gestion_id).first()
     if not gestion:
         raise HTTPException(status_code=404, detail="Gestión no encontrada")
+    # Los eventos (en evento o archivados) son el registro de auditoría: no se borran
+    con_historia = select(
+        or_(exists().where(Evento.gestion_id == gestion_id), exists().where(EventoArchivado.gestion_id == gestion_id))
+    )
+    if db.execute(con_historia).scalar():
+        raise HTTPException(status_code=409, detail="La gestión tiene eventos registrados; su historial no se borra")
+    tiempo_real.notificar(db, tipo="gestion", accion="eliminada", gestion_id=gestion_id, estado_anterior=gestion.estado_id)
+    resumen.eliminar_gestion(db, gestion_id)
     db.delete(gestion)
-    db.commit()
+    try:
+        db.commit()
+    except StaleDataError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="La gestión cambió mientras se eliminaba; vuelve a intentarlo")
+    invalidar(tag_gestion(gestion_id), TAG_LISTA)
     return {"detail": "Gestión eliminada correctamente"}
\ No newline at end of file
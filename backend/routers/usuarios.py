@@ -1,19 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from db import SessionLocal
-from models.usuario import Usuario
+from db import get_db
+from models import Usuario
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Optional
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 class UsuarioCreate(BaseModel):
     nombre: str
     correo: Optional[str] = None
@@ -33,7 +26,3 @@ def crear_usuario(usuario: UsuarioCreate, db: Session = Depends(get_db)):
     db.commit()
     db.refresh(nuevo)
     return nuevo
-
-@router.get("/", response_model=List[UsuarioOut])
-def listar_usuarios(db: Session = Depends(get_db)):
-    return db.query(Usuario).all()
\ No newline at end of file
@@ -0,0 +1,127 @@
+# serializers.py
+# Capa de respuesta: fechas ISO UTC, serializadores precompilados fila/objeto -> dict
+# y JSONResponse basado en orjson (sin pasar por jsonable_encoder).
+import json
+from datetime import datetime, timezone
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson está en requirements.txt
+    orjson = None
+
+
+def _to_iso_z_lento(dt):
+    # Strings y tipos raros: mismo comportamiento que el _to_iso_z original
+    try:
+        # si ya es string, devolver tal cual (precaución)
+        if isinstance(dt, str):
+            s = dt.strip()
+            # si parece no tener T, normalizar a T and add Z
+            if "T" not in s:
+                s = s.replace(" ", "T")
+            if not (s.endswith("Z") or "+" in s or "-" in s[-6:]):
+                s = s + "Z"
+            return s
+        # datetime object
+        if getattr(dt, "tzinfo", None) is None:
+            return dt.isoformat() + "Z"
+        return dt.astimezone(timezone.utc).isoformat().replace("+00:00", "Z")
+    except Exception:
+        # fallback: str()
+        return str(dt)
+
+
+def to_iso_z(dt):
+    """
+    Normaliza datetimes para enviar al cliente en formato ISO con Z (UTC).
+    - Si dt es None -> None
+    - Si dt.tzinfo is None -> asumimos UTC y añadimos 'Z'
+    - Si dt tiene tzinfo -> convertimos a UTC y devolvemos ISO con Z
+    El caso habitual (datetime naive de una columna TIMESTAMP) no paga
+    isinstance/try: una comparación de tipo y un isoformat().
+    """
+    if type(dt) is datetime:
+        if dt.tzinfo is None:
+            return dt.isoformat() + "Z"
+        return dt.astimezone(timezone.utc).replace(tzinfo=None).isoformat() + "Z"
+    if dt is None:
+        return None
+    return _to_iso_z_lento(dt)
+
+
+def naive_utc(dt):
+    """Las columnas TIMESTAMP guardan UTC sin zona: normaliza los filtros recibidos."""
+    if dt is None or dt.tzinfo is None:
+        return dt
+    return dt.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _compilar(names, converters, acceso):
+    """
+    Genera (una vez) el código de una función x -> {"a": x[0], "b": conv(x[1]), ...}.
+    Evita el zip/dict por fila y las búsquedas de nombres en cada llamada.
+    """
+    names = tuple(names)
+    converters = dict(converters or {})
+    unknown = set(converters) - set(names)
+    if unknown:
+        raise ValueError(f"Columnas sin proyectar: {sorted(unknown)}")
+    namespace = {}
+    partes = []
+    for i, n in enumerate(names):
+        expr = acceso(i, n)
+        if n in converters:
+            namespace[f"_c{i}"] = converters[n]
+            expr = f"_c{i}({expr})"
+        partes.append(f"{n!r}: {expr}")
+    src = "def serialize(x):\n    return {" + ", ".join(partes) + "}\n"
+    exec(compile(src, "<serializer>", "exec"), namespace)
+    serialize = namespace["serialize"]
+    serialize.names = names
+    return serialize
+
+
+def row_serializer(names, converters=None):
+    """
+    Construye una función fila -> dict para una proyección de columnas fija.
+    - names: nombres de las columnas en el mismo orden que el SELECT
+    - converters: {nombre: callable} aplicado sólo a esas columnas (ej. fechas)
+    """
+    return _compilar(names, converters, lambda i, n: f"x[{i}]")
+
+
+def object_serializer(names, converters=None):
+    """Igual que row_serializer pero leyendo atributos de un objeto (ORM)."""
+    for n in names:
+        if not n.isidentifier():
+            raise ValueError(f"Atributo inválido: {n!r}")
+    return _compilar(names, converters, lambda i, n: f"x.{n}")
+
+
+# ---------------------------------------------------------------------------
+# JSON rápido
+# ---------------------------------------------------------------------------
+if orjson is not None:
+    # Fechas naive como UTC con sufijo Z: mismo formato que to_iso_z
+    _ORJSON_OPTS = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj):
+        return orjson.dumps(obj, option=_ORJSON_OPTS)
+
+    loads = orjson.loads
+
+else:
+
+    def dumps(obj):
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=to_iso_z).encode()
+
+    loads = json.loads
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse con orjson; devolverla directamente evita jsonable_encoder."""
+
+    def render(self, content):
+        return dumps(content)
@@ -0,0 +1,332 @@
+# tiempo_real.py
+# Push de cambios de gestiones por SSE / WebSocket (en lugar de re-consultar el detalle).
+# - notificar(session, ...) encola un mensaje en la sesión; se publica sólo si la
+#   transacción confirma (eventos de Session before/after_commit).
+# - Con Postgres los mensajes viajan por NOTIFY (dentro de la transacción) y cada worker
+#   los recibe con LISTEN y los reparte a sus clientes: todos los workers quedan al día.
+# - Hub: índices gestion_id -> clientes y estado_id -> clientes; el mensaje se serializa
+#   una vez y se encola sin await en cada cliente (fan-out a miles de conexiones).
+# - Backpressure: cola acotada por cliente; si se llena se descarta lo pendiente y se le
+#   envía {"tipo": "resync"} para que recargue por la API.
+# - El mismo canal lleva las invalidaciones de la caché de respuestas en memoria
+#   ({"tipo": "cache"}) para que los demás workers no sirvan cuerpos ni 304 obsoletos.
+import asyncio
+import json
+import logging
+import threading
+import uuid
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+import respuesta_cache
+from catalogo_cache import NotifyListener
+from serializers import dumps
+from settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+CANAL_NOTIFY = "gestion_cambio"
+HEARTBEAT_SEGUNDOS = 15.0
+ENVIO_TIMEOUT_SEGUNDOS = 10.0
+RESYNC = '{"tipo":"resync"}'
+_PENDIENTES = "tiempo_real_pendientes"
+# Identifica a este worker: sus propias invalidaciones de caché vuelven por LISTEN
+ORIGEN = uuid.uuid4().hex[:12]
+# NOTIFY admite payloads de hasta 8000 bytes; por encima se pide vaciar la caché
+_MAX_PAYLOAD = 7500
+
+
+class Suscripcion:
+    """Un cliente conectado: filtros y cola acotada de mensajes ya serializados."""
+
+    def __init__(self, gestiones, estados, maximo):
+        self.gestiones = frozenset(gestiones)
+        self.estados = frozenset(estados)
+        self.cola = asyncio.Queue(maxsize=maximo)
+        self.descartados = 0
+
+    def entregar(self, texto):
+        try:
+            self.cola.put_nowait(texto)
+        except asyncio.QueueFull:
+            # Cliente lento: no se bloquea a los demás; que recargue por la API
+            while not self.cola.empty():
+                self.cola.get_nowait()
+                self.descartados += 1
+            self.cola.put_nowait(RESYNC)
+            return False
+        return True
+
+    async def siguientes(self, timeout):
+        """Espera al menos un mensaje (o timeout -> []) y devuelve todos los pendientes."""
+        try:
+            primero = await asyncio.wait_for(self.cola.get(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        out = [primero]
+        while not self.cola.empty():
+            out.append(self.cola.get_nowait())
+        return out
+
+
+class Hub:
+    def __init__(self, cola_maxima):
+        self.cola_maxima = cola_maxima
+        self._todos = set()
+        self._por_gestion = {}
+        self._por_estado = {}
+        self._loop = None
+        self._hilo = None
+        self.publicados = 0
+        self.entregas = 0
+        self.desbordes = 0
+
+    def vincular(self, loop):
+        """El loop de uvicorn: publicar() desde otros hilos se reenvía a él."""
+        self._loop = loop
+        self._hilo = threading.get_ident()
+
+    def suscribir(self, gestiones=(), estados=()):
+        sub = Suscripcion(gestiones, estados, self.cola_maxima)
+        self._indexar(sub)
+        return sub
+
+    def cancelar(self, sub):
+        self._todos.discard(sub)
+        for indice, claves in ((self._por_gestion, sub.gestiones), (self._por_estado, sub.estados)):
+            for k in claves:
+                subs = indice.get(k)
+                if subs is not None:
+                    subs.discard(sub)
+                    if not subs:
+                        del indice[k]
+
+    def actualizar(self, sub, gestiones=(), estados=()):
+        self.cancelar(sub)
+        sub.gestiones, sub.estados = frozenset(gestiones), frozenset(estados)
+        self._indexar(sub)
+
+    def _indexar(self, sub):
+        if not sub.gestiones and not sub.estados:
+            self._todos.add(sub)
+        for g in sub.gestiones:
+            self._por_gestion.setdefault(g, set()).add(sub)
+        for e in sub.estados:
+            self._por_estado.setdefault(e, set()).add(sub)
+
+    @property
+    def conexiones(self):
+        subs = set(self._todos)
+        for indice in (self._por_gestion, self._por_estado):
+            for s in indice.values():
+                subs |= s
+        return len(subs)
+
+    def publicar(self, mensaje):
+        """Seguro desde cualquier hilo; sin loop vinculado (scripts) no hace nada."""
+        if self._loop is None:
+            return
+        if threading.get_ident() == self._hilo:
+            self._despachar(mensaje)
+        else:
+            self._loop.call_soon_threadsafe(self._despachar, mensaje)
+
+    def _despachar(self, mensaje):
+        self.publicados += 1
+        # Los suscritos "a todo" no están en los índices: no hace falta deduplicarlos
+        especificos = set()
+        if mensaje.get("tipo") == "resync":
+            for indice in (self._por_gestion, self._por_estado):
+                for s in indice.values():
+                    especificos |= s
+        else:
+            subs = self._por_gestion.get(mensaje.get("gestion_id"))
+            if subs:
+                especificos |= subs
+            for clave in ("estado_id", "estado_anterior"):
+                subs = self._por_estado.get(mensaje.get(clave))
+                if subs:
+                    especificos |= subs
+        if not especificos and not self._todos:
+            return
+        texto = dumps(mensaje).decode()
+        for destinatarios in (self._todos, especificos):
+            for sub in destinatarios:
+                if sub.entregar(texto):
+                    self.entregas += 1
+                else:
+                    self.desbordes += 1
+
+    def estadisticas(self):
+        return {
+            "conexiones": self.conexiones,
+            "publicados": self.publicados,
+            "entregas": self.entregas,
+            "desbordes": self.desbordes,
+            "puente_notify": _puente is not None,
+        }
+
+
+hub = Hub(get_settings().tiempo_real_cola)
+_puente = None
+
+
+# ---------------------------------------------------------------------------
+# Publicación transaccional
+# ---------------------------------------------------------------------------
+def notificar(session, **mensaje):
+    """Encola un mensaje en la sesión (Session o AsyncSession); sale al confirmar."""
+    sync = getattr(session, "sync_session", session)
+    sync.info.setdefault(_PENDIENTES, []).append(mensaje)
+
+
+def _usa_notify(session):
+    return get_settings().tiempo_real_notify and session.get_bind().dialect.name == "postgresql"
+
+
+@event.listens_for(Session, "before_commit")
+def _antes_de_confirmar(session):
+    pendientes = session.info.get(_PENDIENTES)
+    if pendientes and _usa_notify(session):
+        # NOTIFY es transaccional: se entrega a los LISTEN (este worker incluido) al confirmar
+        conn = session.connection()
+        for m in pendientes:
+            conn.execute(select(func.pg_notify(CANAL_NOTIFY, dumps(m).decode())))
+        session.info[_PENDIENTES] = []
+
+
+@event.listens_for(Session, "after_commit")
+def _despues_de_confirmar(session):
+    for m in session.info.pop(_PENDIENTES, None) or ():
+        hub.publicar(m)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _despues_de_rollback(session, previous_transaction):
+    session.info.pop(_PENDIENTES, None)
+
+
+def _al_notificar(payloads):
+    for p in payloads:
+        try:
+            mensaje = json.loads(p)
+        except ValueError:
+            logger.warning("NOTIFY %s con payload inválido: %r", CANAL_NOTIFY, p)
+            continue
+        if mensaje.get("tipo") != "cache":
+            hub.publicar(mensaje)
+        elif mensaje.get("origen") != ORIGEN:
+            if "tags" in mensaje:
+                respuesta_cache.invalidar_local(mensaje["tags"])
+            else:
+                respuesta_cache.vaciar_local()
+
+
+def _difundir(tags):
+    payload = dumps({"tipo": "cache", "origen": ORIGEN, "tags": list(tags)}).decode()
+    if len(payload) > _MAX_PAYLOAD:
+        payload = dumps({"tipo": "cache", "origen": ORIGEN}).decode()
+    _puente.enviar(payload)
+
+
+def _al_conectar(conn):
+    # Tras (re)conectar pudimos perder avisos: los clientes recargan y la caché se vacía
+    hub.publicar({"tipo": "resync"})
+    respuesta_cache.vaciar_local()
+
+
+def iniciar(engine):
+    """En el lifespan: vincula el hub al loop y, con Postgres, arranca el puente LISTEN."""
+    global _puente
+    hub.vincular(asyncio.get_running_loop())
+    if engine.dialect.name != "postgresql" or not get_settings().tiempo_real_notify:
+        return None
+    _puente = NotifyListener(engine, CANAL_NOTIFY, al_notificar=_al_notificar, al_conectar=_al_conectar)
+    _puente.start()
+    respuesta_cache.difundir_con(_difundir)
+    return _puente
+
+
+def detener():
+    """En el lifespan, al cerrar: para el puente."""
+    global _puente
+    respuesta_cache.difundir_con(None)
+    if _puente is not None:
+        _puente.detener()
+        _puente = None
+
+
+# ---------------------------------------------------------------------------
+# Transportes
+# ---------------------------------------------------------------------------
+async def sse(gestiones=(), estados=()):
+    """
+    Generador text/event-stream; comentario de heartbeat si no hay mensajes. Se suscribe
+    al empezar a iterarlo: si la respuesta nunca llega a enviarse no queda registrado.
+    """
+    sub = hub.suscribir(gestiones, estados)
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            mensajes = await sub.siguientes(HEARTBEAT_SEGUNDOS)
+            if not mensajes:
+                yield ": ping\n\n"
+                continue
+            yield "".join(f"data: {m}\n\n" for m in mensajes)
+    finally:
+        hub.cancelar(sub)
+
+
+async def websocket(ws, gestiones=(), estados=()):
+    """
+    Envía los mensajes como texto JSON. El cliente puede cambiar la suscripción enviando
+    {"gestion_id": [...], "estado_id": [...]}. Un cliente que no lee se desconecta.
+    Acabe como acabe (desconexión, error al recibir o enviar), se cancela la suscripción.
+    """
+    from starlette.websockets import WebSocketDisconnect
+
+    async def recibir():
+        try:
+            while True:
+                try:
+                    data = json.loads(await ws.receive_text())
+                except ValueError:
+                    continue
+                if isinstance(data, dict):
+                    hub.actualizar(sub, _ids(data.get("gestion_id")), _ids(data.get("estado_id")))
+        except WebSocketDisconnect:
+            pass
+        except Exception:
+            # Termina el bucle de envío igual que una desconexión
+            logger.debug("WebSocket: error al recibir", exc_info=True)
+
+    sub = hub.suscribir(gestiones, estados)
+    receptor = None
+    try:
+        receptor = asyncio.create_task(recibir())
+        while not receptor.done():
+            lectura = asyncio.create_task(sub.siguientes(HEARTBEAT_SEGUNDOS))
+            await asyncio.wait({lectura, receptor}, return_when=asyncio.FIRST_COMPLETED)
+            if not lectura.done():
+                lectura.cancel()
+                break
+            mensajes = lectura.result() or ['{"tipo":"ping"}']
+            for m in mensajes:
+                await asyncio.wait_for(ws.send_text(m), ENVIO_TIMEOUT_SEGUNDOS)
+    except asyncio.TimeoutError:
+        await ws.close(code=1013)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        if receptor is not None:
+            receptor.cancel()
+        hub.cancelar(sub)
+
+
+def _ids(valor):
+    if valor is None:
+        return ()
+    if not isinstance(valor, list):
+        valor = [valor]
+    return [int(v) for v in valor if isinstance(v, int) or (isinstance(v, str) and v.isdigit())]
@@ -0,0 +1,125 @@
+# workflow.py
+# Motor de flujo compilado a partir de estado_transiciones y comentario_plantilla.
+# Se construye una vez por snapshot de catálogo (ver catalogo_cache.py); validar
+# una transición es una búsqueda en memoria, sin consultas.
+from collections import deque
+
+TRANSICION_NO_PERMITIDA = "Transición no permitida desde el estado actual"
+COMENTARIO_REQUERIDO = "Se requiere comentario para esta transición"
+ROL_NO_PERMITIDO = "Tu rol no permite esta transición"
+
+
+def parse_roles(valor):
+    """'gestor, admin' -> frozenset({'gestor', 'admin'}); vacío o None -> frozenset()."""
+    return frozenset(r.strip() for r in (valor or "").split(",") if r.strip())
+
+
+class WorkflowEngine:
+    """
+    - siguientes[from]: frozenset de destinos directos (dict-of-sets)
+    - _bit / _alcance: bitset de estados alcanzables desde cada estado (cierre transitivo)
+    - _reglas[(from, to, tipo)]: True si la transición exige comentario
+      (tipo None = regla genérica para tipos sin plantilla propia)
+    - _roles[(to, tipo)]: roles_allowed de la plantilla ya parseado (frozenset); sin
+      entrada o vacío = cualquier rol
+    """
+
+    def __init__(self, estado_ids, transiciones, plantillas):
+        ids = sorted(set(estado_ids) | {i for t in transiciones for i in t})
+        self._bit = {eid: 1 << pos for pos, eid in enumerate(ids)}
+        self._ids = ids
+
+        siguientes = {}
+        for from_id, to_id in transiciones:
+            siguientes.setdefault(from_id, set()).add(to_id)
+        self.siguientes = {k: frozenset(v) for k, v in siguientes.items()}
+
+        # Cierre transitivo sobre bitsets (Warshall): O(n^2) operaciones de enteros
+        alcance = {eid: 0 for eid in ids}
+        for from_id, destinos in self.siguientes.items():
+            for to_id in destinos:
+                alcance[from_id] |= self._bit[to_id]
+        for k in ids:
+            bk = self._bit[k]
+            for i in ids:
+                if alcance[i] & bk:
+                    alcance[i] |= alcance[k]
+        self._alcance = alcance
+
+        # Plantilla aplicable por (estado destino, tipo): exacta o genérica (tipo None)
+        requerido = {}
+        roles = {}
+        for p in plantillas:
+            requerido.setdefault((p["estado_id"], p["tipo_gestion"]), bool(p["required"]))
+            roles.setdefault((p["estado_id"], p["tipo_gestion"]), parse_roles(p.get("roles_allowed")))
+        self._roles = roles
+        self._tipos = {tipo for (_, tipo) in requerido if tipo is not None}
+        self._reglas = {}
+        for from_id, destinos in self.siguientes.items():
+            for to_id in destinos:
+                generico = requerido.get((to_id, None), False)
+                self._reglas[(from_id, to_id, None)] = generico
+                for tipo in self._tipos:
+                    self._reglas[(from_id, to_id, tipo)] = requerido.get((to_id, tipo), generico)
+        # Gestiones sin estado (from None): cualquier destino, se consulta la plantilla directa
+        self._requerido = requerido
+
+    def permitido(self, from_id, to_id):
+        return to_id in self.siguientes.get(from_id, ())
+
+    def requiere_comentario(self, from_id, to_id, tipo=None):
+        if from_id is None:
+            if tipo is not None and (to_id, tipo) in self._requerido:
+                return self._requerido[(to_id, tipo)]
+            return self._requerido.get((to_id, None), False)
+        key = (from_id, to_id, tipo if tipo in self._tipos else None)
+        return self._reglas.get(key, False)
+
+    def roles_permitidos(self, to_id, tipo=None):
+        """Roles que pueden llevar una gestión a to_id (misma plantilla que plantilla_para)."""
+        if tipo is not None and (to_id, tipo) in self._roles:
+            return self._roles[(to_id, tipo)]
+        return self._roles.get((to_id, None), frozenset())
+
+    def validar(self, from_id, to_id, tipo=None, comentario=None, roles=frozenset()):
+        """None si la transición es válida; en otro caso el mensaje de error.
+        roles: los del usuario autenticado (vacío si es anónimo)."""
+        if from_id is not None and not self.permitido(from_id, to_id):
+            return TRANSICION_NO_PERMITIDA
+        if self.requiere_comentario(from_id, to_id, tipo) and (not comentario or comentario.strip() == ""):
+            return COMENTARIO_REQUERIDO
+        permitidos = self.roles_permitidos(to_id, tipo)
+        if permitidos and permitidos.isdisjoint(roles):
+            return ROL_NO_PERMITIDO
+        return None
+
+    def alcanzables(self, from_id):
+        """Estados alcanzables (en uno o más pasos) desde from_id, ordenados por id."""
+        mask = self._alcance.get(from_id, 0)
+        return [eid for eid in self._ids if mask & self._bit[eid]]
+
+    def alcanzable(self, from_id, to_id):
+        bit = self._bit.get(to_id)
+        return bit is not None and bool(self._alcance.get(from_id, 0) & bit)
+
+    def camino_mas_corto(self, from_id, to_id):
+        """Lista de estados [from, ..., to] con menos pasos, o None si no hay camino."""
+        if from_id == to_id:
+            return [from_id]
+        if not self.alcanzable(from_id, to_id):
+            return None
+        previo = {from_id: None}
+        cola = deque([from_id])
+        while cola:
+            actual = cola.popleft()
+            for sig in sorted(self.siguientes.get(actual, ())):
+                if sig in previo:
+                    continue
+                previo[sig] = actual
+                if sig == to_id:
+                    camino = [sig]
+                    while previo[camino[-1]] is not None:
+                        camino.append(previo[camino[-1]])
+                    return camino[::-1]
+                cola.append(sig)
+        return None
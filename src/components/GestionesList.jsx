@@ -32,6 +32,23 @@ import RelativeDate from "./RelativeDate";
  */
 const API_BASE = process.env.REACT_APP_API_BASE || "http://localhost:8000";
 
+// /api/gestiones/ pagina por cursor: seguir X-Next-Cursor hasta la última página
+async function fetchAllGestiones() {
+  const all = [];
+  let cursor = null;
+  do {
+    const url = new URL(`${API_BASE}/api/gestiones/`);
+    url.searchParams.set("limit", "500");
+    if (cursor) url.searchParams.set("cursor", cursor);
+    const res = await fetch(url);
+    if (!res.ok) throw new Error(`gestiones: ${res.status}`);
+    const page = await res.json();
+    if (Array.isArray(page)) all.push(...page);
+    cursor = res.headers.get("X-Next-Cursor");
+  } while (cursor);
+  return all;
+}
+
 export default function GestionesList() {
   const [gestiones, setGestiones] = useState([]);
   const [usuarios, setUsuarios] = useState([]);
@@ -44,16 +61,15 @@ export default function GestionesList() {
   const fetchAll = useCallback(async () => {
     setLoading(true);
     try {
-      const [gRes, uRes, eRes] = await Promise.all([
-        fetch(`${API_BASE}/api/gestiones/`),
+      const [gData, uRes, eRes] = await Promise.all([
+        fetchAllGestiones(),
         fetch(`${API_BASE}/api/usuarios/`),
         fetch(`${API_BASE}/api/catalogos/estados`)
       ]);
-      if (!gRes.ok) throw new Error(`gestiones: ${gRes.status}`);
       if (!uRes.ok) throw new Error(`usuarios: ${uRes.status}`);
       if (!eRes.ok) throw new Error(`estados: ${eRes.status}`);
 
-      const [gData, uData, eData] = await Promise.all([gRes.json(), uRes.json(), eRes.json()]);
+      const [uData, eData] = await Promise.all([uRes.json(), eRes.json()]);
       setGestiones(Array.isArray(gData) ? gData : []);
       setUsuarios(Array.isArray(uData) ? uData : []);
       setEstados(Array.isArray(eData) ? eData : []);